@@ -0,0 +1,183 @@
+# almacen.py — archivos subidos guardados por contenido (sha256), sin duplicados
+
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from werkzeug.utils import secure_filename
+
+from mi_modelo import TABLAS_ACTIVOS, consulta, transaccion
+
+UPLOAD_FOLDER = os.path.join("static", "uploads")
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+BLOQUE = 1024 * 1024
+# Un archivo recién subido todavía no tiene registro que lo use (refs = 0);
+# no se purga hasta que pase este tiempo.
+GRACIA_SEG = 300
+
+_lock = threading.Lock()
+
+
+def _ruta_hash(h, ext):
+    """static/uploads/ab/cd/abcd...ext — dos niveles para no llenar un solo directorio."""
+    return os.path.join(UPLOAD_FOLDER, h[:2], h[2:4], h + ext).replace("\\", "/")
+
+
+def _volcar(origen, destino):
+    """Copia origen -> destino por bloques calculando el sha256. Devuelve (hash, bytes)."""
+    sha = hashlib.sha256()
+    tamano = 0
+    while True:
+        bloque = origen.read(BLOQUE)
+        if not bloque:
+            break
+        sha.update(bloque)
+        destino.write(bloque)
+        tamano += len(bloque)
+    return sha.hexdigest(), tamano
+
+
+def _registrar(tmp, h, tamano, nombre, tipo):
+    """Mueve el temporal a su ruta final (o lo descarta si ya existe) y devuelve la ruta."""
+    ext = os.path.splitext(nombre)[1].lower()
+    with _lock:
+        with consulta() as c:
+            c.execute("SELECT ruta FROM archivos WHERE hash=?", (h,))
+            fila = c.fetchone()
+        ruta = fila[0] if fila else _ruta_hash(h, ext)
+        if os.path.exists(ruta):
+            os.remove(tmp)
+        else:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            os.replace(tmp, ruta)
+        with transaccion() as c:
+            if fila:
+                c.execute("UPDATE archivos SET usado=? WHERE hash=?", (time.time(), h))
+            else:
+                c.execute("""
+                    INSERT INTO archivos (hash, ruta, nombre, tipo, tamano, refs, creado, usado)
+                    VALUES (?, ?, ?, ?, ?, 0, ?, ?)
+                """, (h, ruta, nombre, tipo or mimetypes.guess_type(nombre)[0], tamano,
+                      datetime.now().strftime("%Y-%m-%d %H:%M:%S"), time.time()))
+    print(f"[UPLOAD] {nombre} -> {ruta}{' (ya existía)' if fila else ''}")
+    return ruta
+
+
+def guardar(file_storage):
+    """
+    Guarda un archivo subido (FileStorage) y devuelve la ruta a poner en la
+    columna archivo, o "" si no vino archivo. El mismo contenido se guarda una
+    sola vez; los triggers de cada tabla llevan la cuenta de quién lo usa.
+    """
+    if not file_storage or not file_storage.filename.strip():
+        return ""
+    nombre = secure_filename(file_storage.filename) or "archivo"
+    tmp_dir = os.path.join(UPLOAD_FOLDER, ".tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+        h, tamano = _volcar(file_storage.stream, tmp)
+    return _registrar(tmp.name, h, tamano, nombre, file_storage.mimetype)
+
+
+def guardar_desde_ruta(ruta_origen, nombre=None):
+    """Igual que guardar() pero desde un archivo ya en disco (se deja intacto)."""
+    nombre = nombre or os.path.basename(ruta_origen)
+    tmp_dir = os.path.join(UPLOAD_FOLDER, ".tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    with open(ruta_origen, "rb") as origen, tempfile.NamedTemporaryFile(dir=tmp_dir, delete=False) as tmp:
+        h, tamano = _volcar(origen, tmp)
+    return _registrar(tmp.name, h, tamano, nombre, None)
+
+
+def obtener(ruta):
+    """Metadatos de un archivo del almacén: dict con hash, ruta, nombre, tipo, tamano, refs, creado; o None."""
+    if not ruta:
+        return None
+    with consulta() as c:
+        c.execute("SELECT hash, ruta, nombre, tipo, tamano, refs, creado FROM archivos WHERE ruta=?", (ruta,))
+        fila = c.fetchone()
+    if not fila:
+        return None
+    return dict(zip(("hash", "ruta", "nombre", "tipo", "tamano", "refs", "creado"), fila))
+
+
+def ruta_relativa(valor):
+    """
+    Valor de la columna archivo -> ruta dentro de UPLOAD_FOLDER (para
+    send_from_directory). Los registros viejos guardaban sólo el nombre.
+    """
+    valor = str(valor or "").replace("\\", "/")
+    if not valor:
+        return None
+    prefijo = UPLOAD_FOLDER.replace("\\", "/") + "/"
+    if valor.startswith(prefijo):
+        return valor[len(prefijo):]
+    return os.path.basename(valor)
+
+
+def purgar():
+    """Borra del disco y de la tabla los archivos que ya ningún registro usa."""
+    limite = time.time() - GRACIA_SEG
+    with _lock:
+        with consulta() as c:
+            c.execute("SELECT hash, ruta FROM archivos WHERE refs <= 0 AND usado < ?", (limite,))
+            filas = c.fetchall()
+        if not filas:
+            return 0
+        for _, ruta in filas:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"No se pudo borrar {ruta}: {e}")
+        with transaccion() as c:
+            c.executemany("DELETE FROM archivos WHERE hash=? AND refs <= 0", [(h,) for h, _ in filas])
+    print(f"[UPLOAD] {len(filas)} archivos sin uso eliminados")
+    return len(filas)
+
+
+def migrar_legado():
+    """
+    Pasa al almacén los archivos guardados con el esquema anterior
+    (static/uploads/<nombre>) y actualiza los registros que los usan.
+    Los que ya no existen en disco se dejan como están; si otro proceso se
+    lleva un archivo a mitad de camino se toma como ya migrado.
+    Se corre con `flask migrar-archivos`.
+    """
+    valores = set()
+    with consulta() as c:
+        for t in TABLAS_ACTIVOS:
+            c.execute(f"""
+                SELECT DISTINCT archivo FROM {t}
+                WHERE COALESCE(archivo, '') != '' AND archivo NOT IN (SELECT ruta FROM archivos)
+            """)
+            valores.update(v for (v,) in c.fetchall())
+    if not valores:
+        return 0
+    migrados = {}
+    for valor in valores:
+        origen = os.path.join(UPLOAD_FOLDER, os.path.basename(str(valor).replace("\\", "/")))
+        if not os.path.isfile(origen):
+            continue
+        if origen not in migrados:
+            try:
+                migrados[origen] = guardar_desde_ruta(origen)
+            except FileNotFoundError:
+                continue
+        with transaccion() as c:
+            for t in TABLAS_ACTIVOS:
+                c.execute(f"UPDATE {t} SET archivo=? WHERE archivo=?", (migrados[origen], valor))
+    for origen in migrados:
+        try:
+            os.remove(origen)
+        except FileNotFoundError:
+            pass
+    if migrados:
+        print(f"[MIGRACION] {len(migrados)} archivos pasados al almacén por contenido")
+    return len(migrados)
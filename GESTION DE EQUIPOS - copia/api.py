@@ -0,0 +1,195 @@
+# api.py — API JSON de sólo lectura (/api/v1) para scripts y automatizaciones
+#
+#   GET /api/v1/                       tablas y su versión actual
+#   GET /api/v1/<tabla>                página de registros (cursor por id)
+#       ?despues=<id> | ?antes=<id>    cursor, como en los listados HTML
+#       ?por_pagina=N                  hasta POR_PAGINA_MAX
+#       ?fields=nombre,ip              sólo esas columnas (id siempre va)
+#       ?empresa= ?activo= ?area= ?equipo_id= ?ip=<prefijo>
+#   GET /api/v1/<tabla>/<id>           un registro
+#   GET /api/v1/cambios?desde=<v>      altas/modificaciones/bajas desde la versión v
+#       ?limite=N                      entradas del registro por página (hasta CAMBIOS_MAX)
+#
+# Sincronizar: pedir cambios?desde=0 (trae todo lo que hay), guardar "hasta"
+# y repetir con desde=hasta mientras "mas" sea true; después, cada tanto, desde
+# el último "hasta". Si la respuesta es 410 el registro se compactó más allá
+# de esa versión: borrar la copia local y volver a desde=0.
+#
+# Cada respuesta lleva un ETag armado con la versión de la tabla (tabla
+# versiones, la suben los triggers) y la query string: con If-None-Match se
+# contesta 304 sin leer la página, así que consultar seguido cuesta una sola
+# consulta mientras no haya cambios.
+
+import hashlib
+from functools import wraps
+
+from flask import Blueprint, Response, jsonify, request, session, url_for
+
+import registros
+from mi_modelo import (
+    FILTROS_IGUALDAD, TABLAS_ACTIVOS, cambios_desde, obtener_por_id, pagina_filtrada, version_tabla,
+)
+
+POR_PAGINA = 100
+POR_PAGINA_MAX = 1000
+CAMBIOS_POR_PAGINA = 500
+CAMBIOS_MAX = 5000
+
+bp = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+def _error(mensaje, estado):
+    return jsonify({"error": mensaje}), estado
+
+
+def sesion_requerida(f):
+    # Igual que login_requerido de app.py, pero contesta 401 en JSON en vez de redirigir.
+    @wraps(f)
+    def wrapper(*a, **kw):
+        if not session.get("usuario"):
+            return _error("sesión requerida", 401)
+        return f(*a, **kw)
+    return wrapper
+
+
+def _etag(tabla, version):
+    consulta = "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+    digest = hashlib.sha1(f"{request.path}?{consulta}".encode("utf-8")).hexdigest()[:16]
+    return f"{tabla}-{version}-{digest}"
+
+
+def _condicional(tabla):
+    """(etag, respuesta 304 o None) según If-None-Match."""
+    etag = _etag(tabla, version_tabla(tabla))
+    if request.if_none_match.contains(etag):
+        resp = Response(status=304)
+        _cabeceras(resp, etag)
+        return etag, resp
+    return etag, None
+
+
+def _cabeceras(resp, etag):
+    resp.set_etag(etag)
+    resp.cache_control.private = True
+    resp.cache_control.no_cache = True      # revalidar siempre: el ETag hace barata la respuesta
+    return resp
+
+
+def _tipo(tabla):
+    campos = request.args.get("fields", "").strip()
+    if not campos:
+        return registros.POR_TABLA[tabla]
+    return registros.proyeccion(tabla, tuple(c.strip() for c in campos.split(",") if c.strip()))
+
+
+def _entero(nombre, defecto=None):
+    """Parámetro entero de la query string; ValueError si viene y no es un número."""
+    valor = request.args.get(nombre, "").strip()
+    if not valor:
+        return defecto
+    try:
+        return int(valor)
+    except ValueError:
+        raise ValueError(f"{nombre} debe ser un número") from None
+
+
+def _filtros():
+    filtros = {}
+    for col in FILTROS_IGUALDAD + ("ip",):
+        valor = request.args.get(col, "").strip()
+        if not valor:
+            continue
+        if col in ("activo", "equipo_id"):
+            try:
+                valor = int(valor)
+            except ValueError:
+                raise ValueError(f"{col} debe ser un número")
+        filtros[col] = valor
+    return filtros
+
+
+def _url_pagina(tabla, **cursor):
+    args = {k: v for k, v in request.args.items() if k not in ("despues", "antes")}
+    return url_for("api.listar", tabla=tabla, **args, **cursor)
+
+
+@bp.route("/")
+@sesion_requerida
+def indice():
+    return jsonify({
+        "tablas": {t: {"version": version_tabla(t), "url": url_for("api.listar", tabla=t)}
+                   for t in TABLAS_ACTIVOS},
+    })
+
+
+@bp.route("/cambios")
+@sesion_requerida
+def cambios():
+    try:
+        desde = _entero("desde", 0)
+        limite = max(1, min(_entero("limite", CAMBIOS_POR_PAGINA), CAMBIOS_MAX))
+    except ValueError as e:
+        return _error(str(e), 400)
+    res = cambios_desde(desde, limite)
+    if 0 < desde < res["podado"]:
+        return jsonify({"error": "el registro de cambios se compactó: sincronizar de nuevo desde 0",
+                        "podado": res["podado"], "actual": res["actual"]}), 410
+    return jsonify({
+        "desde": desde,
+        "hasta": res["hasta"],
+        "mas": res["mas"],
+        "actual": res["actual"],
+        "cambios": [
+            {"version": v, "tabla": t, "id": i,
+             "operacion": "baja" if fila is None else "alta_o_cambio",
+             "datos": None if fila is None else fila._asdict()}
+            for v, t, i, fila in res["cambios"]
+        ],
+        "siguiente": url_for("api.cambios", desde=res["hasta"], limite=limite) if res["mas"] else None,
+    })
+
+
+@bp.route("/<tabla>")
+@sesion_requerida
+def listar(tabla):
+    if tabla not in TABLAS_ACTIVOS:
+        return _error(f"tabla desconocida: {tabla}", 404)
+    etag, no_modificado = _condicional(tabla)
+    if no_modificado:
+        return no_modificado
+
+    try:
+        despues = _entero("despues")
+        antes = _entero("antes")
+        por_pagina = max(1, min(_entero("por_pagina", POR_PAGINA), POR_PAGINA_MAX))
+        tipo = _tipo(tabla)
+        pagina = pagina_filtrada(tabla, _filtros(), despues, antes, por_pagina, tipo)
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    resp = jsonify({
+        "tabla": tabla,
+        "campos": list(tipo._fields),
+        "total": pagina["total"],
+        "datos": [r._asdict() for r in pagina["filas"]],
+        "siguiente": _url_pagina(tabla, despues=pagina["siguiente"]) if pagina["siguiente"] else None,
+        "anterior": _url_pagina(tabla, antes=pagina["anterior"]) if pagina["anterior"] else None,
+    })
+    return _cabeceras(resp, etag)
+
+
+@bp.route("/<tabla>/<int:id_reg>")
+@sesion_requerida
+def detalle(tabla, id_reg):
+    if tabla not in TABLAS_ACTIVOS:
+        return _error(f"tabla desconocida: {tabla}", 404)
+    etag, no_modificado = _condicional(tabla)
+    if no_modificado:
+        return no_modificado
+    try:
+        registro = obtener_por_id(tabla, id_reg, _tipo(tabla))
+    except ValueError as e:
+        return _error(str(e), 400)
+    if registro is None:
+        return _error(f"{tabla} {id_reg} no existe", 404)
+    return _cabeceras(jsonify(registro._asdict()), etag)
@@ -1,21 +1,31 @@
 from functools import wraps
+import hmac
 import os
-from datetime import datetime
+from datetime import date, datetime, timedelta
 
+import click
 from flask import (
-    Flask, render_template, request, redirect, session, send_from_directory
+    Flask, Response, abort, jsonify, render_template, request, redirect, session, send_file,
+    send_from_directory, url_for
 )
 from werkzeug.exceptions import BadRequestKeyError
-from werkzeug.utils import secure_filename
+
+import almacen
+import api
+import metricas
+import miniaturas
+from almacen import UPLOAD_FOLDER
+from red_ips import int_a_ip
+from registros import EquipoListado, OtroListado
 
 from mi_modelo import (
-    init_db,
+    init_db, cerrar_conexion, reconstruir_indice_busqueda,
     # General
-    obtener_todos, eliminar_simple,
+    pagina_tabla, eliminar_simple,
     # Equipos
     obtener_equipo_por_id, obtener_componentes_por_equipo,
     guardar_equipo, actualizar_equipo, eliminar_equipo,
-    actualizar_equipo_archivo, buscar_equipos, contar_equipos, set_equipo_activo,
+    actualizar_equipo_archivo, pagina_equipos, set_equipo_activo,
     # Componentes
     guardar_componente, eliminar_componente, obtener_componente_por_id,
     actualizar_componente, set_componente_activo,
@@ -26,15 +36,41 @@ from mi_modelo import (
     # Otros
     guardar_otro, actualizar_otro, actualizar_otro_archivo, obtener_otro_por_id,
     # Utilidades IP / búsqueda
-    obtener_ips_disponibles, obtener_ips_usadas, buscar_por_ip
+    buscar_por_ip, buscar_repetidos,
+    obtener_ips_libres, rangos_ips_libres, contar_ips_usadas,
+    DireccionRepetida, conflictos_direcciones,
+    # Plan de IPs
+    obtener_subredes, guardar_subred, eliminar_subred, guardar_reserva, eliminar_reserva,
+    plan_ips, detalle_subred,
 )
 
 app = Flask(__name__)
 app.secret_key = "seguro123" #esto esta en fase de prueba jajajaj no es el final
 init_db()
+app.teardown_appcontext(cerrar_conexion)
+
+# Métricas en /metrics (con sesión iniciada, o con METRICS_TOKEN en el
+# encabezado "Authorization: Bearer <token>" para Prometheus, que no tiene sesión).
+# SERVER_TIMING=True agrega el encabezado Server-Timing (tiempo en SQL y total)
+# a cada respuesta, para verlo en las devtools.
+app.config["SERVER_TIMING"] = False
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN", "")
+metricas.activar()
+app.before_request(metricas.inicio_request)
+app.after_request(metricas.fin_request)
+
+# API JSON para scripts (api.py)
+app.register_blueprint(api.bp)
+
+RED_PREDETERMINADA = "192.168.3.0/24"
+MAX_IPS_LISTADO = 4096
+MAX_RANGOS_LISTADO = 100
+
+POR_PAGINA = 50
+POR_PAGINA_MAX = 500
 
-UPLOAD_FOLDER = os.path.join("static", "uploads")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Los archivos del almacén no cambian nunca: su ruta es el hash del contenido.
+CACHE_INMUTABLE_SEG = 365 * 24 * 3600
 
 
 def login_requerido(f):
@@ -47,14 +83,76 @@ def login_requerido(f):
 
 
 def guardar_archivo_opcional(file_storage):
-    if not file_storage or not file_storage.filename.strip():
-        return ""
-    fname = secure_filename(file_storage.filename)
-    ruta = os.path.join(UPLOAD_FOLDER, fname)
-    file_storage.save(ruta)
-    print(f"[UPLOAD] {ruta}")
+    """Guarda el archivo en el almacén por contenido; "" si no se subió nada."""
+    ruta = almacen.guardar(file_storage)
+    if ruta and miniaturas.soporta(ruta):
+        from trabajos import enviar
+        enviar(("miniatura", ruta), miniaturas.generar_todas, ruta)
     return ruta
 
+
+def revisar_direcciones(tabla):
+    """
+    DireccionRepetida con la IP/MAC del formulario de alta antes de guardar el
+    archivo subido, para no dejar en el almacén un archivo que ningún registro
+    usa. guardar_* vuelve a revisar dentro de su transacción.
+    """
+    if request.form.get("permitir_repetidos"):
+        return
+    conflictos = buscar_repetidos(tabla, request.form.get("ip", ""), request.form.get("mac", ""))
+    if conflictos:
+        raise DireccionRepetida(conflictos)
+
+
+def con_formulario(registro):
+    """El registro con lo que se escribió en el formulario, para volver a mostrarlo."""
+    return registro._replace(**{k: v for k, v in request.form.items() if k in registro._fields})
+
+
+app.add_template_filter(int_a_ip, "ip")
+
+
+@app.template_global()
+def url_miniatura(valor, tamano="mini"):
+    """URL de la miniatura del archivo, o None si no se puede previsualizar."""
+    if not valor or not miniaturas.soporta(valor):
+        return None
+    return url_for("miniatura", filename=almacen.ruta_relativa(valor), t=tamano)
+
+
+def enviar_adjunto(valor, inmutable=False):
+    """
+    Respuesta con el archivo de la columna archivo, con su nombre original.
+    ETag = sha256 del contenido, así que una segunda vista cuesta un 304;
+    send_file ya atiende If-None-Match, If-Modified-Since y Range.
+    inmutable=True (URL con el hash) permite guardarlo en el navegador un año.
+    """
+    rel = almacen.ruta_relativa(valor)
+    if not rel:
+        return "Archivo no encontrado", 404
+    meta = almacen.obtener(valor)
+    inmutable = inmutable and meta is not None
+    resp = send_from_directory(
+        UPLOAD_FOLDER, rel,
+        download_name=meta["nombre"] if meta else None,
+        etag=meta["hash"] if meta else True,
+        max_age=CACHE_INMUTABLE_SEG if inmutable else None,
+    )
+    # detrás del login: sólo la cache del navegador, no proxies compartidos
+    resp.cache_control.public = False
+    resp.cache_control.private = True
+    if inmutable:
+        resp.cache_control.immutable = True
+    return resp
+
+def args_paginacion():
+    """Lee despues/antes/por_pagina de la query string (cursor por id)."""
+    despues = request.args.get("despues", type=int)
+    antes = request.args.get("antes", type=int)
+    por_pagina = request.args.get("por_pagina", POR_PAGINA, type=int)
+    por_pagina = max(1, min(por_pagina, POR_PAGINA_MAX))
+    return despues, antes, por_pagina
+
 @app.errorhandler(BadRequestKeyError)
 def handle_bad_request_key_error(e):
     return render_template("login.html", error="Solicitud inválida o campos faltantes."), 400
@@ -85,8 +183,9 @@ def logout():
 @app.route("/")
 @login_requerido
 def dashboard():
-    total_activos = contar_equipos(1)
-    total_inactivos = contar_equipos(0)
+    from estadisticas import obtener_estadisticas
+    from vencimientos import calendario
+    stats = obtener_estadisticas()
 
     # 🔎 Búsqueda IP general (por coincidencia)
     ip_query = (request.args.get("ip") or "").strip()
@@ -96,8 +195,10 @@ def dashboard():
 
     return render_template(
         "dashboard.html",
-        total_activos=total_activos,
-        total_inactivos=total_inactivos,
+        total_activos=stats["equipos_activos"],
+        total_inactivos=stats["equipos_inactivos"],
+        stats=stats,
+        venc=calendario(),
         ip_query=ip_query,
         resultados_ip=resultados_ip
     )
@@ -107,18 +208,135 @@ def dashboard():
 @app.route("/ips_disponibles")
 @login_requerido
 def ips_disponibles():
-    ip_prefix = "192.168.3"
-    ip_start_i = 1
-    ip_end_i = 254
-    disponibles = obtener_ips_disponibles(ip_prefix, ip_start_i, ip_end_i, max_resultados=1500)
-    total_usadas = len(obtener_ips_usadas())
+    subredes = obtener_subredes()
+    red = (request.args.get("red") or (subredes[0].cidr if subredes else RED_PREDETERMINADA)).strip()
+    error = None
+    try:
+        disponibles = obtener_ips_libres(red, max_resultados=MAX_IPS_LISTADO)
+    except ValueError:
+        error = f"Red inválida: {red}"
+        red = RED_PREDETERMINADA
+        disponibles = obtener_ips_libres(red, max_resultados=MAX_IPS_LISTADO)
+    rangos = rangos_ips_libres(red)
     return render_template(
         "ips_disponibles.html",
-        ip_prefix=ip_prefix,
-        ip_start=ip_start_i,
-        ip_end=ip_end_i,
+        red=red,
+        error=error,
+        subredes=subredes,
         disponibles=disponibles,
-        total_usadas=total_usadas
+        rangos=rangos[:MAX_RANGOS_LISTADO],
+        total_rangos=len(rangos),
+        total_usadas=contar_ips_usadas(red)
+    )
+
+
+@app.route("/plan_ips", methods=["GET", "POST"])
+@login_requerido
+def ver_plan_ips():
+    """Subredes (VLANs) con IPs usadas, reservadas y libres; POST agrega una."""
+    error = None
+    if request.method == "POST":
+        try:
+            guardar_subred(request.form.get("cidr", ""), request.form.get("nombre", ""))
+            return redirect(url_for("ver_plan_ips"))
+        except ValueError as e:
+            error = str(e)
+    return render_template("plan_ips.html", plan=plan_ips(), error=error)
+
+
+@app.route("/plan_ips/<int:id>", methods=["GET", "POST"])
+@login_requerido
+def ver_subred(id):
+    """Detalle de una subred: reservas y tramos libres; POST agrega una reserva."""
+    error = None
+    if request.method == "POST":
+        try:
+            guardar_reserva(id, request.form.get("desde", ""), request.form.get("hasta", ""),
+                            request.form.get("motivo", ""))
+            return redirect(url_for("ver_subred", id=id))
+        except ValueError as e:
+            error = str(e)
+    detalle = detalle_subred(id)
+    if detalle is None:
+        return redirect(url_for("ver_plan_ips"))
+    return render_template("subred.html", d=detalle, error=error,
+                           tramos=detalle["tramos_libres"][:MAX_RANGOS_LISTADO])
+
+
+@app.route("/plan_ips/<int:id>/eliminar", methods=["POST"])
+@login_requerido
+def eliminar_subred_ruta(id):
+    eliminar_subred(id)
+    return redirect(url_for("ver_plan_ips"))
+
+
+@app.route("/plan_ips/<int:id>/reserva/<int:rid>/eliminar", methods=["POST"])
+@login_requerido
+def eliminar_reserva_ruta(id, rid):
+    eliminar_reserva(rid)
+    return redirect(url_for("ver_subred", id=id))
+
+
+@app.route("/vencimientos")
+@login_requerido
+def ver_vencimientos():
+    from vencimientos import DIAS_AVISO, por_proveedor, proximos, vencidos
+    try:
+        dias = max(1, min(int(request.args.get("dias", DIAS_AVISO)), 3650))
+    except ValueError:
+        dias = DIAS_AVISO
+    hoy = date.today()
+    return render_template(
+        "vencimientos.html",
+        dias=dias,
+        hoy=hoy,
+        proximos=proximos(dias, hoy),
+        vencidos=vencidos(hoy),
+        por_proveedor=por_proveedor(hoy, hoy + timedelta(days=dias)),
+    )
+
+
+@app.route("/descubrimiento", methods=["GET", "POST"])
+@login_requerido
+def ver_descubrimiento():
+    """Último barrido de la red contra el inventario; POST lanza un barrido nuevo."""
+    from descubrimiento import conciliar, importar_arp, normalizar_red
+    from trabajos import enviar_barrido, obtener
+    red = (request.values.get("red") or RED_PREDETERMINADA).strip()
+    error = None
+    try:
+        red = normalizar_red(red)
+    except ValueError:
+        error = f"Red inválida: {red}"
+        red = RED_PREDETERMINADA
+
+    if request.method == "POST" and not error:
+        volcado = request.files.get("arp")
+        texto = volcado.read().decode("utf-8", "replace") if volcado and volcado.filename else ""
+        texto = texto or request.form.get("arp_texto", "")
+        try:
+            if texto.strip():
+                importar_arp(texto, red)
+                return redirect(url_for("ver_descubrimiento", red=red))
+            trabajo = enviar_barrido(red)
+            return redirect(url_for("ver_descubrimiento", red=red, trabajo=trabajo["id"]))
+        except ValueError as e:
+            error = str(e)
+
+    trabajo = obtener(request.args.get("trabajo", ""))
+    return render_template("descubrimiento.html", red=red, error=error, trabajo=trabajo,
+                           reporte=None if error else conciliar(red))
+
+
+@app.route("/conflictos")
+@login_requerido
+def ver_conflictos():
+    """IPs y MACs repetidas entre equipos, impresoras, cámaras y otros."""
+    grupos = conflictos_direcciones()
+    return render_template(
+        "conflictos.html",
+        ips=[g for g in grupos if g["campo"] == "ip"],
+        macs=[g for g in grupos if g["campo"] == "mac"],
     )
 
 
@@ -130,9 +348,12 @@ def ver_equipos():
     empresa = request.args.get("empresa")
     q = (request.args.get("q") or "").strip()
     ver_inactivos = request.args.get("inactivos") == "1"
-    equipos = buscar_equipos(q, empresa, solo_activos=not ver_inactivos)
+    despues, antes, por_pagina = args_paginacion()
+    pagina = pagina_equipos(q, empresa, solo_activos=not ver_inactivos,
+                            despues_de=despues, antes_de=antes, limite=por_pagina, tipo=EquipoListado)
     return render_template("dashboard_equipos.html",
-                           equipos=equipos, empresa=empresa, q=q, ver_inactivos=ver_inactivos)
+                           equipos=pagina["filas"], pagina=pagina, por_pagina=por_pagina,
+                           empresa=empresa, q=q, ver_inactivos=ver_inactivos)
 
 
 @app.route("/equipos/inactivos")
@@ -156,6 +377,10 @@ def ver_equipo(id):
 def nuevo_equipo():
     if request.method != "POST":
         return render_template("nuevo_equipo.html")
+    try:
+        revisar_direcciones("equipos")
+    except DireccionRepetida as e:
+        return render_template("nuevo_equipo.html", conflictos=e.conflictos), 409
     archivo = guardar_archivo_opcional(request.files.get("archivo"))
     datos = (
         request.form.get("nombre", ""), request.form.get("num_factura", ""),
@@ -170,7 +395,10 @@ def nuevo_equipo():
         archivo, datetime.now().strftime("%Y-%m-%d"),
         request.form.get("empresa", "Silicatos"),
     )
-    guardar_equipo(datos)
+    try:
+        guardar_equipo(datos, permitir_repetidos=bool(request.form.get("permitir_repetidos")))
+    except DireccionRepetida as e:
+        return render_template("nuevo_equipo.html", conflictos=e.conflictos), 409
     return redirect("/equipos")
 
 
@@ -195,11 +423,15 @@ def editar_equipo(id):
         request.form.get("conectada_internet", "No"),
         request.form.get("empresa", "Silicatos")
     )
-    actualizar_equipo(id, datos)
+    try:
+        actualizar_equipo(id, datos, permitir_repetidos=bool(request.form.get("permitir_repetidos")))
+    except DireccionRepetida as e:
+        return render_template("editar_equipo.html", equipo=con_formulario(equipo), conflictos=e.conflictos), 409
 
     nuevo = guardar_archivo_opcional(request.files.get("archivo"))
     if nuevo:
         actualizar_equipo_archivo(id, nuevo)
+        almacen.purgar()
     return redirect(f"/equipo/{id}")
 
 
@@ -208,7 +440,7 @@ def editar_equipo(id):
 def toggle_activo_equipo(id):
     eq = obtener_equipo_por_id(id)
     if eq:
-        set_equipo_activo(id, 0 if (eq[18] == 1) else 1)  
+        set_equipo_activo(id, 0 if (eq.activo == 1) else 1)  
  
     return redirect(request.referrer or "/equipos")
 
@@ -217,6 +449,7 @@ def toggle_activo_equipo(id):
 @login_requerido
 def eliminar_equipo_route(id):
     eliminar_equipo(id)
+    almacen.purgar()
     return redirect("/equipos")
 
 
@@ -224,32 +457,27 @@ def eliminar_equipo_route(id):
 @login_requerido
 def archivo_equipo(id):
     eq = obtener_equipo_por_id(id)
-    if not eq or not eq[15]:
+    if not eq or not eq.archivo:
         return "Archivo no encontrado", 404
-    fname = os.path.basename(str(eq[15]).replace("\\", "/"))
-    return send_from_directory(UPLOAD_FOLDER, fname)
+    return enviar_adjunto(eq.archivo)
 
 
 @app.route("/equipo/<int:id>/eliminar_archivo", methods=["POST"])
 @login_requerido
 def eliminar_archivo_equipo(id):
-    from pathlib import Path
     eq = obtener_equipo_por_id(id)
-    if eq and eq[15]:
-        fname = os.path.basename(str(eq[15]).replace("\\", "/"))
-        real = Path(UPLOAD_FOLDER) / fname
-        if real.exists():
-            try:
-                real.unlink()
-            except Exception as e:
-                print(f"No se pudo borrar {real}: {e}")
+    if eq and eq.archivo:
+        # el archivo se borra del disco sólo si ningún otro registro lo usa
         actualizar_equipo_archivo(id, "")
+        almacen.purgar()
     return redirect(f"/equipo/{id}")
 
 
 @app.route("/equipo/<int:equipo_id>/nuevo", methods=["GET", "POST"])
 @login_requerido
 def nuevo_componente(equipo_id):
+    if not obtener_equipo_por_id(equipo_id):
+        return redirect("/equipos")
     if request.method != "POST":
         return render_template("nuevo_componente.html", equipo_id=equipo_id)
     archivo = guardar_archivo_opcional(request.files.get("archivo"))
@@ -277,7 +505,7 @@ def editar_componente(comp_id, equipo_id):
     if request.method != "POST":
         return render_template("editar_componente.html", comp=comp, equipo_id=equipo_id)
 
-    archivo_final = comp[11] or ""
+    archivo_final = comp.archivo or ""
     nuevo = guardar_archivo_opcional(request.files.get("archivo"))
     if nuevo:
         archivo_final = nuevo
@@ -295,6 +523,8 @@ def editar_componente(comp_id, equipo_id):
         archivo_final,
     )
     actualizar_componente(comp_id, datos_update)
+    if nuevo:
+        almacen.purgar()
     return redirect(f"/equipo/{equipo_id}")
 
 
@@ -302,25 +532,19 @@ def editar_componente(comp_id, equipo_id):
 @login_requerido
 def eliminar_componente_route(comp_id, equipo_id):
     eliminar_componente(comp_id)
+    almacen.purgar()
     return redirect(f"/equipo/{equipo_id}")
 
 
 @app.route("/eliminar_archivo_componente/<int:comp_id>/<int:equipo_id>", methods=["POST"])
 @login_requerido
 def eliminar_archivo_componente(comp_id, equipo_id):
-    from pathlib import Path
     comp = obtener_componente_por_id(comp_id)
-    if comp and comp[11]:
-        fname = os.path.basename(str(comp[11]).replace("\\", "/"))
-        real = Path(UPLOAD_FOLDER) / fname
-        if real.exists():
-            try:
-                real.unlink()
-            except Exception as e:
-                print(f"No se pudo borrar {real}: {e}")
-        datos_update = (comp[2], comp[3], comp[4], comp[5], comp[6],
-                        comp[7], comp[8], comp[9], comp[10], "")
+    if comp and comp.archivo:
+        datos_update = (comp.software, comp.version, comp.serie_software, comp.id_producto, comp.llave,
+                        comp.proveedor, comp.aplica_proveedor, comp.fecha_compra, comp.fecha_vencimiento, "")
         actualizar_componente(comp_id, datos_update)
+        almacen.purgar()
     return redirect(f"/equipo/{equipo_id}")
 
 
@@ -328,8 +552,9 @@ def eliminar_archivo_componente(comp_id, equipo_id):
 @app.route("/impresoras")
 @login_requerido
 def ver_impresoras():
-    datos = obtener_todos("impresoras")
-    return render_template("dashboard_impresoras.html", datos=datos)
+    despues, antes, por_pagina = args_paginacion()
+    pagina = pagina_tabla("impresoras", despues_de=despues, antes_de=antes, limite=por_pagina)
+    return render_template("dashboard_impresoras.html", datos=pagina["filas"], pagina=pagina, por_pagina=por_pagina)
 
 
 @app.route("/nueva_impresora", methods=["GET", "POST"])
@@ -337,13 +562,20 @@ def ver_impresoras():
 def nueva_impresora():
     if request.method != "POST":
         return render_template("nueva_impresora.html")
+    try:
+        revisar_direcciones("impresoras")
+    except DireccionRepetida as e:
+        return render_template("nueva_impresora.html", conflictos=e.conflictos), 409
     archivo = guardar_archivo_opcional(request.files.get("archivo"))
     datos = (
         request.form.get("marca", ""), request.form.get("modelo", ""),
         request.form.get("mac", ""), request.form.get("ip", ""),
         request.form.get("serie", ""), request.form.get("area", ""), archivo
     )
-    guardar_impresora(datos)
+    try:
+        guardar_impresora(datos, permitir_repetidos=bool(request.form.get("permitir_repetidos")))
+    except DireccionRepetida as e:
+        return render_template("nueva_impresora.html", conflictos=e.conflictos), 409
     return redirect("/impresoras")
 
 
@@ -360,10 +592,15 @@ def editar_impresora(id):
         request.form.get("mac", ""), request.form.get("ip", ""),
         request.form.get("serie", ""), request.form.get("area", "")
     )
-    actualizar_impresora(id, datos)
+    try:
+        actualizar_impresora(id, datos, permitir_repetidos=bool(request.form.get("permitir_repetidos")))
+    except DireccionRepetida as e:
+        return render_template("editar_impresora.html", impresora=con_formulario(impresora),
+                               conflictos=e.conflictos), 409
     nuevo = guardar_archivo_opcional(request.files.get("archivo"))
     if nuevo:
         actualizar_impresora_archivo(id, nuevo)
+        almacen.purgar()
     return redirect("/impresoras")
 
 
@@ -371,6 +608,7 @@ def editar_impresora(id):
 @login_requerido
 def eliminar_impresora(id):
     eliminar_simple("impresoras", id)
+    almacen.purgar()
     return redirect("/impresoras")
 
 
@@ -378,34 +616,27 @@ def eliminar_impresora(id):
 @login_requerido
 def archivo_impresora(id):
     imp = obtener_impresora_por_id(id)
-    if not imp or len(imp) < 8 or not imp[7]:
+    if not imp or not imp.archivo:
         return "Archivo no encontrado", 404
-    fname = os.path.basename(str(imp[7]).replace("\\", "/"))
-    return send_from_directory(UPLOAD_FOLDER, fname)
+    return enviar_adjunto(imp.archivo)
 
 
 @app.route("/impresora/<int:id>/eliminar_archivo", methods=["POST"])
 @login_requerido
 def eliminar_archivo_impresora(id):
-    from pathlib import Path
     imp = obtener_impresora_por_id(id)
-    if imp and imp[7]:
-        fname = os.path.basename(str(imp[7]).replace("\\", "/"))
-        real = Path(UPLOAD_FOLDER) / fname
-        if real.exists():
-            try:
-                real.unlink()
-            except Exception as e:
-                print(f"No se pudo borrar {real}: {e}")
+    if imp and imp.archivo:
         actualizar_impresora_archivo(id, "")
+        almacen.purgar()
     return redirect("/impresoras")
 
 
 @app.route("/camaras")
 @login_requerido
 def ver_camaras():
-    datos = obtener_todos("camaras")
-    return render_template("dashboard_camaras.html", datos=datos)
+    despues, antes, por_pagina = args_paginacion()
+    pagina = pagina_tabla("camaras", despues_de=despues, antes_de=antes, limite=por_pagina)
+    return render_template("dashboard_camaras.html", datos=pagina["filas"], pagina=pagina, por_pagina=por_pagina)
 
 
 @app.route("/nueva_camara", methods=["GET", "POST"])
@@ -413,6 +644,10 @@ def ver_camaras():
 def nueva_camara():
     if request.method != "POST":
         return render_template("nueva_camara.html")
+    try:
+        revisar_direcciones("camaras")
+    except DireccionRepetida as e:
+        return render_template("nueva_camara.html", conflictos=e.conflictos), 409
     archivo = guardar_archivo_opcional(request.files.get("archivo"))
     datos = (
         request.form.get("marca",""), request.form.get("modelo",""),
@@ -420,7 +655,10 @@ def nueva_camara():
         request.form.get("serie",""), request.form.get("area",""),
         request.form.get("estado",""), archivo
     )
-    guardar_camara(datos)
+    try:
+        guardar_camara(datos, permitir_repetidos=bool(request.form.get("permitir_repetidos")))
+    except DireccionRepetida as e:
+        return render_template("nueva_camara.html", conflictos=e.conflictos), 409
     return redirect("/camaras")
 
 
@@ -438,7 +676,10 @@ def editar_camara(id):
         request.form.get("serie",""), request.form.get("area",""),
         request.form.get("estado","")
     )
-    actualizar_camara(id, datos)
+    try:
+        actualizar_camara(id, datos, permitir_repetidos=bool(request.form.get("permitir_repetidos")))
+    except DireccionRepetida as e:
+        return render_template("editar_camara.html", camara=con_formulario(cam), conflictos=e.conflictos), 409
     return redirect("/camaras")
 
 
@@ -446,14 +687,16 @@ def editar_camara(id):
 @login_requerido
 def eliminar_camara(id):
     eliminar_simple("camaras", id)
+    almacen.purgar()
     return redirect("/camaras")
 
 
 @app.route("/otros")
 @login_requerido
 def ver_otros():
-    datos = obtener_todos("otros")
-    return render_template("dashboard_otros.html", datos=datos)
+    despues, antes, por_pagina = args_paginacion()
+    pagina = pagina_tabla("otros", despues_de=despues, antes_de=antes, limite=por_pagina, tipo=OtroListado)
+    return render_template("dashboard_otros.html", datos=pagina["filas"], pagina=pagina, por_pagina=por_pagina)
 
 
 @app.route("/nuevo_otro", methods=["GET", "POST"])
@@ -461,6 +704,10 @@ def ver_otros():
 def nuevo_otro():
     if request.method != "POST":
         return render_template("nuevo_otro.html")
+    try:
+        revisar_direcciones("otros")
+    except DireccionRepetida as e:
+        return render_template("nuevo_otro.html", conflictos=e.conflictos), 409
     archivo = guardar_archivo_opcional(request.files.get("archivo"))
     datos = (
         request.form.get("nombre","").strip(),
@@ -469,7 +716,10 @@ def nuevo_otro():
         request.form.get("serie",""), request.form.get("area",""),
         request.form.get("descripcion",""), archivo
     )
-    guardar_otro(datos)
+    try:
+        guardar_otro(datos, permitir_repetidos=bool(request.form.get("permitir_repetidos")))
+    except DireccionRepetida as e:
+        return render_template("nuevo_otro.html", conflictos=e.conflictos), 409
     return redirect("/otros")
 
 
@@ -489,11 +739,15 @@ def editar_otro(id):
         request.form.get("serie",""), request.form.get("area",""),
         request.form.get("descripcion","")
     )
-    actualizar_otro(id, datos)
+    try:
+        actualizar_otro(id, datos, permitir_repetidos=bool(request.form.get("permitir_repetidos")))
+    except DireccionRepetida as e:
+        return render_template("editar_otro.html", otro=con_formulario(otro), conflictos=e.conflictos), 409
 
     nuevo = guardar_archivo_opcional(request.files.get("archivo"))
     if nuevo:
         actualizar_otro_archivo(id, nuevo)
+        almacen.purgar()
     return redirect("/otros")
 
 
@@ -501,6 +755,7 @@ def editar_otro(id):
 @login_requerido
 def eliminar_otro(id):
     eliminar_simple("otros", id)
+    almacen.purgar()
     return redirect("/otros")
 
 
@@ -508,95 +763,298 @@ def eliminar_otro(id):
 @login_requerido
 def archivo_otro(id):
     otro = obtener_otro_por_id(id)
-    if not otro or len(otro) < 10 or not otro[9]:
+    if not otro or not otro.archivo:
         return "Archivo no encontrado", 404
-    fname = os.path.basename(str(otro[9]).replace("\\", "/"))
-    return send_from_directory(UPLOAD_FOLDER, fname)
+    return enviar_adjunto(otro.archivo)
 
 
 @app.route("/otro/<int:id>/eliminar_archivo", methods=["POST"])
 @login_requerido
 def eliminar_archivo_otro(id):
-    from pathlib import Path
     otro = obtener_otro_por_id(id)
-    if otro and len(otro) >= 10 and otro[9]:
-        fname = os.path.basename(str(otro[9]).replace("\\", "/"))
-        real = Path(UPLOAD_FOLDER) / fname
-        if real.exists():
-            try:
-                real.unlink()
-            except Exception as e:
-                print(f"No se pudo borrar {real}: {e}")
+    if otro and otro.archivo:
         actualizar_otro_archivo(id, "")
+        almacen.purgar()
     return redirect("/otros")
 
+def responder_pdf(nombre):
+    """PDF al día => redirige directo; si no, lo genera en segundo plano y muestra el progreso."""
+    from cache_reportes import pdf_al_dia
+    from trabajos import enviar_reporte_pdf
+    if pdf_al_dia(nombre):
+        return redirect(f"/static/reporte_{nombre}.pdf")
+    trabajo = enviar_reporte_pdf(nombre)
+    return render_template("trabajo_reporte.html", trabajo=trabajo, nombre=nombre)
+
+
+def estado_trabajo_json(trabajo):
+    datos = {k: trabajo[k] for k in ("id", "estado", "error", "progreso", "creado", "terminado")}
+    if isinstance(trabajo["resultado"], dict):
+        datos["resumen"] = trabajo["resultado"]
+    datos["estado_url"] = url_for("estado_trabajo", tid=trabajo["id"])
+    if trabajo["estado"] == "listo":
+        datos["descarga_url"] = url_for("descargar_trabajo", tid=trabajo["id"])
+    return datos
+
+
+@app.route("/trabajos/reporte/<nombre>", methods=["POST"])
+@login_requerido
+def nuevo_trabajo_reporte(nombre):
+    from pdfs import GENERADORES_PDF
+    from trabajos import enviar_reporte_pdf
+    if nombre not in GENERADORES_PDF:
+        abort(404)
+    return jsonify(estado_trabajo_json(enviar_reporte_pdf(nombre))), 202
+
+
+@app.route("/trabajos/<tid>")
+@login_requerido
+def estado_trabajo(tid):
+    from trabajos import obtener
+    trabajo = obtener(tid)
+    if not trabajo:
+        abort(404)
+    return jsonify(estado_trabajo_json(trabajo))
+
+
+@app.route("/trabajos/<tid>/descarga")
+@login_requerido
+def descargar_trabajo(tid):
+    from trabajos import obtener
+    trabajo = obtener(tid)
+    if not trabajo:
+        abort(404)
+    if trabajo["estado"] != "listo":
+        return jsonify(estado_trabajo_json(trabajo)), 409
+    ruta = trabajo["resultado"]
+    if isinstance(ruta, dict):
+        ruta = ruta.get("archivo")
+    if not ruta:
+        abort(404)
+    return send_file(os.path.abspath(ruta), as_attachment=ruta.endswith(".zip"))
+
+
+@app.route("/trabajos/reportes_componentes", methods=["POST"])
+@login_requerido
+def nuevo_trabajo_componentes():
+    """Todos los PDFs de componentes (un archivo por equipo) en un zip, en segundo plano."""
+    from trabajos import enviar_lote_componentes
+    return jsonify(estado_trabajo_json(enviar_lote_componentes())), 202
+
+
+@app.route("/equipo/<int:id>/reporte_componentes")
+@login_requerido
+def reporte_componentes_pdf(id):
+    from pdfs import generar_reporte_pdf_componentes
+    generar_reporte_pdf_componentes(id)
+    return redirect(f"/static/reporte_componentes_equipo_{id}.pdf")
+
+
+@app.route("/equipo/<int:id>/csv_componentes")
+@login_requerido
+def reporte_componentes_csv(id):
+    from pdfs import generar_reporte_csv_componentes
+    generar_reporte_csv_componentes(id)
+    return redirect(f"/static/reporte_componentes_equipo_{id}.csv")
+
+
+def responder_csv(nombre):
+    """CSV del reporte: el guardado si la tabla no cambió, si no se genera en streaming."""
+    from cache_reportes import reporte_csv
+    ruta, generador = reporte_csv(nombre)
+    if ruta:
+        return send_file(os.path.abspath(ruta), mimetype="text/csv", as_attachment=True,
+                         download_name=f"reporte_{nombre}.csv")
+    return Response(
+        generador,
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=reporte_{nombre}.csv"},
+    )
+
+
 @app.route("/reporte_equipos")
 @login_requerido
 def reporte_equipos_pdf():
-    from pdfs import generar_reporte_pdf_equipos
-    generar_reporte_pdf_equipos()
-    return redirect("/static/reporte_equipos.pdf")
+    return responder_pdf("equipos")
 
 
 @app.route("/csv_equipos")
 @login_requerido
 def reporte_equipos_csv():
-    from pdfs import generar_reporte_csv_equipos
-    generar_reporte_csv_equipos()
-    return redirect("/static/reporte_equipos.csv")
+    return responder_csv("equipos")
 
 
 @app.route("/reporte_impresoras")
 @login_requerido
 def reporte_impresoras_pdf():
-    from pdfs import generar_reporte_pdf_impresoras
-    generar_reporte_pdf_impresoras()
-    return redirect("/static/reporte_impresoras.pdf")
+    return responder_pdf("impresoras")
 
 
 @app.route("/csv_impresoras")
 @login_requerido
 def reporte_impresoras_csv():
-    from pdfs import generar_reporte_csv_impresoras
-    generar_reporte_csv_impresoras()
-    return redirect("/static/reporte_impresoras.csv")
+    return responder_csv("impresoras")
 
 
 @app.route("/reporte_camaras")
 @login_requerido
 def reporte_camaras_pdf():
-    from pdfs import generar_reporte_pdf_camaras
-    generar_reporte_pdf_camaras()
-    return redirect("/static/reporte_camaras.pdf")
+    return responder_pdf("camaras")
 
 
 @app.route("/csv_camaras")
 @login_requerido
 def reporte_camaras_csv():
-    from pdfs import generar_reporte_csv_camaras
-    generar_reporte_csv_camaras()
-    return redirect("/static/reporte_camaras.csv")
+    return responder_csv("camaras")
 
 
 @app.route("/reporte_otros")
 @login_requerido
 def reporte_otros_pdf():
-    from pdfs import generar_reporte_pdf_otros
-    generar_reporte_pdf_otros()
-    return redirect("/static/reporte_otros.pdf")
+    return responder_pdf("otros")
 
 
 @app.route("/csv_otros")
 @login_requerido
 def reporte_otros_csv():
-    from pdfs import generar_reporte_csv_otros
-    generar_reporte_csv_otros()
-    return redirect("/static/reporte_otros.csv")
+    return responder_csv("otros")
+
+@app.route("/miniatura/<path:filename>")
+@login_requerido
+def miniatura(filename):
+    valor = f"{almacen.UPLOAD_FOLDER}/{filename}".replace("\\", "/")
+    inmutable = almacen.obtener(valor) is not None
+    # Fuera del almacén sólo quedan los archivos viejos, sueltos en uploads/
+    if not inmutable and "/" in filename.replace("\\", "/"):
+        abort(404)
+    tamano = request.args.get("t", "mini")
+    ruta = miniaturas.obtener(valor, tamano)
+    if not ruta:
+        abort(404)
+    resp = send_file(os.path.abspath(ruta), mimetype="image/jpeg",
+                     etag=os.path.splitext(os.path.basename(ruta))[0],
+                     max_age=CACHE_INMUTABLE_SEG if inmutable else None)
+    resp.cache_control.public = False
+    resp.cache_control.private = True
+    if inmutable:
+        resp.cache_control.immutable = True
+    return resp
+
 
 @app.route("/uploads/<path:filename>")
 @login_requerido
 def descargar_upload(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    return enviar_adjunto(f"{almacen.UPLOAD_FOLDER}/{filename}".replace("\\", "/"), inmutable=True)
+
+
+@app.route("/importar", methods=["GET", "POST"])
+@login_requerido
+def importar():
+    from importar import COLUMNAS, abrir_texto, importar_csv
+    tablas = list(COLUMNAS)
+    if request.method != "POST":
+        return render_template("importar.html", tablas=tablas)
+    tabla = request.form.get("tabla", "")
+    archivo = request.files.get("archivo")
+    if tabla not in COLUMNAS or not archivo or not archivo.filename.strip():
+        return render_template("importar.html", tablas=tablas, error="Elige la tabla y el archivo CSV.")
+    resumen = importar_csv(tabla, abrir_texto(archivo.stream),
+                           permitir_repetidos=bool(request.form.get("permitir_repetidos")))
+    print(f"[IMPORT] {tabla}: {resumen['insertados']} filas, {len(resumen['errores'])} errores, "
+          f"{len(resumen['repetidos'])} con IP/MAC repetida, {resumen['filas_seg']:.0f} filas/s")
+    return render_template("importar.html", tablas=tablas, resumen=resumen)
+
+
+@app.cli.command("importar")
+@click.argument("tabla")
+@click.argument("archivo", type=click.Path(exists=True, dir_okay=False))
+@click.option("--permitir-repetidos", is_flag=True, help="Cargar también las filas con IP o MAC ya usada.")
+def importar_cli(tabla, archivo, permitir_repetidos):
+    """Carga un CSV en equipos, componentes, impresoras, camaras u otros."""
+    from importar import importar_csv
+    with open(archivo, encoding="utf-8-sig", newline="") as f:
+        resumen = importar_csv(tabla, f, permitir_repetidos=permitir_repetidos)
+    for linea, error in resumen["errores"]:
+        print(f"  línea {linea}: {error}")
+    for linea, aviso in resumen["repetidos"]:
+        print(f"  línea {linea} (cargada): {aviso}")
+    if resumen["ignoradas"]:
+        print(f"  columnas ignoradas: {', '.join(resumen['ignoradas'])}")
+    print(f"[IMPORT] {tabla}: {resumen['insertados']} insertados, {len(resumen['errores'])} con error, "
+          f"{resumen['segundos']:.2f}s ({resumen['filas_seg']:.0f} filas/s)")
+
+
+@app.cli.command("reportes-componentes")
+@click.option("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por CPU).")
+@click.option("--zip", "zip_path", default=None, help="Juntar los PDFs en este archivo zip.")
+def reportes_componentes_cli(procesos, zip_path):
+    """Genera reporte_componentes_equipo_N.pdf para todos los equipos con componentes."""
+    from lote_reportes import generar_reportes_componentes
+
+    def progreso(hechos, total):
+        print(f"\r  {hechos}/{total}", end="", flush=True)
+
+    resumen = generar_reportes_componentes(procesos=procesos, zip_path=zip_path, progreso=progreso)
+    print()
+    for pid, datos in resumen["por_proceso"].items():
+        print(f"  proceso {pid}: {datos['reportes']} reportes, {datos['segundos']:.2f}s")
+    print(f"[LOTE] {resumen['reportes']} reportes en {resumen['segundos']:.2f}s"
+          + (f" -> {resumen['archivo']}" if resumen["archivo"] else ""))
+
+
+@app.cli.command("barrer")
+@click.argument("red")
+@click.option("--concurrencia", type=int, default=None, help="Conexiones simultáneas (por defecto 256).")
+@click.option("--timeout", type=float, default=None, help="Segundos de espera por conexión.")
+@click.option("--arp", "archivo_arp", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="En vez de barrer, importar este volcado de `arp -a`.")
+def barrer_cli(red, concurrencia, timeout, archivo_arp):
+    """Barre RED (CIDR) y muestra lo que no coincide con el inventario."""
+    import descubrimiento as d
+    if archivo_arp:
+        with open(archivo_arp, encoding="utf-8", errors="replace") as f:
+            d.importar_arp(f.read(), red)
+    else:
+        d.barrer(red, concurrencia=concurrencia or d.CONCURRENCIA, timeout=timeout or d.TIMEOUT_SEG)
+    reporte = d.conciliar(red)
+    for ip, mac, puerto in reporte["sin_registrar"]:
+        print(f"  sin registrar   {ip:<15} {mac or '':<17} {puerto or ''}")
+    for tabla, rid, nombre, ip, visto in reporte["sin_respuesta"]:
+        print(f"  sin respuesta   {ip:<15} {tabla} #{rid} {nombre or ''} (visto: {visto or 'nunca'})")
+    for tabla, rid, nombre, ip, mac, vista in reporte["mac_distinta"]:
+        print(f"  MAC distinta    {ip:<15} {tabla} #{rid} {nombre or ''}: {mac} en inventario, {vista} en la red")
+
+
+@app.cli.command("compactar-cambios")
+@click.option("--dias", type=int, default=None, help="Conservar las bajas de los últimos N días.")
+def compactar_cambios_cli(dias):
+    """Compacta el registro de cambios que usa /api/v1/cambios."""
+    from mi_modelo import DIAS_BAJAS, compactar_cambios
+    compactar_cambios(DIAS_BAJAS if dias is None else dias)
+
+
+@app.cli.command("migrar-archivos")
+def migrar_archivos_cli():
+    """Pasa al almacén por contenido los adjuntos guardados con el esquema viejo (static/uploads/<nombre>)."""
+    if not almacen.migrar_legado():
+        print("[MIGRACION] no hay archivos por migrar")
+
+
+@app.cli.command("reindexar")
+def reindexar():
+    """Reconstruye el índice de búsqueda de equipos (equipos_fts)."""
+    reconstruir_indice_busqueda()
+    print("[FTS] índice de equipos reconstruido")
+
+
+@app.route("/metrics")
+def ver_metricas():
+    if not session.get("usuario"):
+        token = app.config["METRICS_TOKEN"]
+        enviado = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not token or not hmac.compare_digest(enviado.encode(), token.encode()):
+            return Response("No autorizado\n", 401, {"WWW-Authenticate": "Bearer"}, mimetype="text/plain")
+    return Response(metricas.texto_prometheus(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/routes")
@@ -0,0 +1,7 @@
+# benchmark — mide mi_modelo, los reportes de pdfs.py y las rutas con datos sintéticos
+#
+#   python -m benchmark --equipos 10000 --salida bench_10k.json
+#   python -m benchmark --equipos 100000 --repeticiones 3 --salida bench_100k.json
+#   python -m benchmark comparar bench_antes.json bench_despues.json
+#
+# Trabaja sobre una base nueva en un directorio temporal; datos.db no se toca.
@@ -0,0 +1,173 @@
+# python -m benchmark [--equipos N] [--semilla S] [--repeticiones R] [--salida archivo.json]
+# python -m benchmark comparar antes.json despues.json
+# python -m benchmark pdf [--filas 1000 10000 50000] [--reporte equipos] [--salida archivo.json]
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Los módulos de la app se importan como en app.py (carpeta del proyecto en sys.path).
+PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROYECTO)
+
+
+def _revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROYECTO,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _correr_grupo(nombre, casos, repeticiones):
+    from benchmark.medir import medir
+    resultados = {}
+    print(f"== {nombre} ({len(casos)})")
+    for caso, funcion, preparar in casos:
+        try:
+            resultados[caso] = medir(funcion, repeticiones, preparar)
+            print(f"  {caso:<45} {resultados[caso]['mediana_ms']:>10.2f} ms")
+        except Exception as e:
+            resultados[caso] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"  {caso:<45} ERROR {e}")
+    return resultados
+
+
+def correr(args):
+    directorio = tempfile.mkdtemp(prefix="bench_inventario_")
+    os.chdir(directorio)     # static/ (reportes, uploads) queda en el temporal
+
+    import mi_modelo
+    mi_modelo.DB_PATH = os.path.join(directorio, "datos.db")
+    mi_modelo.init_db()
+
+    from benchmark.datos import Generador, poblar
+    inicio = time.perf_counter()
+    cantidades = poblar(args.equipos, args.semilla)
+    segundos_poblar = time.perf_counter() - inicio
+    total = sum(cantidades.values())
+    print(f"[BENCH] {total} filas en {segundos_poblar:.1f}s ({total / segundos_poblar:.0f} filas/s) -> {directorio}")
+
+    import app as app_modulo
+    from benchmark.medir import casos_modelo, casos_reportes, casos_rutas
+    cliente = app_modulo.app.test_client()
+    with cliente.session_transaction() as s:
+        s["usuario"] = "admin"
+
+    # Las escrituras medidas usan IPs y MACs que no están en la base: si no,
+    # guardar_*/actualizar_* las rechazan por repetidas.
+    g = Generador(args.semilla + 1, redes=(f"172.{a}.{b}" for a in range(16, 32) for b in range(256)),
+                  ouis=("02:00:00",))
+    resultados = {
+        "poblar": {"segundos": round(segundos_poblar, 3), "filas_seg": round(total / segundos_poblar)},
+        "modelo": _correr_grupo("mi_modelo", casos_modelo(g), args.repeticiones),
+        "reportes": _correr_grupo("pdfs", casos_reportes(min(mi_modelo.ids_equipos())), args.rep_reportes),
+        "rutas": _correr_grupo("rutas", casos_rutas(cliente), args.repeticiones),
+    }
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "revision": _revision(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "plataforma": platform.platform(),
+        "parametros": {"equipos": args.equipos, "semilla": args.semilla,
+                       "repeticiones": args.repeticiones, "rep_reportes": args.rep_reportes},
+        "filas": cantidades,
+        "resultados": resultados,
+    }
+
+
+def comparar(antes, despues, umbral=1.2):
+    """Imprime la razón despues/antes de la mediana de cada caso; marca las que empeoran más de umbral."""
+    a = json.load(open(antes, encoding="utf-8"))
+    b = json.load(open(despues, encoding="utf-8"))
+    print(f"{antes} ({a.get('revision')}) -> {despues} ({b.get('revision')})")
+    peores = 0
+    for grupo in ("modelo", "reportes", "rutas"):
+        print(f"== {grupo}")
+        for caso, rb in b["resultados"].get(grupo, {}).items():
+            ra = a["resultados"].get(grupo, {}).get(caso)
+            if not ra or "mediana_ms" not in ra or "mediana_ms" not in rb:
+                continue
+            razon = rb["mediana_ms"] / ra["mediana_ms"] if ra["mediana_ms"] else float("inf")
+            marca = "  <-- más lento" if razon > umbral else ""
+            peores += bool(marca)
+            print(f"  {caso:<45} {ra['mediana_ms']:>10.2f} -> {rb['mediana_ms']:>10.2f} ms  x{razon:.2f}{marca}")
+    return peores
+
+
+def comparar_pdf(args):
+    """Los dos modos de pdfs._crear_tabla_pdf con la misma cantidad de filas, cada caso en un proceso nuevo."""
+    from concurrent.futures import ProcessPoolExecutor
+    os.chdir(tempfile.mkdtemp(prefix="bench_pdf_"))      # pdfs crea static/ al importarse
+    from benchmark.medir import medir_pdf
+    resultados = {}
+    print(f"== pdf[{args.reporte}]  {'filas':>7} {'modo':<9} {'segundos':>9} {'páginas':>8} {'KB':>7} {'memoria MB':>11}")
+    for filas in args.filas:
+        for modo in ("parrafos", "rapido"):
+            with ProcessPoolExecutor(max_workers=1) as ex:
+                r = ex.submit(medir_pdf, args.reporte, modo, filas, args.semilla).result()
+            resultados[f"{modo}[{filas}]"] = r
+            print(f"  {'':<13} {filas:>7} {modo:<9} {r['segundos']:>9.2f} {r['paginas']:>8} {r['kb']:>7} "
+                  f"{r['memoria_mb'] if r['memoria_mb'] is not None else '-':>11}")
+        antes, despues = resultados[f"parrafos[{filas}]"], resultados[f"rapido[{filas}]"]
+        print(f"  {'':<13} {filas:>7} x{antes['segundos'] / despues['segundos']:.1f} más rápido")
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "revision": _revision(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {"reporte": args.reporte, "filas": args.filas, "semilla": args.semilla},
+        "resultados": resultados,
+    }
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "pdf":
+        p = argparse.ArgumentParser(prog="python -m benchmark pdf",
+                                    description="PDF con filas sintéticas: modo parrafos contra modo rapido.")
+        p.add_argument("--filas", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+        p.add_argument("--reporte", default="equipos", choices=("equipos", "impresoras", "camaras", "otros"))
+        p.add_argument("--semilla", type=int, default=1234)
+        p.add_argument("--salida", default=None, help="Archivo JSON (opcional).")
+        a = p.parse_args(sys.argv[2:])
+        salida = a.salida and os.path.abspath(a.salida)
+        datos = comparar_pdf(a)
+        if salida:
+            with open(salida, "w", encoding="utf-8") as f:
+                json.dump(datos, f, ensure_ascii=False, indent=2)
+            print(f"[BENCH] resultados -> {salida}")
+        return
+
+    if len(sys.argv) > 1 and sys.argv[1] == "comparar":
+        p = argparse.ArgumentParser(prog="python -m benchmark comparar")
+        p.add_argument("antes")
+        p.add_argument("despues")
+        p.add_argument("--umbral", type=float, default=1.2)
+        a = p.parse_args(sys.argv[2:])
+        sys.exit(1 if comparar(a.antes, a.despues, a.umbral) else 0)
+
+    p = argparse.ArgumentParser(prog="python -m benchmark", description="Benchmark con inventario sintético.")
+    p.add_argument("--equipos", type=int, default=10_000)
+    p.add_argument("--semilla", type=int, default=1234)
+    p.add_argument("--repeticiones", type=int, default=5)
+    p.add_argument("--rep-reportes", type=int, default=1, help="Repeticiones para PDF/CSV (son lentos).")
+    p.add_argument("--salida", default=None, help="Archivo JSON (por defecto benchmark_<equipos>.json).")
+    args = p.parse_args()
+
+    salida = os.path.abspath(args.salida or f"benchmark_{args.equipos}.json")
+    datos = correr(args)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(datos, f, ensure_ascii=False, indent=2)
+    print(f"[BENCH] resultados -> {salida}")
+
+
+if __name__ == "__main__":
+    main()
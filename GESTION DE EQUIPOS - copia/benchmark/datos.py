@@ -0,0 +1,145 @@
+# benchmark/datos.py — inventario sintético reproducible (misma semilla => mismos datos)
+
+import itertools
+import random
+from datetime import date, timedelta
+
+from importar import COLUMNAS
+from mi_modelo import ids_equipos, insertar_lote
+
+LOTE = 2000
+
+EMPRESAS = ("Silicatos", "Silcomer")
+AREAS = ("Administración", "Bodega", "Producción", "Ventas", "Gerencia", "Sistemas", "Laboratorio", "Portería")
+MARCAS_PC = (("Dell", ("OptiPlex 7090", "Latitude 5420", "Vostro 3510")),
+             ("HP", ("ProDesk 400", "EliteBook 840", "ProBook 450")),
+             ("Lenovo", ("ThinkCentre M70", "ThinkPad T14", "IdeaPad 5")))
+MARCAS_IMPRESORA = (("HP", ("LaserJet M404", "OfficeJet 9015")), ("Epson", ("L3250", "WF-C5790")),
+                    ("Brother", ("HL-L2350", "MFC-L8900")))
+MARCAS_CAMARA = (("Hikvision", ("DS-2CD2043", "DS-2CD1123")), ("Dahua", ("IPC-HFW2431", "IPC-HDW1230")))
+MARCAS_OTRO = (("Ubiquiti", ("UniFi AP AC", "EdgeRouter X")), ("Cisco", ("SG350-28", "CBS250")),
+               ("APC", ("Back-UPS 1500", "Smart-UPS 750")))
+SOFTWARE = (("Microsoft Office", "2021", "Microsoft"), ("Windows", "11 Pro", "Microsoft"),
+            ("Symantec Endpoint", "14.3", "Broadcom"), ("AutoCAD", "2024", "Autodesk"),
+            ("Adobe Acrobat", "DC", "Adobe"), ("SAP GUI", "7.70", "SAP"))
+OUIS = ("00:1A:2B", "3C:52:82", "F4:8E:38", "00:0C:29", "B8:27:EB", "AC:DE:48")
+NOMBRES = ("Ana", "Luis", "María", "Jorge", "Carla", "Pedro", "Sofía", "Diego", "Valeria", "Andrés")
+APELLIDOS = ("Pérez", "Gómez", "Rodríguez", "López", "Martínez", "Sánchez", "Vera", "Mora")
+
+
+class Generador:
+    """
+    Produce filas con las mismas columnas que importar.COLUMNAS. Las IPs salen
+    de redes /24 privadas sin repetirse (como en una red real); cuando se acaban
+    se abre otra red. `redes` (prefijos /24) y `ouis` permiten generar
+    direcciones que no choquen con las de otro generador.
+    """
+
+    def __init__(self, semilla=1234, redes=None, ouis=OUIS):
+        self.rnd = random.Random(semilla)
+        self._redes = iter(redes) if redes is not None else itertools.chain(
+            (f"192.168.{b}" for b in range(1, 255)),
+            (f"10.{a}.{b}" for a in range(256) for b in range(256)))
+        self._ouis = ouis
+        self._red = next(self._redes)
+        self._host = 9
+        self._serie = 0
+
+    def ip(self, vacia=0.03):
+        if self.rnd.random() < vacia:
+            return ""
+        self._host += 1
+        if self._host > 254:
+            self._red, self._host = next(self._redes), 10
+        return f"{self._red}.{self._host}"
+
+    def mac(self):
+        return self.rnd.choice(self._ouis) + "".join(f":{self.rnd.randrange(256):02X}" for _ in range(3))
+
+    def serie(self, prefijo):
+        self._serie += 1
+        return f"{prefijo}{self._serie:07d}"
+
+    def fecha(self, desde_dias=1800, hasta_dias=0):
+        return (date.today() - timedelta(days=self.rnd.randint(hasta_dias, desde_dias))).isoformat()
+
+    def persona(self):
+        return f"{self.rnd.choice(NOMBRES)} {self.rnd.choice(APELLIDOS)}"
+
+    def equipo(self, n):
+        marca, modelos = self.rnd.choice(MARCAS_PC)
+        usuario = self.persona()
+        si_no = lambda p: "Si" if self.rnd.random() < p else "No"
+        return {
+            "nombre": f"PC-{self.rnd.choice(AREAS)[:4].upper()}-{n:05d}", "num_factura": f"F-{self.rnd.randrange(10**6):06d}",
+            "mac": self.mac(), "ip": self.ip(), "marca": marca, "modelo": self.rnd.choice(modelos),
+            "serie": self.serie("SN"), "fecha_compra": self.fecha(),
+            "usuario_asignado": usuario, "usuario_dominio": usuario.lower().replace(" ", "."),
+            "en_dominio": si_no(0.9), "tiene_symantec": si_no(0.8), "bitlocker": si_no(0.6),
+            "conectada_internet": si_no(0.95), "fecha_registro": self.fecha(700),
+            "empresa": self.rnd.choice(EMPRESAS), "activo": 1 if self.rnd.random() < 0.9 else 0,
+        }
+
+    def componente(self, equipo_id):
+        software, version, proveedor = self.rnd.choice(SOFTWARE)
+        vence = (date.today() + timedelta(days=self.rnd.randint(-200, 700))).isoformat() if self.rnd.random() < 0.7 else ""
+        return {
+            "equipo_id": equipo_id, "software": software, "version": version,
+            "serie_software": self.serie("SW"), "id_producto": f"{self.rnd.randrange(10**5):05d}-OEM",
+            "llave": "-".join(f"{self.rnd.randrange(36**5):05X}"[:5] for _ in range(5)),
+            "proveedor": proveedor, "aplica_proveedor": "Si" if vence else "No",
+            "fecha_compra": self.fecha(), "fecha_vencimiento": vence,
+        }
+
+    def _dispositivo(self, marcas, prefijo):
+        marca, modelos = self.rnd.choice(marcas)
+        return {"marca": marca, "modelo": self.rnd.choice(modelos), "mac": self.mac(), "ip": self.ip(),
+                "serie": self.serie(prefijo), "area": self.rnd.choice(AREAS)}
+
+    def impresora(self):
+        return self._dispositivo(MARCAS_IMPRESORA, "PR")
+
+    def camara(self):
+        d = self._dispositivo(MARCAS_CAMARA, "CA")
+        d["estado"] = self.rnd.choice(("Operativa", "Operativa", "Operativa", "Sin señal", "En reparación"))
+        return d
+
+    def otro(self):
+        d = self._dispositivo(MARCAS_OTRO, "OT")
+        d["nombre"] = f"{d['marca']} {d['modelo']}"
+        d["descripcion"] = f"Equipo de red en {d['area']}"
+        return d
+
+
+def _cargar(tabla, registros):
+    """Inserta por lotes con insertar_lote; devuelve cuántas filas cargó."""
+    columnas = list(COLUMNAS[tabla])
+    lote, total = [], 0
+    for r in registros:
+        lote.append(tuple(r.get(c, COLUMNAS[tabla][c]) for c in columnas))
+        if len(lote) >= LOTE:
+            insertar_lote(tabla, columnas, lote)
+            total += len(lote)
+            lote = []
+    if lote:
+        insertar_lote(tabla, columnas, lote)
+        total += len(lote)
+    return total
+
+
+def poblar(equipos=10_000, semilla=1234, componentes_por_equipo=3):
+    """
+    Llena la base actual (mi_modelo.DB_PATH) con `equipos` equipos y, en
+    proporción, componentes, impresoras (5 %), cámaras (5 %) y otros (10 %).
+    Devuelve la cantidad insertada por tabla.
+    """
+    g = Generador(semilla)
+    cantidades = {"equipos": _cargar("equipos", (g.equipo(n) for n in range(1, equipos + 1)))}
+    cantidades["componentes"] = _cargar("componentes", (
+        g.componente(eid) for eid in sorted(ids_equipos())
+        for _ in range(g.rnd.randint(0, 2 * componentes_por_equipo))
+    ))
+    cantidades["impresoras"] = _cargar("impresoras", (g.impresora() for _ in range(max(1, equipos // 20))))
+    cantidades["camaras"] = _cargar("camaras", (g.camara() for _ in range(max(1, equipos // 20))))
+    cantidades["otros"] = _cargar("otros", (g.otro() for _ in range(max(1, equipos // 10))))
+    return cantidades
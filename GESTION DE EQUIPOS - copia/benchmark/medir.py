@@ -0,0 +1,253 @@
+# benchmark/medir.py — cronómetro y listas de lo que se mide
+
+import os
+import statistics
+import time
+
+import mi_modelo as m
+import pdfs
+
+
+def medir(funcion, repeticiones=5, preparar=None):
+    """
+    Ejecuta funcion repeticiones veces y devuelve tiempos en ms. Si hay
+    preparar(), se llama antes de cada vuelta (fuera del cronómetro) y lo que
+    devuelve se pasa como argumentos a funcion. "primera" es la vuelta en frío.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        args = preparar() if preparar else ()
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        if hasattr(resultado, "__next__"):
+            for _ in resultado:     # generadores (iterar_tabla, csv_streaming): consumir todo
+                pass
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        "n": len(tiempos),
+        "primera_ms": round(tiempos[0], 3),
+        "min_ms": round(min(tiempos), 3),
+        "mediana_ms": round(statistics.median(tiempos), 3),
+        "media_ms": round(statistics.fmean(tiempos), 3),
+        "max_ms": round(max(tiempos), 3),
+    }
+
+
+def _ids(tabla):
+    with m.consulta() as c:
+        c.execute(f"SELECT MIN(id), MAX(id) FROM {tabla}")
+        return c.fetchone()
+
+
+def _datos_equipo(g, n):
+    e = g.equipo(n)
+    return (e["nombre"], e["num_factura"], e["mac"], e["ip"], e["marca"], e["modelo"], e["serie"],
+            e["fecha_compra"], e["usuario_asignado"], e["usuario_dominio"], e["en_dominio"],
+            e["tiene_symantec"], e["bitlocker"], e["conectada_internet"])
+
+
+def casos_modelo(g):
+    """(nombre, funcion, preparar) para cada función pública de mi_modelo."""
+    eq_min, eq_max = _ids("equipos")
+    eq_medio = (eq_min + eq_max) // 2
+    imp = _ids("impresoras")[1]
+    cam = _ids("camaras")[1]
+    otro = _ids("otros")[1]
+    with m.consulta() as c:
+        c.execute("SELECT id FROM componentes ORDER BY id DESC LIMIT 1")
+        comp = c.fetchone()[0]
+        c.execute("SELECT ip FROM equipos WHERE ip != '' ORDER BY id LIMIT 1 OFFSET ?", ((eq_max - eq_min) // 2,))
+        ip = c.fetchone()[0]
+    red = ip.rsplit(".", 1)[0] + ".0/24"
+    if not m.obtener_subredes():
+        # plan de IPs: las escrituras también actualizan sus contadores
+        m.guardar_subred(red, "benchmark")
+        m.guardar_subred("192.168.0.0/16", "benchmark /16")
+    contador = iter(range(10**9, 2 * 10**9))
+
+    def nuevo(tabla, guardar, fila):
+        """preparar() para los borrados: crea un registro y devuelve su id."""
+        def preparar():
+            guardar(fila())
+            return (_ids(tabla)[1],)
+        return preparar
+
+    def d_equipo():
+        return _datos_equipo(g, next(contador)) + ("", "2025-01-01", "Silicatos")
+
+    def d_componente():
+        c = g.componente(eq_min)
+        return (eq_min, c["software"], c["version"], c["serie_software"], c["id_producto"], c["llave"],
+                c["proveedor"], c["aplica_proveedor"], c["fecha_compra"], c["fecha_vencimiento"], "")
+
+    def d_impresora():
+        d = g.impresora()
+        return (d["marca"], d["modelo"], d["mac"], d["ip"], d["serie"], d["area"], "")
+
+    def d_camara():
+        d = g.camara()
+        return (d["marca"], d["modelo"], d["mac"], d["ip"], d["serie"], d["area"], d["estado"], "")
+
+    def d_otro():
+        d = g.otro()
+        return (d["nombre"], d["marca"], d["modelo"], d["mac"], d["ip"], d["serie"], d["area"], d["descripcion"], "")
+
+    return [
+        ("version_tabla", lambda: m.version_tabla("equipos"), None),
+        ("obtener_todos[equipos]", lambda: m.obtener_todos("equipos"), None),
+        ("obtener_todos[componentes]", lambda: m.obtener_todos("componentes"), None),
+        ("iterar_tabla[equipos]", lambda: m.iterar_tabla("equipos"), None),
+        ("pagina_tabla[impresoras]", lambda: m.pagina_tabla("impresoras"), None),
+        ("pagina_tabla[otros, última]", lambda: m.pagina_tabla("otros", antes_de=otro + 1), None),
+        ("obtener_equipo_por_id", lambda: m.obtener_equipo_por_id(eq_medio), None),
+        ("obtener_componentes_por_equipo", lambda: m.obtener_componentes_por_equipo(eq_medio), None),
+        ("ids_equipos", m.ids_equipos, None),
+        ("contar_equipos", m.contar_equipos, None),
+        ("buscar_equipos[nombre]", lambda: m.buscar_equipos("PC-VENT", limite=50), None),
+        ("buscar_equipos[usuario]", lambda: m.buscar_equipos("maría", limite=50), None),
+        ("buscar_equipos[empresa]", lambda: m.buscar_equipos("", empresa="Silcomer", limite=50), None),
+        ("pagina_equipos", lambda: m.pagina_equipos("", limite=50), None),
+        ("pagina_equipos[q, siguiente]", lambda: m.pagina_equipos("PC", despues_de=eq_medio, limite=50), None),
+        ("componentes_con_equipo", m.componentes_con_equipo, None),
+        ("componentes_con_equipo[10 equipos]", lambda: m.componentes_con_equipo(range(eq_min, eq_min + 10)), None),
+        ("obtener_componente_por_id", lambda: m.obtener_componente_por_id(comp), None),
+        ("obtener_impresora_por_id", lambda: m.obtener_impresora_por_id(imp), None),
+        ("obtener_camara_por_id", lambda: m.obtener_camara_por_id(cam), None),
+        ("obtener_otro_por_id", lambda: m.obtener_otro_por_id(otro), None),
+        ("buscar_por_ip[exacta]", lambda: m.buscar_por_ip(ip), None),
+        ("buscar_por_ip[prefijo]", lambda: m.buscar_por_ip(ip.rsplit(".", 1)[0] + "."), None),
+        ("buscar_por_ip[contiene]", lambda: m.buscar_por_ip(ip.rsplit(".", 1)[1]), None),
+        ("obtener_ips_usadas", m.obtener_ips_usadas, None),
+        ("buscar_repetidos", lambda: m.buscar_repetidos("equipos", ip, "00:1A:2B:00:00:01"), None),
+        ("conflictos_direcciones", m.conflictos_direcciones, None),
+        ("plan_ips", m.plan_ips, None),
+        ("obtener_ips_libres", lambda: m.obtener_ips_libres(red), None),
+        ("ip_esta_libre", lambda: m.ip_esta_libre(ip), None),
+        ("rangos_ips_libres", lambda: m.rangos_ips_libres(red), None),
+        ("contar_ips_usadas", lambda: m.contar_ips_usadas(red), None),
+        ("obtener_ips_disponibles", lambda: m.obtener_ips_disponibles(ip.rsplit(".", 1)[0] + "."), None),
+        ("fecha_iso", lambda: m.fecha_iso("31/12/2025"), None),
+        # escrituras
+        ("guardar_equipo", lambda: m.guardar_equipo(d_equipo()), None),
+        ("actualizar_equipo", lambda: m.actualizar_equipo(eq_medio, _datos_equipo(g, eq_medio) + ("Silicatos",)), None),
+        ("actualizar_equipo_archivo", lambda: m.actualizar_equipo_archivo(eq_medio, ""), None),
+        ("set_equipo_activo", lambda: m.set_equipo_activo(eq_medio, 1), None),
+        ("eliminar_equipo", m.eliminar_equipo, nuevo("equipos", m.guardar_equipo, d_equipo)),
+        ("guardar_componente", lambda: m.guardar_componente(d_componente()), None),
+        ("actualizar_componente", lambda: m.actualizar_componente(comp, d_componente()[1:]), None),
+        ("set_componente_activo", lambda: m.set_componente_activo(comp, 1), None),
+        ("eliminar_componente", m.eliminar_componente, nuevo("componentes", m.guardar_componente, d_componente)),
+        ("guardar_impresora", lambda: m.guardar_impresora(d_impresora()), None),
+        ("actualizar_impresora", lambda: m.actualizar_impresora(imp, d_impresora()[:6]), None),
+        ("actualizar_impresora_archivo", lambda: m.actualizar_impresora_archivo(imp, ""), None),
+        ("guardar_camara", lambda: m.guardar_camara(d_camara()), None),
+        ("actualizar_camara", lambda: m.actualizar_camara(cam, d_camara()[:7]), None),
+        ("guardar_otro", lambda: m.guardar_otro(d_otro()), None),
+        ("actualizar_otro", lambda: m.actualizar_otro(otro, d_otro()[:8]), None),
+        ("actualizar_otro_archivo", lambda: m.actualizar_otro_archivo(otro, ""), None),
+        ("eliminar_simple[impresoras]", lambda i: m.eliminar_simple("impresoras", i), nuevo("impresoras", m.guardar_impresora, d_impresora)),
+        ("insertar_lote[otros x100]", lambda: m.insertar_lote(
+            "otros", ["nombre", "marca", "modelo", "mac", "ip", "serie", "area", "descripcion", "archivo"],
+            [d_otro() for _ in range(100)]), None),
+        ("reconstruir_indice_busqueda", m.reconstruir_indice_busqueda, None),
+    ]
+
+
+def medir_pdf(reporte, modo, filas, semilla=1234):
+    """
+    Arma con pdfs._crear_tabla_pdf el PDF de `reporte` con `filas` filas
+    sintéticas en `modo`. Hay que llamarla en un proceso nuevo por caso: el
+    pico de memoria (ru_maxrss) es el del proceso entero.
+    """
+    from benchmark.datos import Generador
+    titulos, a_fila, Registro = pdfs.REPORTES[reporte]
+    g = Generador(semilla)
+    crear = {"equipos": g.equipo, "impresoras": lambda n: g.impresora(),
+             "camaras": lambda n: g.camara(), "otros": lambda n: g.otro()}[reporte]
+    datos = [a_fila(Registro(*(d.get(c) for c in Registro._fields)))
+             for d in (crear(n) for n in range(1, filas + 1))]
+
+    inicio = time.perf_counter()
+    doc = pdfs._crear_tabla_pdf(reporte, titulos, datos, modo=modo)
+    segundos = time.perf_counter() - inicio
+    try:
+        import resource
+        memoria_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # KB en Linux
+    except ImportError:     # Windows
+        memoria_mb = None
+    return {"segundos": round(segundos, 3), "paginas": doc.page,
+            "kb": round(os.path.getsize(doc.filename) / 1024), "memoria_mb": memoria_mb and round(memoria_mb)}
+
+
+def casos_reportes(equipo_id):
+    """Generadores de pdfs.py (PDF y CSV por tabla, componentes de un equipo, CSV en streaming)."""
+    casos = []
+    for nombre, generar in pdfs.GENERADORES_PDF.items():
+        casos.append((f"pdf[{nombre}]", generar, None))
+        casos.append((f"csv[{nombre}]", getattr(pdfs, f"generar_reporte_csv_{nombre}"), None))
+        casos.append((f"csv_streaming[{nombre}]", lambda n=nombre: pdfs.csv_streaming(n), None))
+    casos.append(("pdf[componentes de un equipo]", lambda: pdfs.generar_reporte_pdf_componentes(equipo_id), None))
+    casos.append(("csv[componentes de un equipo]", lambda: pdfs.generar_reporte_csv_componentes(equipo_id), None))
+    return casos
+
+
+# Rutas GET que se miden. Las que borran o encolan trabajos (/eliminar_*,
+# /reporte_*, /trabajos/*) no entran: sus generadores se miden en casos_reportes.
+def casos_rutas(cliente):
+    eq_min, eq_max = _ids("equipos")
+    eq = (eq_min + eq_max) // 2
+    with m.consulta() as c:
+        c.execute("SELECT ip FROM equipos WHERE id >= ? AND ip != '' LIMIT 1", (eq,))
+        ip = c.fetchone()[0]
+        c.execute("SELECT id, equipo_id FROM componentes WHERE equipo_id >= ? LIMIT 1", (eq,))
+        comp, comp_eq = c.fetchone()
+    red = ip.rsplit(".", 1)[0] + ".0/24"
+    urls = [
+        ("dashboard", "/"),
+        ("dashboard[ip]", f"/?ip={ip}"),
+        ("dashboard[ip prefijo]", f"/?ip={ip.rsplit('.', 1)[0]}."),
+        ("ips_disponibles", f"/ips_disponibles?red={red}"),
+        ("conflictos", "/conflictos"),
+        ("plan_ips", "/plan_ips"),
+        ("ver_vencimientos", "/vencimientos"),
+        ("ver_equipos", "/equipos"),
+        ("ver_equipos[q]", "/equipos?q=PC-BODE"),
+        ("ver_equipos[empresa, 500]", "/equipos?empresa=Silcomer&por_pagina=500"),
+        ("ver_equipos[página siguiente]", f"/equipos?despues={eq}"),
+        ("ver_equipos_inactivos", "/equipos/inactivos"),
+        ("ver_equipo", f"/equipo/{eq}"),
+        ("nuevo_equipo", "/nuevo_equipo"),
+        ("editar_equipo", f"/editar_equipo/{eq}"),
+        ("nuevo_componente", f"/equipo/{eq}/nuevo"),
+        ("editar_componente", f"/editar_componente/{comp}/{comp_eq}"),
+        ("reporte_componentes_pdf", f"/equipo/{comp_eq}/reporte_componentes"),
+        ("reporte_componentes_csv", f"/equipo/{comp_eq}/csv_componentes"),
+        ("ver_impresoras", "/impresoras"),
+        ("nueva_impresora", "/nueva_impresora"),
+        ("editar_impresora", f"/editar_impresora/{_ids('impresoras')[0]}"),
+        ("ver_camaras", "/camaras"),
+        ("nueva_camara", "/nueva_camara"),
+        ("editar_camara", f"/editar_camara/{_ids('camaras')[0]}"),
+        ("ver_otros", "/otros"),
+        ("nuevo_otro", "/nuevo_otro"),
+        ("editar_otro", f"/editar_otro/{_ids('otros')[0]}"),
+        ("csv_equipos", "/csv_equipos"),
+        ("csv_impresoras", "/csv_impresoras"),
+        ("csv_camaras", "/csv_camaras"),
+        ("csv_otros", "/csv_otros"),
+        ("importar", "/importar"),
+        ("api equipos", "/api/v1/equipos"),
+        ("api equipos[fields, empresa, 1000]", "/api/v1/equipos?fields=nombre,ip&empresa=Silcomer&por_pagina=1000"),
+        ("api equipos[ip prefijo]", f"/api/v1/equipos?ip={ip.rsplit('.', 1)[0]}."),
+        ("api componentes[equipo]", f"/api/v1/componentes?equipo_id={comp_eq}"),
+        ("api cambios[desde 0]", "/api/v1/cambios"),
+    ]
+
+    def pedir(url):
+        r = cliente.get(url)
+        r.get_data()
+        if r.status_code >= 400:
+            raise RuntimeError(f"{url} -> {r.status_code}")
+        return r
+
+    return [(nombre, lambda u=url: pedir(u), None) for nombre, url in urls]
@@ -0,0 +1,62 @@
+# cache_reportes.py — reutiliza los reportes generados mientras la tabla no cambie
+
+import os
+import threading
+import uuid
+from collections import defaultdict
+
+from mi_modelo import version_tabla
+from pdfs import RUTA_REPORTES, GENERADORES_PDF, csv_streaming
+
+# (nombre, formato) -> versión de la tabla con la que se generó el archivo
+_versiones = {}
+_locks = defaultdict(threading.Lock)
+
+
+def _ruta(nombre, formato):
+    return os.path.join(RUTA_REPORTES, f"reporte_{nombre}.{formato}")
+
+
+def _vigente(nombre, formato, version):
+    return _versiones.get((nombre, formato)) == version and os.path.exists(_ruta(nombre, formato))
+
+
+def pdf_al_dia(nombre):
+    return _vigente(nombre, "pdf", version_tabla(nombre))
+
+
+def reporte_pdf(nombre):
+    """Ruta del PDF de `nombre`; sólo lo regenera si la tabla cambió desde la última vez."""
+    with _locks[(nombre, "pdf")]:
+        version = version_tabla(nombre)
+        if not _vigente(nombre, "pdf", version):
+            GENERADORES_PDF[nombre]()
+            _versiones[(nombre, "pdf")] = version
+    return _ruta(nombre, "pdf")
+
+
+def reporte_csv(nombre):
+    """
+    Si el CSV guardado está al día devuelve (ruta, None). Si no, devuelve
+    (None, generador): el generador transmite el CSV y, al terminar, lo deja
+    guardado para las siguientes descargas.
+    """
+    version = version_tabla(nombre)
+    if _vigente(nombre, "csv", version):
+        return _ruta(nombre, "csv"), None
+    return None, _csv_guardando(nombre, version)
+
+
+def _csv_guardando(nombre, version):
+    ruta = _ruta(nombre, "csv")
+    tmp = f"{ruta}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            for trozo in csv_streaming(nombre):
+                f.write(trozo)
+                yield trozo
+        os.replace(tmp, ruta)
+        _versiones[(nombre, "csv")] = version
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,320 @@
+# descubrimiento.py — barrido de la red (asyncio) y conciliación con el inventario
+#
+# barrer("192.168.3.0/24") intenta conexiones TCP a unos puertos comunes de
+# cada IP, con un límite de conexiones simultáneas. Un host cuenta como vivo si
+# acepta o rechaza (RST) en algún puerto; si no contesta en TIMEOUT_SEG se da
+# por muerto. Después lee la tabla ARP local para conocer las MACs de los hosts
+# del mismo segmento. importar_arp() guarda un volcado de `arp -a` sin barrer.
+# conciliar() cruza el último barrido con las IPs/MACs del inventario.
+#
+# ICMP necesita sockets crudos (root/administrador); por eso el sondeo es TCP.
+
+import asyncio
+import ipaddress
+import os
+import re
+import subprocess
+import time
+from datetime import datetime
+
+from mi_modelo import MAX_PARAMETROS, consulta, registros_con_ip, transaccion
+from red_ips import int_a_ip, ip_a_int, normalizar_mac, rango_red
+
+PUERTOS = (80, 443, 22, 445, 139, 135, 3389, 9100, 554, 8080)
+CONCURRENCIA = 256          # conexiones abiertas a la vez, como máximo
+TIMEOUT_SEG = 0.8
+MAX_HOSTS = 4096            # /20
+MAX_BARRIDOS_POR_RED = 30   # los más viejos se borran
+
+_RE_IP = re.compile(r"\b(\d{1,3}(?:\.\d{1,3}){3})\b")
+_RE_MAC = re.compile(r"(?<![0-9A-Fa-f:-])([0-9A-Fa-f]{1,2}(?:[:-][0-9A-Fa-f]{1,2}){5})(?![0-9A-Fa-f:-])")
+_MAC_NULAS = ("00:00:00:00:00:00", "FF:FF:FF:FF:FF:FF")
+
+
+def _ahora():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+# ---------- sondeo ----------
+
+async def _sondear_puerto(conectar, ip, puerto, timeout):
+    """puerto si aceptó la conexión, 0 si la rechazó (el host existe), None si no contestó."""
+    try:
+        _, escritor = await asyncio.wait_for(conectar(ip, puerto), timeout)
+    except ConnectionRefusedError:
+        return 0
+    except (OSError, asyncio.TimeoutError):
+        return None
+    escritor.close()
+    try:
+        await escritor.wait_closed()
+    except OSError:
+        pass
+    return puerto
+
+
+async def _sondear_host(conectar, ip, puertos, timeout):
+    """
+    Prueba todos los puertos a la vez. Devuelve el primer puerto que acepte; un
+    rechazo llega tan rápido como una aceptación, así que 0 (sólo rechazó) se
+    devuelve recién cuando terminaron todos.
+    """
+    tareas = [asyncio.ensure_future(_sondear_puerto(conectar, ip, p, timeout)) for p in puertos]
+    rechazo = None
+    try:
+        for siguiente in asyncio.as_completed(tareas):
+            r = await siguiente
+            if r:
+                return r
+            if r == 0:
+                rechazo = 0
+        return rechazo
+    finally:
+        for t in tareas:
+            t.cancel()
+
+
+async def sondear(ips, puertos=PUERTOS, concurrencia=CONCURRENCIA, timeout=TIMEOUT_SEG,
+                  conectar=None, progreso=None):
+    """
+    {ip: (puerto, visto)} de los hosts que contestaron; puerto es None si sólo
+    rechazaron. Se sondean concurrencia // len(puertos) hosts a la vez.
+    conectar(ip, puerto) por defecto es asyncio.open_connection (ver RespondedorFalso).
+    """
+    conectar = conectar or asyncio.open_connection
+    limite = asyncio.Semaphore(max(1, concurrencia // len(puertos)))
+    vivos = {}
+    hechos = 0
+
+    async def uno(ip):
+        nonlocal hechos
+        async with limite:
+            r = await _sondear_host(conectar, ip, puertos, timeout)
+        if r is not None:
+            vivos[ip] = (r or None, _ahora())
+        hechos += 1
+        if progreso and (hechos % 16 == 0 or hechos == len(ips)):
+            progreso(hechos, len(ips))
+
+    await asyncio.gather(*(uno(ip) for ip in ips))
+    return vivos
+
+
+# ---------- tabla ARP ----------
+
+def leer_arp(texto):
+    """
+    {ip: mac} de un volcado de la tabla ARP: /proc/net/arp, `arp -a` de Windows
+    (00-11-22-...) o `arp -an` de Linux/macOS. Omite multicast y entradas incompletas.
+    """
+    res = {}
+    for linea in texto.splitlines():
+        ip = _RE_IP.search(linea)
+        mac = _RE_MAC.search(linea)
+        if not ip or not mac:
+            continue
+        n = ip_a_int(ip.group(1))
+        mac = normalizar_mac(mac.group(1))
+        if n is None or n >= 224 << 24 or not mac or mac in _MAC_NULAS or int(mac[:2], 16) & 1:
+            continue
+        res[ip.group(1)] = mac
+    return res
+
+
+def tabla_arp():
+    """Tabla ARP de esta máquina ({ip: mac}); vacía si no se puede leer."""
+    try:
+        if os.path.exists("/proc/net/arp"):
+            with open("/proc/net/arp", encoding="ascii", errors="replace") as f:
+                return leer_arp(f.read())
+        salida = subprocess.run(["arp", "-a"], capture_output=True, text=True, timeout=10,
+                                errors="replace").stdout
+        return leer_arp(salida)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"[DESCUBRIMIENTO] no se pudo leer la tabla ARP: {e}")
+        return {}
+
+
+# ---------- barridos ----------
+
+def normalizar_red(red):
+    """'192.168.3.7/24' -> '192.168.3.0/24' (así se guardan los barridos). ValueError si no es válida."""
+    return str(ipaddress.IPv4Network(str(red).strip(), strict=False))
+
+
+def _ips_de(red):
+    ini, fin = rango_red(red)
+    if fin - ini + 1 > MAX_HOSTS:
+        raise ValueError(f"La red {red} tiene más de {MAX_HOSTS} direcciones")
+    return [int_a_ip(n) for n in range(ini, fin + 1)]
+
+
+def _guardar(red, metodo, inicio, sondeadas, hosts):
+    """hosts: [(ip, mac, puerto, visto)]. Devuelve el id del barrido."""
+    with transaccion() as c:
+        c.execute("""
+            INSERT INTO barridos (red, metodo, inicio, fin, sondeadas, vivos) VALUES (?, ?, ?, ?, ?, ?)
+        """, (red, metodo, inicio, _ahora(), sondeadas, len(hosts)))
+        bid = c.lastrowid
+        c.executemany("INSERT INTO hosts_vistos (barrido_id, ip, mac, puerto, visto) VALUES (?, ?, ?, ?, ?)",
+                      [(bid,) + h for h in hosts])
+        c.execute("""
+            DELETE FROM barridos WHERE red = ? AND id NOT IN (
+                SELECT id FROM barridos WHERE red = ? ORDER BY id DESC LIMIT ?
+            )
+        """, (red, red, MAX_BARRIDOS_POR_RED))
+    return bid
+
+
+def barrer(red, puertos=PUERTOS, concurrencia=CONCURRENCIA, timeout=TIMEOUT_SEG,
+           conectar=None, arp=None, progreso=None):
+    """
+    Sondea todas las IPs de `red`, completa las MACs con la tabla ARP y guarda
+    el resultado. arp: función que devuelve {ip: mac} (por defecto tabla_arp;
+    False para no leerla). Devuelve un resumen con el id del barrido.
+    """
+    red = normalizar_red(red)
+    ips = _ips_de(red)
+    inicio = _ahora()
+    t0 = time.perf_counter()
+    vivos = asyncio.run(sondear(ips, puertos, concurrencia, timeout, conectar, progreso))
+    macs = {} if arp is False else (arp or tabla_arp)()
+    hosts = [(ip, macs.get(ip), puerto, visto)
+             for ip, (puerto, visto) in sorted(vivos.items(), key=lambda x: ip_a_int(x[0]))]
+    bid = _guardar(red, "tcp", inicio, len(ips), hosts)
+    segundos = time.perf_counter() - t0
+    print(f"[DESCUBRIMIENTO] {red}: {len(hosts)} de {len(ips)} IPs contestaron en {segundos:.1f}s")
+    return {"barrido": bid, "red": red, "sondeadas": len(ips), "vivos": len(hosts), "segundos": segundos}
+
+
+def importar_arp(texto, red):
+    """Guarda como barrido (metodo "arp") las entradas de un volcado ARP que caen en `red`."""
+    red = normalizar_red(red)
+    ini, fin = rango_red(red)
+    inicio = _ahora()
+    hosts = sorted(((ip, mac, None, inicio) for ip, mac in leer_arp(texto).items()
+                    if ini <= ip_a_int(ip) <= fin), key=lambda h: ip_a_int(h[0]))
+    bid = _guardar(red, "arp", inicio, fin - ini + 1, hosts)
+    print(f"[DESCUBRIMIENTO] {red}: {len(hosts)} entradas ARP importadas")
+    return {"barrido": bid, "red": red, "sondeadas": fin - ini + 1, "vivos": len(hosts)}
+
+
+def ultimo_barrido(red):
+    with consulta() as c:
+        c.execute("""
+            SELECT id, red, metodo, inicio, fin, sondeadas, vivos FROM barridos
+            WHERE red = ? ORDER BY id DESC LIMIT 1
+        """, (normalizar_red(red),))
+        f = c.fetchone()
+    if not f:
+        return None
+    return dict(zip(("id", "red", "metodo", "inicio", "fin", "sondeadas", "vivos"), f))
+
+
+def _ultima_vez_vistas(ips):
+    vistas = {}
+    ips = list(ips)
+    with consulta() as c:
+        for i in range(0, len(ips), MAX_PARAMETROS):
+            parte = ips[i:i + MAX_PARAMETROS]
+            c.execute(f"SELECT ip, MAX(visto) FROM hosts_vistos WHERE ip IN ({', '.join('?' * len(parte))}) GROUP BY ip",
+                      parte)
+            vistas.update(c.fetchall())
+    return vistas
+
+
+def conciliar(red):
+    """
+    Cruza el último barrido de `red` con el inventario. Devuelve None si la red
+    no se barrió nunca; si no, dict con:
+    - sin_registrar: [(ip, mac, puerto)] vivos que no están en ninguna tabla
+    - sin_respuesta: [(tabla, id, nombre, ip, última vez visto)] registrados en la red que no contestaron
+    - mac_distinta: [(tabla, id, nombre, ip, mac inventario, mac vista)]
+    """
+    red = normalizar_red(red)
+    barrido = ultimo_barrido(red)
+    if not barrido:
+        return None
+    ini, fin = rango_red(red)
+    with consulta() as c:
+        c.execute("SELECT ip, mac, puerto FROM hosts_vistos WHERE barrido_id = ?", (barrido["id"],))
+        vistos = {ip: (mac, puerto) for ip, mac, puerto in c.fetchall()}
+
+    en_red = []
+    for tabla, rid, nombre, ip, mac in registros_con_ip():
+        n = ip_a_int(ip.strip())
+        if n is not None and ini <= n <= fin:
+            # forma canónica, como se guardan los barridos ("192.168.003.5" -> "192.168.3.5")
+            en_red.append((tabla, rid, nombre, int_a_ip(n), normalizar_mac(mac)))
+    registradas = {r[3] for r in en_red}
+
+    sin_registrar = sorted(((ip, mac, puerto) for ip, (mac, puerto) in vistos.items() if ip not in registradas),
+                           key=lambda x: ip_a_int(x[0]))
+    muertos = [r for r in en_red if r[3] not in vistos]
+    vistas = _ultima_vez_vistas({r[3] for r in muertos})
+    sin_respuesta = sorted(((t, i, nom, ip, vistas.get(ip)) for t, i, nom, ip, _ in muertos),
+                           key=lambda x: ip_a_int(x[3]))
+    mac_distinta = sorted(((t, i, nom, ip, mac, vistos[ip][0]) for t, i, nom, ip, mac in en_red
+                           if ip in vistos and mac and vistos[ip][0] and mac != vistos[ip][0]),
+                          key=lambda x: ip_a_int(x[3]))
+    return {
+        "barrido": barrido,
+        "sin_registrar": sin_registrar,
+        "sin_respuesta": sin_respuesta,
+        "mac_distinta": mac_distinta,
+    }
+
+
+# ---------- red falsa para pruebas ----------
+
+class _EscritorFalso:
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+class RespondedorFalso:
+    """
+    Reemplaza a la red: hosts = {ip: {"puertos": {80, ...}, "mac": "..."}}.
+    Los hosts de la lista aceptan en sus puertos y rechazan en los demás; el
+    resto no contesta (los corta el timeout). Uso:
+
+        falso = RespondedorFalso({"10.0.0.5": {"puertos": {80}, "mac": "00:11:22:33:44:55"}})
+        barrer("10.0.0.0/24", conectar=falso.conectar, arp=falso.arp, timeout=0.05)
+
+    max_simultaneas registra cuántas conexiones hubo abiertas a la vez.
+    """
+
+    def __init__(self, hosts, demora=0.002):
+        self.hosts = hosts
+        self.demora = demora
+        self.intentos = 0
+        self._abiertas = 0
+        self.max_simultaneas = 0
+
+    async def conectar(self, ip, puerto):
+        self.intentos += 1
+        self._abiertas += 1
+        self.max_simultaneas = max(self.max_simultaneas, self._abiertas)
+        try:
+            await asyncio.sleep(self.demora)
+            host = self.hosts.get(ip)
+            if host is None:
+                await asyncio.sleep(3600)
+            if puerto not in host.get("puertos", ()):
+                raise ConnectionRefusedError(f"{ip}:{puerto} rechazado")
+            return None, _EscritorFalso()
+        finally:
+            self._abiertas -= 1
+
+    def arp(self):
+        return {ip: normalizar_mac(h["mac"]) for ip, h in self.hosts.items() if h.get("mac")}
+
+    def texto_arp(self):
+        """La tabla con el formato de `arp -a` de Windows, para probar importar_arp()."""
+        lineas = ["Interfaz: 10.0.0.1 --- 0xb", "  Dirección de Internet          Dirección física      Tipo"]
+        for ip, mac in self.arp().items():
+            lineas.append(f"  {ip:<32} {mac.replace(':', '-').lower():<21} dinámico")
+        return "\n".join(lineas)
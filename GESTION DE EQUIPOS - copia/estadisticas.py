@@ -0,0 +1,63 @@
+# estadisticas.py — cifras del panel principal, calculadas en una sola consulta
+
+import threading
+import time
+
+from mi_modelo import consulta, generacion_escrituras
+
+# Red de seguridad para escrituras hechas por otro proceso (CLI, otro worker).
+TTL_SEG = 60
+
+_SQL = """
+    SELECT 'equipos', empresa, activo, COUNT(*) FROM equipos GROUP BY empresa, activo
+    UNION ALL SELECT 'componentes', NULL, NULL, COUNT(*) FROM componentes
+    UNION ALL SELECT 'impresoras', NULL, NULL, COUNT(*) FROM impresoras
+    UNION ALL SELECT 'camaras', NULL, NULL, COUNT(*) FROM camaras
+    UNION ALL SELECT 'otros', NULL, NULL, COUNT(*) FROM otros
+    UNION ALL SELECT 'ips', NULL, NULL, COUNT(DISTINCT ip_num) FROM (
+        SELECT ip_num FROM equipos WHERE ip_num IS NOT NULL
+        UNION ALL SELECT ip_num FROM impresoras WHERE ip_num IS NOT NULL
+        UNION ALL SELECT ip_num FROM camaras WHERE ip_num IS NOT NULL
+        UNION ALL SELECT ip_num FROM otros WHERE ip_num IS NOT NULL
+    )
+"""
+
+_lock = threading.Lock()
+_cache = {"generacion": None, "hora": 0, "datos": None}
+
+
+def _calcular():
+    datos = {
+        "equipos_activos": 0, "equipos_inactivos": 0, "por_empresa": {},
+        "componentes": 0, "impresoras": 0, "camaras": 0, "otros": 0, "ips_usadas": 0,
+    }
+    with consulta() as c:
+        c.execute(_SQL)
+        filas = c.fetchall()
+    for tipo, empresa, activo, total in filas:
+        if tipo == "equipos":
+            clave = "equipos_activos" if activo == 1 else "equipos_inactivos"
+            datos[clave] += total
+            emp = datos["por_empresa"].setdefault(empresa or "Sin empresa", {"activos": 0, "inactivos": 0})
+            emp["activos" if activo == 1 else "inactivos"] += total
+        elif tipo == "ips":
+            datos["ips_usadas"] = total
+        else:
+            datos[tipo] = total
+    return datos
+
+
+def obtener_estadisticas():
+    """
+    Cifras del panel. Se recalculan sólo si hubo escrituras desde la última
+    vez (mi_modelo.generacion_escrituras) o si pasó TTL_SEG.
+    """
+    generacion = generacion_escrituras()
+    ahora = time.monotonic()
+    with _lock:
+        if _cache["generacion"] == generacion and ahora - _cache["hora"] < TTL_SEG:
+            return _cache["datos"]
+    datos = _calcular()
+    with _lock:
+        _cache.update(generacion=generacion, hora=ahora, datos=datos)
+    return datos
@@ -0,0 +1,192 @@
+# importar.py — carga masiva de CSV (mismo formato que los CSV de pdfs.py)
+
+import csv
+import io
+import time
+from datetime import datetime
+
+from mi_modelo import TABLAS_IP, DireccionRepetida, buscar_repetidos, insertar_lote, ids_equipos
+from red_ips import ip_a_int, normalizar_mac
+
+LOTE = 500
+
+# Columnas que se insertan por tabla + valor por defecto si no vienen en el CSV.
+COLUMNAS = {
+    "equipos": {
+        "nombre": "", "num_factura": "", "mac": "", "ip": "", "marca": "", "modelo": "",
+        "serie": "", "fecha_compra": "", "usuario_asignado": "", "usuario_dominio": "",
+        "en_dominio": "No", "tiene_symantec": "No", "bitlocker": "No", "conectada_internet": "No",
+        "fecha_registro": None, "empresa": "Silicatos", "activo": 1,
+    },
+    "componentes": {
+        "equipo_id": None, "software": "", "version": "", "serie_software": "", "id_producto": "",
+        "llave": "", "proveedor": "", "aplica_proveedor": "No", "fecha_compra": "",
+        "fecha_vencimiento": "",
+    },
+    "impresoras": {"marca": "", "modelo": "", "mac": "", "ip": "", "serie": "", "area": ""},
+    "camaras": {"marca": "", "modelo": "", "mac": "", "ip": "", "serie": "", "area": "", "estado": ""},
+    "otros": {
+        "nombre": "", "marca": "", "modelo": "", "mac": "", "ip": "", "serie": "", "area": "",
+        "descripcion": "",
+    },
+}
+
+# Títulos de los CSV exportados (pdfs.REPORTES) -> columna. También se aceptan
+# los nombres de columna tal cual (ip, mac, num_factura, ...).
+TITULOS = {
+    "equipos": {
+        "empresa": "empresa", "nombre": "nombre", "marca": "marca", "modelo": "modelo",
+        "usuario": "usuario_asignado", "dominio": "en_dominio", "symantec": "tiene_symantec",
+        "bitlocker": "bitlocker", "internet": "conectada_internet", "fecha registro": "fecha_registro",
+    },
+    "componentes": {
+        "equipo id": "equipo_id", "software": "software", "versión": "version",
+        "serie software": "serie_software", "id producto": "id_producto", "llave": "llave",
+        "proveedor": "proveedor", "aplica proveedor": "aplica_proveedor", "compra": "fecha_compra",
+        "vence": "fecha_vencimiento",
+    },
+    "impresoras": {"área": "area"},
+    "camaras": {"ubicación": "area", "área": "area"},
+    "otros": {"área": "area", "descripción": "descripcion"},
+}
+
+OBLIGATORIOS = {
+    "equipos": ("nombre",),
+    "componentes": ("equipo_id", "software"),
+    "impresoras": ("marca", "modelo"),
+    "camaras": ("marca", "modelo"),
+    "otros": ("nombre",),
+}
+
+
+def _mapa_encabezados(tabla, encabezados):
+    """encabezado del CSV -> columna; los que no se reconocen quedan fuera."""
+    columnas = COLUMNAS[tabla]
+    alias = TITULOS[tabla]
+    mapa, desconocidos = {}, []
+    for h in encabezados or []:
+        clave = (h or "").strip().lower()
+        col = alias.get(clave) or (clave if clave in columnas else None)
+        if col:
+            mapa[h] = col
+        else:
+            desconocidos.append(h)
+    return mapa, desconocidos
+
+
+def _validar(tabla, registro, equipos_validos):
+    for col in OBLIGATORIOS[tabla]:
+        if registro.get(col) in (None, ""):
+            return f"falta '{col}'"
+    ip = registro.get("ip")
+    if ip and ip_a_int(ip) is None:
+        return f"IP inválida: {ip}"
+    if tabla == "equipos":
+        try:
+            registro["activo"] = 1 if int(registro["activo"]) else 0
+        except (TypeError, ValueError):
+            return f"activo inválido: {registro['activo']}"
+    if tabla == "componentes":
+        try:
+            registro["equipo_id"] = int(registro["equipo_id"])
+        except (TypeError, ValueError):
+            return f"equipo_id inválido: {registro['equipo_id']}"
+        if registro["equipo_id"] not in equipos_validos:
+            return f"no existe el equipo {registro['equipo_id']}"
+    return None
+
+
+def _direcciones(registro):
+    """Claves ("ip"|"mac", forma canónica) de la fila, para comparar con las ya vistas."""
+    claves = [("ip", ip_a_int(registro.get("ip"))), ("mac", normalizar_mac(registro.get("mac")))]
+    return [k for k in claves if k[1] is not None]
+
+
+def _repetida(tabla, registro, linea_de):
+    """
+    Mensaje si la IP o la MAC de la fila ya la tiene otro registro de la base
+    (mismas búsquedas por índice que guardar_*) o una línea anterior del CSV.
+    linea_de: {("ip"|"mac", canónica): línea} de las filas ya aceptadas.
+    """
+    motivos = [f"{campo.upper()} repetida en la línea {linea_de[(campo, v)]}"
+               for campo, v in _direcciones(registro) if (campo, v) in linea_de]
+    en_base = buscar_repetidos(tabla, registro.get("ip"), registro.get("mac"))
+    if en_base:
+        motivos.append(str(DireccionRepetida(en_base)))
+    return "; ".join(motivos) or None
+
+
+def importar_csv(tabla, archivo, lote=LOTE, permitir_repetidos=False):
+    """
+    Lee el CSV (objeto de texto) fila a fila, valida y carga por lotes con
+    executemany, una transacción por lote. Devuelve un resumen:
+    {"insertados", "errores": [(linea, mensaje)], "repetidos": [(linea, mensaje)],
+    "ignoradas": [encabezados], "segundos", "filas_seg"}.
+    Una fila con IP o MAC repetida va a errores y no se carga, como en los
+    formularios; con permitir_repetidos se carga y queda en "repetidos".
+    """
+    if tabla not in COLUMNAS:
+        raise ValueError(f"Tabla no soportada: {tabla}")
+    inicio = time.perf_counter()
+    columnas = list(COLUMNAS[tabla])
+    hoy = datetime.now().strftime("%Y-%m-%d")
+    equipos_validos = ids_equipos() if tabla == "componentes" else None
+
+    lector = csv.DictReader(archivo)
+    mapa, desconocidos = _mapa_encabezados(tabla, lector.fieldnames)
+    insertados, errores, repetidos, pendientes = 0, [], [], []
+    linea_de = {}
+
+    def volcar():
+        nonlocal insertados
+        filas = [f for _, f in pendientes]
+        try:
+            insertar_lote(tabla, columnas, filas)
+            insertados += len(filas)
+        except Exception as e:
+            errores.extend((linea, f"lote rechazado: {e}") for linea, _ in pendientes)
+        pendientes.clear()
+
+    for fila in lector:
+        linea = lector.line_num
+        registro = dict(COLUMNAS[tabla])
+        for h, col in mapa.items():
+            valor = (fila.get(h) or "").strip()
+            if valor:
+                registro[col] = valor
+        if tabla == "equipos" and not registro["fecha_registro"]:
+            registro["fecha_registro"] = hoy
+        error = _validar(tabla, registro, equipos_validos)
+        if error:
+            errores.append((linea, error))
+            continue
+        if tabla in TABLAS_IP:
+            repetida = _repetida(tabla, registro, linea_de)
+            if repetida and not permitir_repetidos:
+                errores.append((linea, repetida))
+                continue
+            if repetida:
+                repetidos.append((linea, repetida))
+            for k in _direcciones(registro):
+                linea_de.setdefault(k, linea)
+        pendientes.append((linea, tuple(registro[c] for c in columnas)))
+        if len(pendientes) >= lote:
+            volcar()
+    if pendientes:
+        volcar()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "tabla": tabla,
+        "insertados": insertados,
+        "errores": errores,
+        "repetidos": repetidos,
+        "ignoradas": desconocidos,
+        "segundos": segundos,
+        "filas_seg": insertados / segundos if segundos > 0 else 0,
+    }
+
+
+def abrir_texto(binario):
+    """Envuelve un archivo binario (p.ej. request.files[...].stream) para leerlo como CSV utf-8."""
+    return io.TextIOWrapper(binario, encoding="utf-8-sig", newline="")
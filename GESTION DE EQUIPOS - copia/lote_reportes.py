@@ -0,0 +1,54 @@
+# lote_reportes.py — PDFs de componentes de todos los equipos, en paralelo
+
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import groupby
+from operator import attrgetter
+
+from mi_modelo import componentes_con_equipo
+from pdfs import RUTA_REPORTES, pdf_componentes_desde_filas
+
+ZIP_COMPONENTES = os.path.join(RUTA_REPORTES, "reporte_componentes_equipos.zip")
+
+
+def generar_reportes_componentes(equipo_ids=None, procesos=None, zip_path=None, progreso=None):
+    """
+    Lee equipos + componentes con una sola consulta y genera un PDF por equipo
+    en un ProcessPoolExecutor (ReportLab usa CPU). Opcionalmente los junta en
+    un zip. progreso(hechos, total) se llama a medida que terminan.
+    Devuelve un resumen con el total, los segundos y el tiempo por proceso.
+    """
+    inicio = time.perf_counter()
+    filas = componentes_con_equipo(equipo_ids)
+    grupos = [(eid, list(g)) for eid, g in groupby(filas, key=attrgetter("equipo_id"))]
+    total = len(grupos)
+    rutas = []
+    por_proceso = {}
+
+    if grupos:
+        with ProcessPoolExecutor(max_workers=procesos) as ex:
+            futuros = [ex.submit(pdf_componentes_desde_filas, eid, filas) for eid, filas in grupos]
+            for hechos, fut in enumerate(as_completed(futuros), 1):
+                _, ruta, segundos, pid = fut.result()
+                rutas.append(ruta)
+                p = por_proceso.setdefault(pid, {"reportes": 0, "segundos": 0.0})
+                p["reportes"] += 1
+                p["segundos"] += segundos
+                if progreso:
+                    progreso(hechos, total)
+
+    if zip_path:
+        tmp = f"{zip_path}.tmp"
+        with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as z:
+            for ruta in sorted(rutas):
+                z.write(ruta, os.path.basename(ruta))
+        os.replace(tmp, zip_path)
+
+    return {
+        "archivo": zip_path,
+        "reportes": total,
+        "segundos": time.perf_counter() - inicio,
+        "por_proceso": {str(pid): datos for pid, datos in por_proceso.items()},
+    }
@@ -0,0 +1,185 @@
+# metricas.py — tiempos por endpoint, consultas SQL por request y log de consultas lentas
+
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, request
+
+import mi_modelo
+
+SQL_LENTO_MS = 100
+SQL_MAX_LOG = 500       # caracteres de la consulta que se imprimen
+
+# Límites de los histogramas (segundos / cantidad de consultas), como en Prometheus.
+LIMITES_SEG = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+FUERA_DE_REQUEST = "(fuera de request)"
+
+_lock = threading.Lock()
+_local = threading.local()
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1)     # la última es +Inf
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, valor):
+        self.cubetas[bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.cuenta += 1
+
+
+_latencia = {}          # (endpoint, metodo) -> Histograma(LIMITES_SEG)
+_consultas_req = {}     # endpoint -> Histograma(LIMITES_CONSULTAS)
+_peticiones = {}        # (endpoint, metodo, estado) -> cantidad
+_sql = {}               # endpoint -> [consultas, segundos]
+_contadores = {"conexiones": 0, "sql_lentas": 0}
+
+
+def _endpoint():
+    return getattr(_local, "endpoint", None) or FUERA_DE_REQUEST
+
+
+def _al_ejecutar(sql, params, segundos, muchos):
+    endpoint = _endpoint()
+    medida = getattr(_local, "medida", None)
+    if medida is not None:
+        medida[0] += 1
+        medida[1] += segundos
+    with _lock:
+        total = _sql.setdefault(endpoint, [0, 0.0])
+        total[0] += 1
+        total[1] += segundos
+        lenta = segundos * 1000 >= SQL_LENTO_MS
+        if lenta:
+            _contadores["sql_lentas"] += 1
+    if lenta:
+        texto = " ".join(sql.split())[:SQL_MAX_LOG]
+        detalle = "(executemany)" if muchos else repr(params)
+        print(f"[SQL LENTO] {segundos * 1000:.1f} ms en {endpoint}: {texto} {detalle}")
+
+
+def _al_conectar():
+    with _lock:
+        _contadores["conexiones"] += 1
+    medida = getattr(_local, "medida", None)
+    if medida is not None:
+        medida[2] += 1
+
+
+def activar():
+    """Engancha los contadores al cursor de mi_modelo."""
+    mi_modelo.observar(sql=_al_ejecutar, conexion=_al_conectar)
+
+
+def inicio_request():
+    _local.endpoint = request.endpoint or "(sin ruta)"
+    _local.medida = [0, 0.0, 0]     # consultas, segundos en SQL, conexiones abiertas
+    g.metricas_inicio = time.perf_counter()
+    g.server_timing = current_app.config.get("SERVER_TIMING", False)
+
+
+def fin_request(resp):
+    inicio = g.pop("metricas_inicio", None)
+    medida = getattr(_local, "medida", None)
+    if inicio is None or medida is None:
+        return resp
+    segundos = time.perf_counter() - inicio
+    endpoint = _local.endpoint
+    clave = (endpoint, request.method)
+    with _lock:
+        _latencia.setdefault(clave, Histograma(LIMITES_SEG)).observar(segundos)
+        _consultas_req.setdefault(endpoint, Histograma(LIMITES_CONSULTAS)).observar(medida[0])
+        k = (endpoint, request.method, str(resp.status_code))
+        _peticiones[k] = _peticiones.get(k, 0) + 1
+    if g.get("server_timing"):
+        resp.headers.add(
+            "Server-Timing",
+            f'sql;dur={medida[1] * 1000:.2f};desc="{medida[0]} consultas, {medida[2]} conexiones", '
+            f"app;dur={segundos * 1000:.2f}",
+        )
+    _local.endpoint = None
+    _local.medida = None
+    return resp
+
+
+def _etiquetas(**kw):
+    partes = []
+    for k, v in kw.items():
+        v = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        partes.append(f'{k}="{v}"')
+    return "{" + ",".join(partes) + "}"
+
+
+def _histograma(lineas, nombre, h, **etiquetas):
+    acumulado = 0
+    for limite, n in zip(h.limites + ("+Inf",), h.cubetas):
+        acumulado += n
+        lineas.append(f"{nombre}_bucket{_etiquetas(**etiquetas, le=limite)} {acumulado}")
+    lineas.append(f"{nombre}_sum{_etiquetas(**etiquetas)} {h.suma:.6f}")
+    lineas.append(f"{nombre}_count{_etiquetas(**etiquetas)} {h.cuenta}")
+
+
+def texto_prometheus():
+    """Todas las métricas en el formato de texto de Prometheus (version 0.0.4)."""
+    with _lock:
+        latencia = {k: _copiar(h) for k, h in _latencia.items()}
+        consultas = {k: _copiar(h) for k, h in _consultas_req.items()}
+        peticiones = dict(_peticiones)
+        sql = {k: list(v) for k, v in _sql.items()}
+        contadores = dict(_contadores)
+
+    lineas = [
+        "# HELP inventario_http_requests_total Requests atendidos.",
+        "# TYPE inventario_http_requests_total counter",
+    ]
+    for (endpoint, metodo, estado), n in sorted(peticiones.items()):
+        lineas.append(f"inventario_http_requests_total{_etiquetas(endpoint=endpoint, method=metodo, status=estado)} {n}")
+
+    lineas += [
+        "# HELP inventario_http_request_duration_seconds Tiempo de respuesta por endpoint (hasta enviar los encabezados).",
+        "# TYPE inventario_http_request_duration_seconds histogram",
+    ]
+    for (endpoint, metodo), h in sorted(latencia.items()):
+        _histograma(lineas, "inventario_http_request_duration_seconds", h, endpoint=endpoint, method=metodo)
+
+    lineas += [
+        "# HELP inventario_sql_queries_per_request Consultas SQL por request.",
+        "# TYPE inventario_sql_queries_per_request histogram",
+    ]
+    for endpoint, h in sorted(consultas.items()):
+        _histograma(lineas, "inventario_sql_queries_per_request", h, endpoint=endpoint)
+
+    lineas += [
+        "# HELP inventario_sql_queries_total Consultas SQL ejecutadas.",
+        "# TYPE inventario_sql_queries_total counter",
+    ]
+    for endpoint, (n, _) in sorted(sql.items()):
+        lineas.append(f"inventario_sql_queries_total{_etiquetas(endpoint=endpoint)} {n}")
+    lineas += [
+        "# HELP inventario_sql_seconds_total Tiempo en execute/executemany.",
+        "# TYPE inventario_sql_seconds_total counter",
+    ]
+    for endpoint, (_, seg) in sorted(sql.items()):
+        lineas.append(f"inventario_sql_seconds_total{_etiquetas(endpoint=endpoint)} {seg:.6f}")
+
+    lineas += [
+        f"# HELP inventario_sql_slow_queries_total Consultas de más de {SQL_LENTO_MS} ms.",
+        "# TYPE inventario_sql_slow_queries_total counter",
+        f"inventario_sql_slow_queries_total {contadores['sql_lentas']}",
+        "# HELP inventario_db_connections_opened_total Conexiones SQLite abiertas.",
+        "# TYPE inventario_db_connections_opened_total counter",
+        f"inventario_db_connections_opened_total {contadores['conexiones']}",
+    ]
+    return "\n".join(lineas) + "\n"
+
+
+def _copiar(h):
+    c = Histograma(h.limites)
+    c.cubetas, c.suma, c.cuenta = list(h.cubetas), h.suma, h.cuenta
+    return c
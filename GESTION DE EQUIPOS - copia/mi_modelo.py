@@ -1,448 +1,1506 @@
-import sqlite3, os
+import sqlite3, os, re, threading, itertools, time, ipaddress
+from contextlib import contextmanager
 from datetime import datetime
 
+import registros
+from red_ips import AsignadorIPs, UsoSubred, int_a_ip, ip_a_int, normalizar_mac, rango_red
+from registros import (
+    POR_TABLA, ComponenteReporte, CoincidenciaIP, Componente, ConflictoDireccion, Equipo, Impresora, Camara, Otro,
+    Reserva, Subred,
+)
+
 DB_PATH = "datos.db"
 
+# ---------- conexión ----------
+# Una conexión por hilo, reutilizada por todas las funciones del modelo.
+# app.py la cierra al terminar cada request (cerrar_conexion).
+
+BUSY_TIMEOUT_MS = 5000
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",        # ~16 MB
+    "PRAGMA mmap_size=134217728",      # 128 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+)
+
+_local = threading.local()
+
+# Sube con cada transacción confirmada; las caches en memoria lo comparan
+# para saber si hubo escrituras desde que calcularon sus datos.
+_contador_escrituras = itertools.count(1)
+_generacion = 0
+
+# Búsqueda de texto (FTS5 con tokenizer trigram => coincidencias por subcadena).
+# Si el SQLite instalado no trae FTS5/trigram se sigue usando LIKE.
+FTS_COLUMNAS = ("nombre", "ip", "usuario_asignado")
+TABLAS_ACTIVOS = ("equipos", "componentes", "impresoras", "camaras", "otros")
+
+# Fila de la tabla versiones con la última versión de `cambios` borrada por
+# compactar_cambios(); quien sincroniza desde antes tiene que empezar de cero.
+CAMBIOS_PODADO = "cambios_podado"
+# Fila de versiones que sólo suben los altas, bajas y cambios de ip de
+# TABLAS_IP (no activo, archivo, ...): con ella se sabe si el índice de IPs
+# quedó viejo.
+VERSION_IPS = "ips"
+DIAS_BAJAS = 90
+FTS_DISPONIBLE = False
+
+
+# Instrumentación: metricas.py se registra con observar(). Sin observador los
+# cursores no miden nada.
+_observador_sql = None          # f(sql, params, segundos, muchos)
+_observador_conexion = None     # f()
+
+
+def observar(sql=None, conexion=None):
+    """Registra las funciones que reciben cada consulta ejecutada y cada conexión abierta."""
+    global _observador_sql, _observador_conexion
+    _observador_sql, _observador_conexion = sql, conexion
+
+
+class _Cursor(sqlite3.Cursor):
+    """Cursor que pasa al observador el tiempo de cada execute/executemany."""
+
+    def execute(self, sql, params=()):
+        if _observador_sql is None:
+            return super().execute(sql, params)
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            _observador_sql(sql, params, time.perf_counter() - inicio, False)
+
+    def executemany(self, sql, filas):
+        if _observador_sql is None:
+            return super().executemany(sql, filas)
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, filas)
+        finally:
+            _observador_sql(sql, None, time.perf_counter() - inicio, True)
+
+
+class _Conexion(sqlite3.Connection):
+    def cursor(self, factory=_Cursor):
+        return super().cursor(factory)
+
+
+def _abrir_conexion(ruta):
+    conn = sqlite3.connect(ruta, timeout=BUSY_TIMEOUT_MS / 1000, factory=_Conexion)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    if _observador_conexion is not None:
+        _observador_conexion()
+    return conn
+
+
 def conectar():
-    return sqlite3.connect(DB_PATH)
+    """Devuelve la conexión del hilo actual (la abre la primera vez)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.ruta != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = _abrir_conexion(DB_PATH)
+        _local.conn = conn
+        _local.ruta = DB_PATH
+    return conn
 
-def init_db():
+
+def cerrar_conexion(exc=None):
+    """Cierra la conexión del hilo actual, si existe."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        _local.conn = None
+        conn.close()
+
+
+def generacion_escrituras():
+    return _generacion
+
+
+@contextmanager
+def consulta():
+    """Cursor de solo lectura sobre la conexión del hilo."""
+    c = conectar().cursor()
+    try:
+        yield c
+    finally:
+        c.close()
+
+
+@contextmanager
+def transaccion():
+    """Cursor de escritura: commit al salir, rollback si hay error."""
     conn = conectar()
     c = conn.cursor()
+    global _generacion
+    try:
+        yield c
+        conn.commit()
+        _generacion = next(_contador_escrituras)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        c.close()
 
-    # equipos
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS equipos (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT,
-        num_factura TEXT,
-        mac TEXT,
-        ip TEXT,
-        marca TEXT,
-        modelo TEXT,
-        serie TEXT,
-        fecha_compra TEXT,
-        usuario_asignado TEXT,
-        usuario_dominio TEXT,
-        en_dominio TEXT,
-        tiene_symantec TEXT,
-        bitlocker TEXT,
-        conectada_internet TEXT,
-        archivo TEXT,
-        fecha_registro TEXT,
-        empresa TEXT,
-        activo INTEGER DEFAULT 1
-    )
-    """)
+def init_db():
+    with transaccion() as c:
+
+        # equipos
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS equipos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT,
+            num_factura TEXT,
+            mac TEXT,
+            ip TEXT,
+            marca TEXT,
+            modelo TEXT,
+            serie TEXT,
+            fecha_compra TEXT,
+            usuario_asignado TEXT,
+            usuario_dominio TEXT,
+            en_dominio TEXT,
+            tiene_symantec TEXT,
+            bitlocker TEXT,
+            conectada_internet TEXT,
+            archivo TEXT,
+            fecha_registro TEXT,
+            empresa TEXT,
+            activo INTEGER DEFAULT 1,
+            ip_num INTEGER,
+            mac_norm TEXT
+        )
+        """)
+
+        # =componentes
+        c.execute(_SQL_COMPONENTES.format(tabla="componentes"))
+        _migrar_componentes_vence(c)
+        _migrar_componentes_fk(c)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_componentes_equipo ON componentes(equipo_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_componentes_vence ON componentes(vence) WHERE vence IS NOT NULL")
+
+        # impres
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS impresoras (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            marca TEXT,
+            modelo TEXT,
+            mac TEXT,
+            ip TEXT,
+            serie TEXT,
+            area TEXT,
+            archivo TEXT,
+            ip_num INTEGER,
+            mac_norm TEXT
+        )
+        """)
+
+        # camaras
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS camaras (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            marca TEXT,
+            modelo TEXT,
+            mac TEXT,
+            ip TEXT,
+            serie TEXT,
+            area TEXT,
+            estado TEXT,
+            archivo TEXT,
+            ip_num INTEGER,
+            mac_norm TEXT
+        )
+        """)
+
+        # otros
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS otros (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT,
+            marca TEXT,
+            modelo TEXT,
+            mac TEXT,
+            ip TEXT,
+            serie TEXT,
+            area TEXT,
+            descripcion TEXT,
+            archivo TEXT,
+            ip_num INTEGER,
+            mac_norm TEXT
+        )
+        """)
+
+        # busqueda de ip
+        c.execute("CREATE INDEX IF NOT EXISTS idx_equipos_ip ON equipos(ip)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_impresoras_ip ON impresoras(ip)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_camaras_ip ON camaras(ip)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_otros_ip ON otros(ip)")
+
+        # IP/MAC canónicas (ip_num, mac_norm): los repetidos se buscan por estos índices
+        _migrar_direcciones(c)
+        for t in TABLAS_IP:
+            c.execute(f"CREATE INDEX IF NOT EXISTS idx_{t}_ip_num ON {t}(ip_num) WHERE ip_num IS NOT NULL")
+            c.execute(f"CREATE INDEX IF NOT EXISTS idx_{t}_mac_norm ON {t}(mac_norm) WHERE mac_norm IS NOT NULL")
+
+        # versión por tabla: la suben los triggers en cada insert/update/delete
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS versiones (
+            tabla TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """)
+        for t in TABLAS_ACTIVOS:
+            c.execute("INSERT OR IGNORE INTO versiones (tabla, version) VALUES (?, 0)", (t,))
+            for evento in ("INSERT", "UPDATE", "DELETE"):
+                c.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {t}_version_{evento.lower()} AFTER {evento} ON {t} BEGIN
+                    UPDATE versiones SET version = version + 1 WHERE tabla = '{t}';
+                END
+                """)
+        c.execute("INSERT OR IGNORE INTO versiones (tabla, version) VALUES (?, 0)", (VERSION_IPS,))
+        for t in TABLAS_IP:
+            for evento in ("INSERT", "UPDATE OF ip", "DELETE"):
+                c.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {t}_ips_{evento.split()[0].lower()} AFTER {evento} ON {t} BEGIN
+                    UPDATE versiones SET version = version + 1 WHERE tabla = '{VERSION_IPS}';
+                END
+                """)
+
+        # registro de cambios para sincronizar por diferencias (cambios_desde).
+        # version AUTOINCREMENT: crece siempre y no se reutiliza aunque se compacte.
+        c.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name='cambios'")
+        habia_cambios = c.fetchone() is not None
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS cambios (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            tabla TEXT NOT NULL,
+            registro INTEGER NOT NULL,
+            operacion TEXT NOT NULL,
+            fecha TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_cambios_registro ON cambios(tabla, registro, version)")
+        c.execute("INSERT OR IGNORE INTO versiones (tabla, version) VALUES (?, 0)", (CAMBIOS_PODADO,))
+        for t in TABLAS_ACTIVOS:
+            for evento, fila in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+                c.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {t}_cambios_{evento.lower()} AFTER {evento} ON {t} BEGIN
+                    INSERT INTO cambios (tabla, registro, operacion) VALUES ('{t}', {fila}.id, '{evento[0]}');
+                END
+                """)
+        if not habia_cambios:
+            # base existente: lo que ya hay entra como alta, así desde=0 trae todo
+            for t in TABLAS_ACTIVOS:
+                c.execute(f"INSERT INTO cambios (tabla, registro, operacion) SELECT '{t}', id, 'I' FROM {t} ORDER BY id")
+
+        # listados paginados / conteos
+        c.execute("CREATE INDEX IF NOT EXISTS idx_equipos_activo ON equipos(activo)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_equipos_empresa ON equipos(empresa, activo)")
+
+        # archivos subidos (almacen.py): uno por contenido, refs = registros que lo usan
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS archivos (
+            hash TEXT PRIMARY KEY,
+            ruta TEXT NOT NULL UNIQUE,
+            nombre TEXT,
+            tipo TEXT,
+            tamano INTEGER,
+            refs INTEGER NOT NULL DEFAULT 0,
+            creado TEXT,
+            usado REAL
+        )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_archivos_sin_uso ON archivos(usado) WHERE refs <= 0")
+        for t in TABLAS_ACTIVOS:
+            c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {t}_archivo_insert AFTER INSERT ON {t}
+            WHEN COALESCE(new.archivo, '') != '' BEGIN
+                UPDATE archivos SET refs = refs + 1 WHERE ruta = new.archivo;
+            END
+            """)
+            c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {t}_archivo_update AFTER UPDATE OF archivo ON {t}
+            WHEN old.archivo IS NOT new.archivo BEGIN
+                UPDATE archivos SET refs = refs - 1 WHERE ruta = old.archivo;
+                UPDATE archivos SET refs = refs + 1 WHERE ruta = new.archivo;
+            END
+            """)
+            c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {t}_archivo_delete AFTER DELETE ON {t}
+            WHEN COALESCE(old.archivo, '') != '' BEGIN
+                UPDATE archivos SET refs = refs - 1 WHERE ruta = old.archivo;
+            END
+            """)
+
+        # barridos de red (descubrimiento.py) y los hosts que contestaron en cada uno
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS barridos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            red TEXT NOT NULL,
+            metodo TEXT NOT NULL,
+            inicio TEXT NOT NULL,
+            fin TEXT,
+            sondeadas INTEGER,
+            vivos INTEGER
+        )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_barridos_red ON barridos(red, id)")
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS hosts_vistos (
+            barrido_id INTEGER NOT NULL REFERENCES barridos(id) ON DELETE CASCADE,
+            ip TEXT NOT NULL,
+            mac TEXT,
+            puerto INTEGER,
+            visto TEXT NOT NULL,
+            PRIMARY KEY (barrido_id, ip)
+        ) WITHOUT ROWID
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_hosts_vistos_ip ON hosts_vistos(ip, visto)")
+
+        # plan de IPs: subredes (VLANs) y rangos reservados de cada una
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS subredes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cidr TEXT NOT NULL UNIQUE,
+            nombre TEXT
+        )
+        """)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS subredes_reservas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            subred_id INTEGER NOT NULL REFERENCES subredes(id) ON DELETE CASCADE,
+            desde INTEGER NOT NULL,
+            hasta INTEGER NOT NULL,
+            motivo TEXT
+        )
+        """)
+        c.execute("CREATE INDEX IF NOT EXISTS idx_subredes_reservas ON subredes_reservas(subred_id, desde)")
+
+    _init_fts()
+
+
+_SQL_COMPONENTES = """
+CREATE TABLE IF NOT EXISTS {tabla} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    equipo_id INTEGER REFERENCES equipos(id) ON DELETE CASCADE,
+    software TEXT,
+    version TEXT,
+    serie_software TEXT,
+    id_producto TEXT,
+    llave TEXT,
+    proveedor TEXT,
+    aplica_proveedor TEXT,
+    fecha_compra TEXT,
+    fecha_vencimiento TEXT,
+    archivo TEXT,
+    activo INTEGER DEFAULT 1,
+    vence TEXT
+)
+"""
+
+# Formatos en que se han cargado fechas de vencimiento (formulario, CSV, a mano).
+FORMATOS_FECHA = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d.%m.%Y", "%d/%m/%y")
+
+
+def fecha_iso(texto):
+    """'31/01/2025' -> '2025-01-31'. None si está vacía o no se reconoce."""
+    texto = (texto or "").strip()
+    if not texto:
+        return None
+    for fmt in FORMATOS_FECHA:
+        try:
+            return datetime.strptime(texto, fmt).date().isoformat()
+        except ValueError:
+            pass
+    return None
 
-    # =componentes
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS componentes (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        equipo_id INTEGER,
-        software TEXT,
-        version TEXT,
-        serie_software TEXT,
-        id_producto TEXT,
-        llave TEXT,
-        proveedor TEXT,
-        aplica_proveedor TEXT,
-        fecha_compra TEXT,
-        fecha_vencimiento TEXT,
-        archivo TEXT,
-        activo INTEGER DEFAULT 1
-    )
-    """)
 
-    # impres
+def _migrar_componentes_vence(c):
+    """
+    Agrega la columna vence (fecha_vencimiento normalizada a AAAA-MM-DD) y la
+    llena a partir del texto libre. Las fechas que no se reconocen quedan NULL.
+    """
+    c.execute("PRAGMA table_info(componentes)")
+    if any(col[1] == "vence" for col in c.fetchall()):
+        return
+    c.execute("ALTER TABLE componentes ADD COLUMN vence TEXT")
+    c.execute("SELECT id, fecha_vencimiento FROM componentes WHERE TRIM(COALESCE(fecha_vencimiento, '')) != ''")
+    filas = [(fecha_iso(f), i) for i, f in c.fetchall()]
+    c.executemany("UPDATE componentes SET vence=? WHERE id=?", filas)
+    sin_fecha = sum(1 for v, _ in filas if v is None)
+    print(f"[MIGRACION] componentes.vence: {len(filas) - sin_fecha} fechas normalizadas, {sin_fecha} sin reconocer")
+
+
+def _migrar_componentes_fk(c):
+    """
+    Bases creadas antes de la llave foránea: borra los componentes huérfanos y
+    reconstruye la tabla con equipo_id REFERENCES equipos(id) ON DELETE CASCADE
+    (SQLite no permite agregar la FK con ALTER TABLE).
+    """
+    c.execute("PRAGMA foreign_key_list(componentes)")
+    if c.fetchall():
+        return
     c.execute("""
-    CREATE TABLE IF NOT EXISTS impresoras (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        marca TEXT,
-        modelo TEXT,
-        mac TEXT,
-        ip TEXT,
-        serie TEXT,
-        area TEXT,
-        archivo TEXT
-    )
+        DELETE FROM componentes
+        WHERE equipo_id IS NULL OR equipo_id NOT IN (SELECT id FROM equipos)
     """)
+    huerfanos = c.rowcount
+    c.execute("DROP TABLE IF EXISTS componentes_nueva")
+    c.execute(_SQL_COMPONENTES.format(tabla="componentes_nueva"))
+    c.execute("INSERT INTO componentes_nueva SELECT * FROM componentes")
+    c.execute("DROP TABLE componentes")
+    c.execute("ALTER TABLE componentes_nueva RENAME TO componentes")
+    print(f"[MIGRACION] componentes con llave foránea a equipos; {huerfanos} huérfanos eliminados")
 
-    # camaras
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS camaras (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        marca TEXT,
-        modelo TEXT,
-        mac TEXT,
-        ip TEXT,
-        serie TEXT,
-        area TEXT,
-        estado TEXT,
-        archivo TEXT
-    )
-    """)
 
-    # otros
-    c.execute("""
-    CREATE TABLE IF NOT EXISTS otros (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT,
-        marca TEXT,
-        modelo TEXT,
-        mac TEXT,
-        ip TEXT,
-        serie TEXT,
-        area TEXT,
-        descripcion TEXT,
-        archivo TEXT
-    )
-    """)
+def _migrar_direcciones(c):
+    """
+    Bases anteriores a ip_num/mac_norm: agrega las columnas y las llena desde el
+    texto libre (lo que no es una IPv4 o una MAC queda NULL). Antes de llenar se
+    borran los triggers de UPDATE de versiones, cambios y FTS para no marcar
+    todos los registros como modificados; init_db y _init_fts los recrean.
+    """
+    pendientes = []
+    for t in TABLAS_IP:
+        c.execute(f"PRAGMA table_info({t})")
+        if not any(col[1] == "ip_num" for col in c.fetchall()):
+            pendientes.append(t)
+    if not pendientes:
+        return
+    for t in pendientes:
+        c.execute(f"DROP TRIGGER IF EXISTS {t}_version_update")
+        c.execute(f"DROP TRIGGER IF EXISTS {t}_cambios_update")
+    c.execute("DROP TRIGGER IF EXISTS equipos_fts_au")
+    for t in pendientes:
+        c.execute(f"ALTER TABLE {t} ADD COLUMN ip_num INTEGER")
+        c.execute(f"ALTER TABLE {t} ADD COLUMN mac_norm TEXT")
+        c.execute(f"SELECT id, ip, mac FROM {t}")
+        filas = [(ip_a_int(ip), normalizar_mac(mac), i) for i, ip, mac in c.fetchall()]
+        filas = [f for f in filas if f[0] is not None or f[1] is not None]
+        c.executemany(f"UPDATE {t} SET ip_num=?, mac_norm=? WHERE id=?", filas)
+        print(f"[MIGRACION] {t}.ip_num/mac_norm: {len(filas)} registros con IP o MAC reconocible")
+
+
+def _init_fts():
+    """Crea equipos_fts + triggers de sincronización; si es nueva la llena desde equipos."""
+    global FTS_DISPONIBLE
+    cols = ", ".join(FTS_COLUMNAS)
+    nuevos = ", ".join(f"new.{col}" for col in FTS_COLUMNAS)
+    viejos = ", ".join(f"old.{col}" for col in FTS_COLUMNAS)
+    try:
+        with transaccion() as c:
+            c.execute("SELECT 1 FROM sqlite_master WHERE name='equipos_fts'")
+            existia = c.fetchone() is not None
+            c.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS equipos_fts USING fts5(
+                {cols}, content='equipos', content_rowid='id', tokenize='trigram'
+            )
+            """)
+            c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS equipos_fts_ai AFTER INSERT ON equipos BEGIN
+                INSERT INTO equipos_fts(rowid, {cols}) VALUES (new.id, {nuevos});
+            END
+            """)
+            c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS equipos_fts_ad AFTER DELETE ON equipos BEGIN
+                INSERT INTO equipos_fts(equipos_fts, rowid, {cols}) VALUES ('delete', old.id, {viejos});
+            END
+            """)
+            c.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS equipos_fts_au AFTER UPDATE ON equipos BEGIN
+                INSERT INTO equipos_fts(equipos_fts, rowid, {cols}) VALUES ('delete', old.id, {viejos});
+                INSERT INTO equipos_fts(rowid, {cols}) VALUES (new.id, {nuevos});
+            END
+            """)
+            if not existia:
+                c.execute("INSERT INTO equipos_fts(equipos_fts) VALUES ('rebuild')")
+        FTS_DISPONIBLE = True
+    except sqlite3.OperationalError as e:
+        print(f"[FTS] búsqueda de texto no disponible, se usa LIKE: {e}")
+        FTS_DISPONIBLE = False
+
+
+def reconstruir_indice_busqueda():
+    """Regenera equipos_fts desde la tabla equipos (bases existentes o índice dañado)."""
+    with transaccion() as c:
+        c.execute("INSERT INTO equipos_fts(equipos_fts) VALUES ('rebuild')")
 
-    # busqueda de ip
-    c.execute("CREATE INDEX IF NOT EXISTS idx_equipos_ip ON equipos(ip)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_impresoras_ip ON impresoras(ip)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_camaras_ip ON camaras(ip)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_otros_ip ON otros(ip)")
 
-    conn.commit()
-    conn.close()
+# funciones
 
+def version_tabla(tabla):
+    """Contador de cambios de la tabla (sirve para invalidar caches)."""
+    with consulta() as c:
+        c.execute("SELECT version FROM versiones WHERE tabla=?", (tabla,))
+        r = c.fetchone()
+    return r[0] if r else 0
 
-# funciones
 
-def obtener_todos(tabla):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute(f"SELECT * FROM {tabla}")
-    datos = c.fetchall()
-    conn.close()
+def obtener_todos(tabla, tipo=None):
+    """Todas las filas como `tipo` (registros.py); por defecto el registro completo de la tabla."""
+    tipo = tipo or POR_TABLA[tabla]
+    with consulta() as c:
+        c.execute(f"SELECT {registros.columnas(tipo)} FROM {tabla}")
+        datos = registros.filas(tipo, c.fetchall())
     return datos
 
 
+def iterar_tabla(tabla, lote=500, tipo=None):
+    """
+    Recorre la tabla por lotes de `lote` filas (fetchmany), ordenada por id.
+    Usa una conexión propia porque se consume desde respuestas en streaming,
+    cuando la conexión del request ya se cerró.
+    """
+    tipo = tipo or POR_TABLA[tabla]
+    conn = _abrir_conexion(DB_PATH)
+    try:
+        c = conn.cursor()
+        c.execute(f"SELECT {registros.columnas(tipo)} FROM {tabla} ORDER BY id")
+        while True:
+            filas = c.fetchmany(lote)
+            if not filas:
+                break
+            yield registros.filas(tipo, filas)
+    finally:
+        conn.close()
+
+
+def _where(condiciones):
+    return (" WHERE " + " AND ".join(condiciones)) if condiciones else ""
+
+
+def _pagina(tabla, condiciones, params, despues_de=None, antes_de=None, limite=50, tipo=None):
+    """
+    Paginación por cursor (keyset) sobre id: WHERE id > ? ORDER BY id LIMIT ?.
+    - despues_de: id de la última fila de la página anterior (avanzar)
+    - antes_de: id de la primera fila de la página actual (retroceder)
+    - tipo: registro con las columnas a traer (debe incluir id)
+    Retorna dict con filas, total y los cursores siguiente/anterior (o None).
+    """
+    tipo = tipo or POR_TABLA[tabla]
+    conds = list(condiciones)
+    p = list(params)
+    if antes_de is not None:
+        conds.append("id < ?")
+        p.append(antes_de)
+        orden = "DESC"
+    else:
+        if despues_de is not None:
+            conds.append("id > ?")
+            p.append(despues_de)
+        orden = "ASC"
+
+    with consulta() as c:
+        c.execute(f"SELECT {registros.columnas(tipo)} FROM {tabla}{_where(conds)} ORDER BY id {orden} LIMIT ?",
+                  p + [limite + 1])
+        filas = registros.filas(tipo, c.fetchall())
+        c.execute(f"SELECT COUNT(*) FROM {tabla}{_where(condiciones)}", list(params))
+        total = c.fetchone()[0]
+
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    if antes_de is not None:
+        filas.reverse()
+        siguiente = filas[-1].id if filas else None
+        anterior = filas[0].id if filas and hay_mas else None
+    else:
+        siguiente = filas[-1].id if filas and hay_mas else None
+        anterior = filas[0].id if filas and despues_de is not None else None
+
+    return {"filas": filas, "total": total, "siguiente": siguiente, "anterior": anterior}
+
+
+def pagina_tabla(tabla, despues_de=None, antes_de=None, limite=50, tipo=None):
+    return _pagina(tabla, [], [], despues_de, antes_de, limite, tipo)
+
+
+# Filtros por igualdad que acepta pagina_filtrada (la API); "ip" va por prefijo.
+FILTROS_IGUALDAD = ("empresa", "activo", "area", "equipo_id")
+
+
+def _rango_prefijo(prefijo):
+    """(desde, hasta) tal que col >= desde AND col < hasta <=> col empieza con prefijo (usa el índice)."""
+    return prefijo, prefijo[:-1] + chr(ord(prefijo[-1]) + 1)
+
+
+def pagina_filtrada(tabla, filtros, despues_de=None, antes_de=None, limite=50, tipo=None):
+    """
+    _pagina con filtros {columna: valor}: igualdad para FILTROS_IGUALDAD y
+    prefijo para "ip". Un filtro que la tabla no tiene da ValueError.
+    """
+    columnas_tabla = POR_TABLA[tabla]._fields
+    condiciones, params = [], []
+    for col, valor in filtros.items():
+        if col not in columnas_tabla or (col != "ip" and col not in FILTROS_IGUALDAD):
+            raise ValueError(f"{tabla} no se puede filtrar por {col}")
+        if col == "ip":
+            condiciones.append("ip >= ? AND ip < ?")
+            params += _rango_prefijo(valor)
+        else:
+            condiciones.append(f"{col} = ?")
+            params.append(valor)
+    return _pagina(tabla, condiciones, params, despues_de, antes_de, limite, tipo)
+
+
+def obtener_por_id(tabla, id_reg, tipo=None):
+    tipo = tipo or POR_TABLA[tabla]
+    with consulta() as c:
+        c.execute(f"SELECT {registros.columnas(tipo)} FROM {tabla} WHERE id=?", (id_reg,))
+        return registros.fila(tipo, c.fetchone())
+
+
+# ---------- registro de cambios (tabla cambios, la llenan los triggers) ----------
+
+MAX_PARAMETROS = 900    # SQLite admite 999 "?" por consulta en versiones viejas
+
+
+def cambios_desde(desde=0, limite=500):
+    """
+    Cambios con version > desde, a lo sumo `limite` entradas del registro.
+    Cada registro modificado aparece una vez (con la versión de su último
+    cambio dentro de la página) y con su estado actual: la fila completa
+    (registros.py) si existe, None si se borró. Devuelve dict con
+    cambios [(version, tabla, id, fila)], hasta (el `desde` de la próxima
+    llamada), mas, actual (última versión) y podado (ver compactar_cambios).
+    """
+    with consulta() as c:
+        c.execute("SELECT version FROM versiones WHERE tabla=?", (CAMBIOS_PODADO,))
+        podado = c.fetchone()[0]
+        # sqlite_sequence guarda la última versión asignada aunque se haya compactado
+        c.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name='cambios'")
+        actual = c.fetchone()[0]
+        c.execute("SELECT version, tabla, registro FROM cambios WHERE version > ? ORDER BY version LIMIT ?",
+                  (desde, limite + 1))
+        entradas = c.fetchall()
+        mas = len(entradas) > limite
+        entradas = entradas[:limite]
+
+        ultima = {}
+        for version, tabla, registro in entradas:
+            ultima[(tabla, registro)] = version
+        ids_por_tabla = {}
+        for tabla, registro in ultima:
+            ids_por_tabla.setdefault(tabla, []).append(registro)
+        actuales = {}
+        for tabla, ids in ids_por_tabla.items():
+            tipo = POR_TABLA[tabla]
+            for i in range(0, len(ids), MAX_PARAMETROS):
+                parte = ids[i:i + MAX_PARAMETROS]
+                c.execute(f"SELECT {registros.columnas(tipo)} FROM {tabla} WHERE id IN ({', '.join('?' * len(parte))})",
+                          parte)
+                for f in registros.filas(tipo, c.fetchall()):
+                    actuales[(tabla, f.id)] = f
+
+    cambios = sorted((v, t, r, actuales.get((t, r))) for (t, r), v in ultima.items())
+    return {
+        "cambios": cambios,
+        "hasta": entradas[-1][0] if entradas else max(desde, 0),
+        "mas": mas,
+        "actual": actual,
+        "podado": podado,
+    }
+
+
+def compactar_cambios(dias_bajas=DIAS_BAJAS):
+    """
+    Deja sólo la última entrada de cada registro (las anteriores no aportan
+    nada a quien sincroniza) y borra las bajas de hace más de `dias_bajas`
+    días. Lo segundo sube CAMBIOS_PODADO: quien esté sincronizado desde una
+    versión menor pudo perder esas bajas y debe volver a empezar desde 0.
+    """
+    with transaccion() as c:
+        c.execute("""
+            DELETE FROM cambios WHERE version NOT IN (
+                SELECT MAX(version) FROM cambios GROUP BY tabla, registro
+            )
+        """)
+        superadas = c.rowcount
+        c.execute("SELECT MAX(version) FROM cambios WHERE operacion='D' AND fecha < datetime('now', ?)",
+                  (f"-{int(dias_bajas)} days",))
+        corte = c.fetchone()[0]
+        bajas = 0
+        if corte:
+            c.execute("DELETE FROM cambios WHERE operacion='D' AND version <= ?", (corte,))
+            bajas = c.rowcount
+            c.execute("UPDATE versiones SET version = MAX(version, ?) WHERE tabla=?", (corte, CAMBIOS_PODADO))
+        c.execute("SELECT version FROM versiones WHERE tabla=?", (CAMBIOS_PODADO,))
+        podado = c.fetchone()[0]
+    print(f"[CAMBIOS] compactado: {superadas} entradas superadas y {bajas} bajas eliminadas; podado={podado}")
+    return {"superadas": superadas, "bajas": bajas, "podado": podado}
+
+
+def insertar_lote(tabla, columnas, filas):
+    """INSERT de muchas filas con executemany, en una sola transacción."""
+    if tabla == "componentes" and "fecha_vencimiento" in columnas and "vence" not in columnas:
+        i = columnas.index("fecha_vencimiento")
+        columnas = list(columnas) + ["vence"]
+        filas = [tuple(f) + (fecha_iso(f[i]),) for f in filas]
+    if tabla in TABLAS_IP and ("ip" in columnas or "mac" in columnas) and "ip_num" not in columnas:
+        i_ip = columnas.index("ip") if "ip" in columnas else None
+        i_mac = columnas.index("mac") if "mac" in columnas else None
+        columnas = list(columnas) + ["ip_num", "mac_norm"]
+        filas = [tuple(f) + (None if i_ip is None else ip_a_int(f[i_ip]),
+                             None if i_mac is None else normalizar_mac(f[i_mac])) for f in filas]
+    cols = ", ".join(columnas)
+    marcas = ", ".join("?" * len(columnas))
+    with transaccion() as c:
+        c.executemany(f"INSERT INTO {tabla} ({cols}) VALUES ({marcas})", filas)
+    if tabla in TABLAS_IP and "ip" in columnas:
+        i = columnas.index("ip")
+        for fila in filas:
+            _cambio_ip(None, fila[i])
+
+
 def eliminar_simple(tabla, id_reg):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute(f"DELETE FROM {tabla} WHERE id=?", (id_reg,))
-    conn.commit()
-    conn.close()
+    with transaccion() as c:
+        vieja = _ip_actual(c, tabla, id_reg)
+        c.execute(f"DELETE FROM {tabla} WHERE id=?", (id_reg,))
+    _cambio_ip(vieja, None)
 
 
 
 def obtener_equipo_por_id(eid):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT * FROM equipos WHERE id=?", (eid,))
-    equipo = c.fetchone()
-    conn.close()
+    with consulta() as c:
+        c.execute(f"SELECT {registros.columnas(Equipo)} FROM equipos WHERE id=?", (eid,))
+        equipo = registros.fila(Equipo, c.fetchone())
     return equipo
 
 
 def obtener_componentes_por_equipo(eid):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT * FROM componentes WHERE equipo_id=?", (eid,))
-    comp = c.fetchall()
-    conn.close()
+    with consulta() as c:
+        c.execute(f"SELECT {registros.columnas(Componente)} FROM componentes WHERE equipo_id=?", (eid,))
+        comp = registros.filas(Componente, c.fetchall())
     return comp
 
 
-def guardar_equipo(datos):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO equipos (nombre, num_factura, mac, ip, marca, modelo, serie, fecha_compra,
-            usuario_asignado, usuario_dominio, en_dominio, tiene_symantec, bitlocker,
-            conectada_internet, archivo, fecha_registro, empresa)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, datos)
-    conn.commit()
-    conn.close()
+def guardar_equipo(datos, permitir_repetidos=False):
+    with transaccion() as c:
+        canonicas = _validar_direcciones(c, "equipos", None, datos[3], datos[2], permitir_repetidos)
+        c.execute("""
+            INSERT INTO equipos (nombre, num_factura, mac, ip, marca, modelo, serie, fecha_compra,
+                usuario_asignado, usuario_dominio, en_dominio, tiene_symantec, bitlocker,
+                conectada_internet, archivo, fecha_registro, empresa, ip_num, mac_norm)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, tuple(datos) + canonicas)
+    _cambio_ip(None, datos[3])
 
 
-def actualizar_equipo(id, datos):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("""
-        UPDATE equipos SET nombre=?, num_factura=?, mac=?, ip=?, marca=?, modelo=?, serie=?, fecha_compra=?,
-        usuario_asignado=?, usuario_dominio=?, en_dominio=?, tiene_symantec=?, bitlocker=?,
-        conectada_internet=?, empresa=? WHERE id=?
-    """, datos + (id,))
-    conn.commit()
-    conn.close()
+def actualizar_equipo(id, datos, permitir_repetidos=False):
+    with transaccion() as c:
+        vieja = _ip_actual(c, "equipos", id)
+        canonicas = _validar_direcciones(c, "equipos", id, datos[3], datos[2], permitir_repetidos)
+        c.execute("""
+            UPDATE equipos SET nombre=?, num_factura=?, mac=?, ip=?, marca=?, modelo=?, serie=?, fecha_compra=?,
+            usuario_asignado=?, usuario_dominio=?, en_dominio=?, tiene_symantec=?, bitlocker=?,
+            conectada_internet=?, empresa=?, ip_num=?, mac_norm=? WHERE id=?
+        """, tuple(datos) + canonicas + (id,))
+    _cambio_ip(vieja, datos[3])
 
 
 def actualizar_equipo_archivo(id, ruta_archivo):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("UPDATE equipos SET archivo=? WHERE id=?", (ruta_archivo, id))
-    conn.commit()
-    conn.close()
+    with transaccion() as c:
+        c.execute("UPDATE equipos SET archivo=? WHERE id=?", (ruta_archivo, id))
 
 
 def eliminar_equipo(id):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("DELETE FROM equipos WHERE id=?", (id,))
-    conn.commit()
-    conn.close()
+    with transaccion() as c:
+        vieja = _ip_actual(c, "equipos", id)
+        c.execute("DELETE FROM equipos WHERE id=?", (id,))
+    _cambio_ip(vieja, None)
 
 
 def set_equipo_activo(id, valor):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("UPDATE equipos SET activo=? WHERE id=?", (valor, id))
-    conn.commit()
-    conn.close()
+    with transaccion() as c:
+        c.execute("UPDATE equipos SET activo=? WHERE id=?", (valor, id))
+
+
+def ids_equipos():
+    with consulta() as c:
+        c.execute("SELECT id FROM equipos")
+        return {r[0] for r in c.fetchall()}
 
 
 def contar_equipos(valor_activo=1):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM equipos WHERE activo=?", (valor_activo,))
-    total = c.fetchone()[0]
-    conn.close()
+    with consulta() as c:
+        c.execute("SELECT COUNT(*) FROM equipos WHERE activo=?", (valor_activo,))
+        total = c.fetchone()[0]
     return total
 
 
-def buscar_equipos(q, empresa=None, solo_activos=True):
-    conn = conectar()
-    c = conn.cursor()
-    sql = "SELECT * FROM equipos WHERE 1=1"
+def _usa_fts(q):
+    # trigram necesita al menos 3 caracteres
+    return FTS_DISPONIBLE and len(q) >= 3
+
+
+def _match_fts(q):
+    return '"' + q.replace('"', '""') + '"'
+
+
+def _filtro_equipos(q, empresa, solo_activos):
+    condiciones = []
     params = []
-    if q:
-        sql += " AND (nombre LIKE ? OR ip LIKE ? OR usuario_asignado LIKE ?)"
+    if q and _usa_fts(q):
+        condiciones.append("id IN (SELECT rowid FROM equipos_fts WHERE equipos_fts MATCH ?)")
+        params.append(_match_fts(q))
+    elif q:
+        condiciones.append("(nombre LIKE ? OR ip LIKE ? OR usuario_asignado LIKE ?)")
         params += [f"%{q}%", f"%{q}%", f"%{q}%"]
     if empresa:
-        sql += " AND empresa=?"
+        condiciones.append("empresa=?")
+        params.append(empresa)
+    if solo_activos:
+        condiciones.append("activo=1")
+    return condiciones, params
+
+
+def buscar_equipos(q, empresa=None, solo_activos=True, despues_de=None, limite=None, tipo=Equipo):
+    """
+    Con texto de búsqueda (>= 3 caracteres) consulta equipos_fts y ordena por
+    relevancia (bm25); si no, devuelve los equipos ordenados por id.
+    """
+    if q and despues_de is None and _usa_fts(q):
+        return _buscar_equipos_fts(q, empresa, solo_activos, limite, tipo)
+    condiciones, params = _filtro_equipos(q, empresa, solo_activos)
+    if despues_de is not None:
+        condiciones.append("id > ?")
+        params.append(despues_de)
+    sql = f"SELECT {registros.columnas(tipo)} FROM equipos{_where(condiciones)} ORDER BY id"
+    if limite is not None:
+        sql += " LIMIT ?"
+        params.append(limite)
+    with consulta() as c:
+        c.execute(sql, params)
+        res = registros.filas(tipo, c.fetchall())
+    return res
+
+
+def _buscar_equipos_fts(q, empresa, solo_activos, limite, tipo):
+    sql = f"""
+        SELECT {registros.columnas(tipo, "e")} FROM equipos_fts
+        JOIN equipos e ON e.id = equipos_fts.rowid
+        WHERE equipos_fts MATCH ?
+    """
+    params = [_match_fts(q)]
+    if empresa:
+        sql += " AND e.empresa=?"
         params.append(empresa)
     if solo_activos:
-        sql += " AND activo=1"
-    c.execute(sql, params)
-    res = c.fetchall()
-    conn.close()
+        sql += " AND e.activo=1"
+    sql += " ORDER BY bm25(equipos_fts), e.id"
+    if limite is not None:
+        sql += " LIMIT ?"
+        params.append(limite)
+    with consulta() as c:
+        c.execute(sql, params)
+        res = registros.filas(tipo, c.fetchall())
     return res
 
 
+def pagina_equipos(q, empresa=None, solo_activos=True, despues_de=None, antes_de=None, limite=50, tipo=Equipo):
+    condiciones, params = _filtro_equipos(q, empresa, solo_activos)
+    return _pagina("equipos", condiciones, params, despues_de, antes_de, limite, tipo)
+
+
+
+
+def componentes_con_equipo(equipo_ids=None):
+    """
+    Componentes junto con los datos de su equipo en una sola consulta,
+    ordenados por equipo. Filas: registros.ComponenteReporte.
+    """
+    sql = """
+        SELECT e.id, e.empresa, e.nombre, c.software, c.version, c.llave, c.proveedor,
+               c.fecha_compra, c.fecha_vencimiento
+        FROM equipos e JOIN componentes c ON c.equipo_id = e.id
+    """
+    params = []
+    if equipo_ids is not None:
+        ids = list(equipo_ids)
+        sql += f" WHERE e.id IN ({', '.join('?' * len(ids))})" if ids else " WHERE 0"
+        params = ids
+    sql += " ORDER BY e.id, c.id"
+    with consulta() as c:
+        c.execute(sql, params)
+        return registros.filas(ComponenteReporte, c.fetchall())
 
 
 def guardar_componente(datos):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO componentes (equipo_id, software, version, serie_software, id_producto,
-            llave, proveedor, aplica_proveedor, fecha_compra, fecha_vencimiento, archivo)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, datos)
-    conn.commit()
-    conn.close()
+    with transaccion() as c:
+        c.execute("""
+            INSERT INTO componentes (equipo_id, software, version, serie_software, id_producto,
+                llave, proveedor, aplica_proveedor, fecha_compra, fecha_vencimiento, archivo, vence)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, tuple(datos) + (fecha_iso(datos[9]),))
 
 
 def obtener_componente_por_id(cid):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT * FROM componentes WHERE id=?", (cid,))
-    comp = c.fetchone()
-    conn.close()
+    with consulta() as c:
+        c.execute(f"SELECT {registros.columnas(Componente)} FROM componentes WHERE id=?", (cid,))
+        comp = registros.fila(Componente, c.fetchone())
     return comp
 
 
 def actualizar_componente(id, datos):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("""
-        UPDATE componentes SET software=?, version=?, serie_software=?, id_producto=?,
-        llave=?, proveedor=?, aplica_proveedor=?, fecha_compra=?, fecha_vencimiento=?, archivo=? WHERE id=?
-    """, datos + (id,))
-    conn.commit()
-    conn.close()
+    with transaccion() as c:
+        c.execute("""
+            UPDATE componentes SET software=?, version=?, serie_software=?, id_producto=?,
+            llave=?, proveedor=?, aplica_proveedor=?, fecha_compra=?, fecha_vencimiento=?, archivo=?, vence=?
+            WHERE id=?
+        """, tuple(datos) + (fecha_iso(datos[8]), id))
 
 
 def eliminar_componente(id_comp):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("DELETE FROM componentes WHERE id=?", (id_comp,))
-    conn.commit()
-    conn.close()
+    with transaccion() as c:
+        c.execute("DELETE FROM componentes WHERE id=?", (id_comp,))
 
 
 def set_componente_activo(id, valor):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("UPDATE componentes SET activo=? WHERE id=?", (valor, id))
-    conn.commit()
-    conn.close()
+    with transaccion() as c:
+        c.execute("UPDATE componentes SET activo=? WHERE id=?", (valor, id))
 
 
 
-def guardar_impresora(datos):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO impresoras (marca, modelo, mac, ip, serie, area, archivo)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-    """, datos)
-    conn.commit()
-    conn.close()
+def guardar_impresora(datos, permitir_repetidos=False):
+    with transaccion() as c:
+        canonicas = _validar_direcciones(c, "impresoras", None, datos[3], datos[2], permitir_repetidos)
+        c.execute("""
+            INSERT INTO impresoras (marca, modelo, mac, ip, serie, area, archivo, ip_num, mac_norm)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, tuple(datos) + canonicas)
+    _cambio_ip(None, datos[3])
 
 
-def actualizar_impresora(id_impresora, datos):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("""
-        UPDATE impresoras SET marca=?, modelo=?, mac=?, ip=?, serie=?, area=? WHERE id=?
-    """, datos + (id_impresora,))
-    conn.commit()
-    conn.close()
+def actualizar_impresora(id_impresora, datos, permitir_repetidos=False):
+    with transaccion() as c:
+        vieja = _ip_actual(c, "impresoras", id_impresora)
+        canonicas = _validar_direcciones(c, "impresoras", id_impresora, datos[3], datos[2], permitir_repetidos)
+        c.execute("""
+            UPDATE impresoras SET marca=?, modelo=?, mac=?, ip=?, serie=?, area=?, ip_num=?, mac_norm=? WHERE id=?
+        """, tuple(datos) + canonicas + (id_impresora,))
+    _cambio_ip(vieja, datos[3])
 
 
 def actualizar_impresora_archivo(id, ruta):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("UPDATE impresoras SET archivo=? WHERE id=?", (ruta, id))
-    conn.commit()
-    conn.close()
+    with transaccion() as c:
+        c.execute("UPDATE impresoras SET archivo=? WHERE id=?", (ruta, id))
 
 
 def obtener_impresora_por_id(iid):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT * FROM impresoras WHERE id=?", (iid,))
-    r = c.fetchone()
-    conn.close()
+    with consulta() as c:
+        c.execute(f"SELECT {registros.columnas(Impresora)} FROM impresoras WHERE id=?", (iid,))
+        r = registros.fila(Impresora, c.fetchone())
     return r
 
 
 
-def guardar_camara(datos):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO camaras (marca, modelo, mac, ip, serie, area, estado, archivo)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, datos)
-    conn.commit()
-    conn.close()
+def guardar_camara(datos, permitir_repetidos=False):
+    with transaccion() as c:
+        canonicas = _validar_direcciones(c, "camaras", None, datos[3], datos[2], permitir_repetidos)
+        c.execute("""
+            INSERT INTO camaras (marca, modelo, mac, ip, serie, area, estado, archivo, ip_num, mac_norm)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, tuple(datos) + canonicas)
+    _cambio_ip(None, datos[3])
 
 
-def actualizar_camara(id_camara, datos):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("""
-        UPDATE camaras SET marca=?, modelo=?, mac=?, ip=?, serie=?, area=?, estado=? WHERE id=?
-    """, datos + (id_camara,))
-    conn.commit()
-    conn.close()
+def actualizar_camara(id_camara, datos, permitir_repetidos=False):
+    with transaccion() as c:
+        vieja = _ip_actual(c, "camaras", id_camara)
+        canonicas = _validar_direcciones(c, "camaras", id_camara, datos[3], datos[2], permitir_repetidos)
+        c.execute("""
+            UPDATE camaras SET marca=?, modelo=?, mac=?, ip=?, serie=?, area=?, estado=?, ip_num=?, mac_norm=?
+            WHERE id=?
+        """, tuple(datos) + canonicas + (id_camara,))
+    _cambio_ip(vieja, datos[3])
 
 
 def obtener_camara_por_id(cid):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT * FROM camaras WHERE id=?", (cid,))
-    r = c.fetchone()
-    conn.close()
+    with consulta() as c:
+        c.execute(f"SELECT {registros.columnas(Camara)} FROM camaras WHERE id=?", (cid,))
+        r = registros.fila(Camara, c.fetchone())
     return r
 
 
-def guardar_otro(datos):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("""
-        INSERT INTO otros (nombre, marca, modelo, mac, ip, serie, area, descripcion, archivo)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """, datos)
-    conn.commit()
-    conn.close()
+def guardar_otro(datos, permitir_repetidos=False):
+    with transaccion() as c:
+        canonicas = _validar_direcciones(c, "otros", None, datos[4], datos[3], permitir_repetidos)
+        c.execute("""
+            INSERT INTO otros (nombre, marca, modelo, mac, ip, serie, area, descripcion, archivo, ip_num, mac_norm)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, tuple(datos) + canonicas)
+    _cambio_ip(None, datos[4])
 
 
-def actualizar_otro(id, datos):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("""
-        UPDATE otros SET nombre=?, marca=?, modelo=?, mac=?, ip=?, serie=?, area=?, descripcion=? WHERE id=?
-    """, datos + (id,))
-    conn.commit()
-    conn.close()
+def actualizar_otro(id, datos, permitir_repetidos=False):
+    with transaccion() as c:
+        vieja = _ip_actual(c, "otros", id)
+        canonicas = _validar_direcciones(c, "otros", id, datos[4], datos[3], permitir_repetidos)
+        c.execute("""
+            UPDATE otros SET nombre=?, marca=?, modelo=?, mac=?, ip=?, serie=?, area=?, descripcion=?,
+            ip_num=?, mac_norm=? WHERE id=?
+        """, tuple(datos) + canonicas + (id,))
+    _cambio_ip(vieja, datos[4])
 
 
 def actualizar_otro_archivo(id, ruta):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("UPDATE otros SET archivo=? WHERE id=?", (ruta, id))
-    conn.commit()
-    conn.close()
+    with transaccion() as c:
+        c.execute("UPDATE otros SET archivo=? WHERE id=?", (ruta, id))
 
 
 def obtener_otro_por_id(iid):
-    conn = conectar()
-    c = conn.cursor()
-    c.execute("SELECT * FROM otros WHERE id=?", (iid,))
-    r = c.fetchone()
-    conn.close()
+    with consulta() as c:
+        c.execute(f"SELECT {registros.columnas(Otro)} FROM otros WHERE id=?", (iid,))
+        r = registros.fila(Otro, c.fetchone())
     return r
 
 
 
-def buscar_por_ip(ip):
+_IP_PREFIJO = re.compile(r"^\d{1,3}(\.\d{0,3}){1,3}$")
+
+# (tipo, columnas a mostrar) — todas las ramas devuelven (tipo, id, dato1, dato2, ip)
+_BUSQUEDA_IP = (
+    ("equipos", "nombre", "empresa"),
+    ("impresoras", "marca", "modelo"),
+    ("camaras", "marca", "modelo"),
+    ("otros", "nombre", "marca"),
+)
+
+
+# Cómo se muestra cada registro en los reportes por IP
+_NOMBRE_IP = (
+    ("equipos", "nombre"),
+    ("impresoras", "TRIM(COALESCE(marca, '') || ' ' || COALESCE(modelo, ''))"),
+    ("camaras", "TRIM(COALESCE(marca, '') || ' ' || COALESCE(modelo, ''))"),
+    ("otros", "nombre"),
+)
+
+
+def _modo_busqueda_ip(ip):
+    """exacto (IP completa), prefijo ("192.168.3", "10.0.") o contiene (cualquier otra cosa)."""
+    if ip_a_int(ip) is not None:
+        return "exacto"
+    if _IP_PREFIJO.match(ip):
+        return "prefijo"
+    return "contiene"
+
+
+def buscar_por_ip(ip, modo="auto", limite=200):
     """
-    Busca coincidencias parciales de IP en las tablas principales del sistema.
+    Busca una IP en equipos, impresoras, cámaras y otros con una sola consulta
+    UNION ALL. En modo exacto/prefijo usa los índices idx_*_ip (igualdad o rango
+    ip >= 'pref' AND ip < 'preg'); "contiene" es el LIKE '%x%' de siempre.
+    En modo "auto", si exacto/prefijo no encuentra nada se repite como
+    "contiene": un pedazo como "3.15" o "168.3" no es el comienzo de la IP.
+    Cada lista trae registros.CoincidenciaIP (id, dato1, dato2, ip); "truncado" indica que se
+    alcanzó el límite.
     """
+    vacio = {"equipos": [], "impresoras": [], "camaras": [], "otros": [], "truncado": False}
+    ip = (ip or "").strip()
     if not ip:
-        return {"equipos": [], "impresoras": [], "camaras": [], "otros": []}
+        return vacio
+
+    if modo == "auto":
+        modo = _modo_busqueda_ip(ip)
+        if modo != "contiene":
+            res = buscar_por_ip(ip, modo, limite)
+            if any(res[t] for t, _, _ in _BUSQUEDA_IP):
+                return res
+            modo = "contiene"
+    if modo == "exacto":
+        condicion, params = "ip = ?", [ip]
+    elif modo == "prefijo":
+        condicion, params = "ip >= ? AND ip < ?", list(_rango_prefijo(ip))
+    else:
+        condicion, params = "ip LIKE ?", [f"%{ip}%"]
+
+    ramas = [f"SELECT '{t}', id, {a}, {b}, ip FROM {t} WHERE {condicion}" for t, a, b in _BUSQUEDA_IP]
+    sql = " UNION ALL ".join(ramas) + " LIMIT ?"
+    with consulta() as c:
+        c.execute(sql, params * len(ramas) + [limite + 1])
+        filas = c.fetchall()
+
+    res = vacio
+    res["truncado"] = len(filas) > limite
+    for tipo, *fila in filas[:limite]:
+        res[tipo].append(CoincidenciaIP(*fila))
+    return res
 
-    ip_like = f"%{ip}%"
-    conn = conectar()
-    c = conn.cursor()
 
-    # Equipos
-    c.execute("SELECT * FROM equipos WHERE ip LIKE ?", (ip_like,))
-    equipos = c.fetchall()
+def registros_con_ip():
+    """[(tabla, id, nombre, ip, mac)] de todos los registros con IP, en una consulta."""
+    ramas = [f"SELECT '{t}', id, {nombre}, ip, mac FROM {t} WHERE ip IS NOT NULL AND ip != ''"
+             for t, nombre in _NOMBRE_IP]
+    with consulta() as c:
+        c.execute(" UNION ALL ".join(ramas))
+        return c.fetchall()
 
-    # Impresoras
-    c.execute("SELECT * FROM impresoras WHERE ip LIKE ?", (ip_like,))
-    impresoras = c.fetchall()
 
-    # Cámaras
-    c.execute("SELECT * FROM camaras WHERE ip LIKE ?", (ip_like,))
-    camaras = c.fetchall()
+def obtener_ips_usadas():
+    """
+    Set con las IPs en uso, en forma canónica (de ip_num). Una IP repetida en
+    varios registros aparece una vez: los repetidos están en conflictos_direcciones().
+    """
+    ramas = [f"SELECT ip_num FROM {t} WHERE ip_num IS NOT NULL" for t in TABLAS_IP]
+    with consulta() as c:
+        c.execute(" UNION ".join(ramas))
+        return {int_a_ip(r[0]) for r in c.fetchall()}
+
+
+# ---------- IP/MAC repetidas ----------
+# ip_num (IPv4 como entero) y mac_norm (AA:BB:CC:DD:EE:FF) se calculan al
+# escribir, así "192.168.1.5 " y "192.168.001.5" o "aa-bb-..." y "AABB.CC..."
+# cuentan como la misma dirección. Cada tabla los tiene indexados.
+
+class DireccionRepetida(ValueError):
+    """IP o MAC que ya usa otro registro; .conflictos = [registros.ConflictoDireccion]."""
+
+    def __init__(self, conflictos):
+        self.conflictos = conflictos
+        super().__init__("; ".join(
+            f"{c.campo.upper()} {c.valor} ya está en {c.tabla} #{c.id} ({c.nombre or 'sin nombre'})"
+            for c in conflictos
+        ))
+
+
+def _buscar_repetidos(c, tabla, id_reg, ip_num, mac_norm):
+    ramas, params = [], []
+    for t, nombre in _NOMBRE_IP:
+        propio = " AND id != ?" if t == tabla and id_reg is not None else ""
+        for campo, col, valor in (("ip", "ip_num", ip_num), ("mac", "mac_norm", mac_norm)):
+            if valor is None:
+                continue
+            ramas.append(f"SELECT '{campo}', {campo}, '{t}', id, {nombre} FROM {t} WHERE {col} = ?{propio}")
+            params += [valor, id_reg] if propio else [valor]
+    if not ramas:
+        return []
+    c.execute(" UNION ALL ".join(ramas), params)
+    return registros.filas(ConflictoDireccion, c.fetchall())
 
-    # Otros
-    c.execute("SELECT * FROM otros WHERE ip LIKE ?", (ip_like,))
-    otros = c.fetchall()
 
-    conn.close()
-    return {
-        "equipos": equipos,
-        "impresoras": impresoras,
-        "camaras": camaras,
-        "otros": otros
-    }
+def buscar_repetidos(tabla, ip, mac, id_reg=None):
+    """
+    Registros de cualquier tabla con IP que ya usan esa IP o MAC (sin contar
+    id_reg de `tabla`). Una consulta UNION ALL de búsquedas por igualdad en
+    idx_*_ip_num / idx_*_mac_norm: no recorre las tablas.
+    """
+    with consulta() as c:
+        return _buscar_repetidos(c, tabla, id_reg, ip_a_int(ip), normalizar_mac(mac))
 
 
-def obtener_ips_usadas():
-    """Devuelve un set con todas las IPs (no vacías) encontradas en las tablas."""
-    conn = conectar()
-    c = conn.cursor()
-    usados = set()
-    tablas = ["equipos", "impresoras", "camaras", "otros"]
-    for t in tablas:
-        try:
+def _validar_direcciones(c, tabla, id_reg, ip, mac, permitir_repetidos=False):
+    """
+    (ip_num, mac_norm) para guardar. Si otro registro ya tiene la IP o la MAC
+    lanza DireccionRepetida, o con permitir_repetidos sólo lo avisa en el log
+    (queda en conflictos_direcciones()). Al editar sólo se revisa lo que cambió,
+    para que un repetido viejo no impida modificar otros campos.
+    """
+    ip_num, mac_norm = ip_a_int(ip), normalizar_mac(mac)
+    buscar_ip, buscar_mac = ip_num, mac_norm
+    if id_reg is not None:
+        c.execute(f"SELECT ip_num, mac_norm FROM {tabla} WHERE id=?", (id_reg,))
+        actual = c.fetchone()
+        if actual:
+            buscar_ip = None if actual[0] == ip_num else ip_num
+            buscar_mac = None if actual[1] == mac_norm else mac_norm
+    repetidos = _buscar_repetidos(c, tabla, id_reg, buscar_ip, buscar_mac)
+    if repetidos:
+        error = DireccionRepetida(repetidos)
+        if not permitir_repetidos:
+            raise error
+        print(f"[CONFLICTO] {tabla}: {error}")
+    return ip_num, mac_norm
+
+
+def conflictos_direcciones():
+    """
+    IPs y MACs que aparecen en más de un registro (equipos, impresoras, cámaras
+    y otros), con una sola consulta que agrupa por la forma canónica.
+    [{"campo": "ip"|"mac", "valor": canónico, "registros": [ConflictoDireccion, ...]}]
+    """
+    ramas = []
+    for t, nombre in _NOMBRE_IP:
+        ramas.append(f"SELECT 'ip' AS campo, ip_num AS clave, ip AS valor, '{t}' AS tabla, id, {nombre} AS nombre "
+                     f"FROM {t} WHERE ip_num IS NOT NULL")
+        ramas.append(f"SELECT 'mac', mac_norm, mac, '{t}', id, {nombre} FROM {t} WHERE mac_norm IS NOT NULL")
+    sql = f"""
+        SELECT campo, clave, valor, tabla, id, nombre FROM (
+            SELECT *, COUNT(*) OVER (PARTITION BY campo, clave) AS veces
+            FROM ({" UNION ALL ".join(ramas)})
+        ) WHERE veces > 1
+        ORDER BY campo, clave, tabla, id
+    """
+    with consulta() as c:
+        c.execute(sql)
+        filas = c.fetchall()
+    grupos = []
+    for (campo, clave), fs in itertools.groupby(filas, key=lambda f: (f[0], f[1])):
+        grupos.append({
+            "campo": campo,
+            "valor": int_a_ip(clave) if campo == "ip" else clave,
+            "registros": [ConflictoDireccion(campo, valor, t, i, n) for _, _, valor, t, i, n in fs],
+        })
+    return grupos
+
+
+# ---------- asignación de IPs ----------
+# El índice de IPs usadas (red_ips.AsignadorIPs) se carga una vez desde la BD
+# y luego se mantiene con cada guardar/actualizar/eliminar de este módulo.
+# _firma_ips es la versión VERSION_IPS con que se armó, más una por cada
+# escritura aplicada después con _cambio_ip; si la base tiene otra, cambió una
+# IP por otro lado (flask importar, otro worker) y se rearma. Cambiar activo o
+# el archivo adjunto no sube VERSION_IPS.
+
+TABLAS_IP = ("equipos", "impresoras", "camaras", "otros")
+_asignador = None
+_firma_ips = None
+
+
+def _version_ips():
+    return version_tabla(VERSION_IPS)
+
+
+def asignador_ips():
+    global _asignador, _firma_ips, _plan
+    with _plan_lock:
+        version = _version_ips()
+        if _asignador is None or version != _firma_ips:
+            asignador = AsignadorIPs()
+            for ip in _leer_ips():
+                asignador.ocupar(ip)
+            # el plan se arma sobre el asignador: se rehace con el nuevo
+            _asignador, _firma_ips, _plan = asignador, version, None
+        return _asignador
+
+
+def _leer_ips():
+    ips = []
+    with consulta() as c:
+        for t in TABLAS_IP:
             c.execute(f"SELECT ip FROM {t} WHERE ip IS NOT NULL AND ip != ''")
-            rows = c.fetchall()
-            for r in rows:
-                if r and r[0]:
-                    usados.add(str(r[0]).strip())
-        except Exception:
-            continue
-    conn.close()
-    return usados
+            ips += [r[0] for r in c.fetchall()]
+    return ips
+
+
+def _ip_actual(c, tabla, id_reg):
+    if tabla not in TABLAS_IP:
+        return None
+    c.execute(f"SELECT ip FROM {tabla} WHERE id=?", (id_reg,))
+    r = c.fetchone()
+    return r[0] if r else None
+
+
+def _cambio_ip(vieja, nueva):
+    # con el lock: una escritura que termina mientras asignador_ips() arma el
+    # índice espera y se aplica sobre el índice nuevo
+    global _firma_ips
+    with _plan_lock:
+        if _asignador is None:
+            return  # se cargará completo en el primer uso
+        _firma_ips += 1     # la fila que escribió quien llama
+        if vieja and _asignador.liberar(vieja):
+            _cambio_plan(ip_a_int(vieja), False)
+        if nueva and _asignador.ocupar(nueva):
+            _cambio_plan(ip_a_int(nueva), True)
+
+
+def obtener_ips_libres(cidr, max_resultados=500):
+    """
+    Primeras IPs libres del CIDR (p.ej. "192.168.3.0/24"). Si es una subred del
+    plan no incluye las reservadas. ValueError si no es válido.
+    """
+    ini, fin = rango_red(cidr)
+    uso = _uso_por_cidr(cidr)
+    if uso is None:
+        return asignador_ips().primeras_libres(ini, fin, max_resultados)
+    libres = asignador_ips().primeras_libres(ini, fin, max_resultados + uso.reservadas)
+    return [ip for ip in libres if not uso.reservada(ip_a_int(ip))][:max_resultados]
+
+
+def ip_esta_libre(ip):
+    return asignador_ips().esta_libre(ip)
+
+
+def rangos_ips_libres(cidr):
+    """Tramos continuos libres del CIDR: [(desde, hasta, cantidad), ...] (sin las reservas del plan)."""
+    ini, fin = rango_red(cidr)
+    uso = _uso_por_cidr(cidr)
+    if uso is None:
+        return asignador_ips().rangos_libres(ini, fin)
+    return uso.tramos_libres(asignador_ips())
+
+
+# ---------- plan de IPs por subred ----------
+# Un UsoSubred por subred registrada, armado sobre el asignador la primera vez
+# que se pide y actualizado desde _cambio_ip; sólo se rearma si cambian las
+# subredes o sus reservas.
+
+_plan = None            # subred_id -> (Subred, UsoSubred)
+_plan_lock = threading.RLock()
+
+
+def normalizar_cidr(cidr):
+    """'192.168.3.7/24' -> '192.168.3.0/24'. ValueError si no es una red IPv4."""
+    try:
+        return str(ipaddress.IPv4Network(str(cidr).strip(), strict=False))
+    except (ipaddress.AddressValueError, ipaddress.NetmaskValueError, ValueError):
+        raise ValueError(f"Red inválida: {cidr}")
+
+
+def obtener_subredes():
+    """Subredes del plan, ordenadas por dirección."""
+    with consulta() as c:
+        c.execute(f"SELECT {registros.columnas(Subred)} FROM subredes")
+        subredes = registros.filas(Subred, c.fetchall())
+    return sorted(subredes, key=lambda s: ipaddress.IPv4Network(s.cidr))
+
+
+def obtener_reservas(subred_id=None):
+    sql = f"SELECT {registros.columnas(Reserva)} FROM subredes_reservas"
+    with consulta() as c:
+        if subred_id is None:
+            c.execute(sql + " ORDER BY subred_id, desde")
+        else:
+            c.execute(sql + " WHERE subred_id=? ORDER BY desde", (subred_id,))
+        return registros.filas(Reserva, c.fetchall())
+
+
+def _invalidar_plan():
+    global _plan
+    with _plan_lock:
+        _plan = None
+
+
+def guardar_subred(cidr, nombre=""):
+    """Agrega una subred al plan; devuelve su id. ValueError si no es válida o ya está."""
+    cidr = normalizar_cidr(cidr)
+    try:
+        with transaccion() as c:
+            c.execute("INSERT INTO subredes (cidr, nombre) VALUES (?, ?)", (cidr, (nombre or "").strip()))
+            sid = c.lastrowid
+    except sqlite3.IntegrityError:
+        raise ValueError(f"La red {cidr} ya está en el plan")
+    _invalidar_plan()
+    return sid
+
+
+def eliminar_subred(subred_id):
+    with transaccion() as c:
+        c.execute("DELETE FROM subredes WHERE id=?", (subred_id,))
+    _invalidar_plan()
+
+
+def guardar_reserva(subred_id, desde, hasta="", motivo=""):
+    """
+    Reserva desde..hasta (IPs; hasta vacío = una sola) dentro de la subred.
+    ValueError si las IPs no son válidas o caen fuera de la red.
+    """
+    with consulta() as c:
+        c.execute("SELECT cidr FROM subredes WHERE id=?", (subred_id,))
+        fila = c.fetchone()
+    if not fila:
+        raise ValueError("La subred no existe")
+    ini_n = ip_a_int(desde)
+    fin_n = ip_a_int(hasta) if (hasta or "").strip() else ini_n
+    if ini_n is None or fin_n is None:
+        raise ValueError("Las IPs de la reserva no son válidas")
+    ini_n, fin_n = min(ini_n, fin_n), max(ini_n, fin_n)
+    red = ipaddress.IPv4Network(fila[0])
+    if ini_n < int(red.network_address) or fin_n > int(red.broadcast_address):
+        raise ValueError(f"La reserva queda fuera de {fila[0]}")
+    with transaccion() as c:
+        c.execute("INSERT INTO subredes_reservas (subred_id, desde, hasta, motivo) VALUES (?, ?, ?, ?)",
+                  (subred_id, ini_n, fin_n, (motivo or "").strip()))
+    _invalidar_plan()
+
+
+def eliminar_reserva(reserva_id):
+    with transaccion() as c:
+        c.execute("DELETE FROM subredes_reservas WHERE id=?", (reserva_id,))
+    _invalidar_plan()
+
+
+def _cargar_plan():
+    """subred_id -> (Subred, UsoSubred); se arma una vez y lo mantiene _cambio_ip."""
+    global _plan
+    with _plan_lock:
+        asignador = asignador_ips()
+        if _plan is None:
+            reservas = {}
+            for r in obtener_reservas():
+                reservas.setdefault(r.subred_id, []).append((r.desde, r.hasta))
+            plan = {}
+            for s in obtener_subredes():
+                ini, fin = rango_red(s.cidr)
+                plan[s.id] = (s, UsoSubred(ini, fin, reservas.get(s.id, []), asignador))
+            _plan = plan
+        return _plan
+
+
+def _cambio_plan(n, ocupada):
+    # se llama con _plan_lock tomado, después de cambiar el asignador
+    if _plan is None:
+        return
+    for _, uso in _plan.values():
+        uso.cambio(n, ocupada, _asignador)
+
+
+def _uso_por_cidr(cidr):
+    try:
+        cidr = normalizar_cidr(cidr)
+    except ValueError:
+        return None
+    for s, uso in _cargar_plan().values():
+        if s.cidr == cidr:
+            return uso
+    return None
+
+
+def plan_ips():
+    """
+    Una fila por subred, en orden de dirección, con sus contadores (ya
+    calculados: no recorre las IPs):
+    [{"subred", "total", "usadas", "reservadas", "libres", "tramos", "fragmentacion"}]
+    """
+    with _plan_lock:
+        return [
+            {"subred": s, "total": uso.total, "usadas": uso.usadas, "reservadas": uso.reservadas,
+             "libres": uso.libres, "tramos": uso.tramos, "fragmentacion": uso.fragmentacion}
+            for s, uso in _cargar_plan().values()
+        ]
+
+
+def detalle_subred(subred_id):
+    """Contadores, reservas y tramos libres de una subred; None si no existe."""
+    with _plan_lock:
+        entrada = _cargar_plan().get(subred_id)
+        if entrada is None:
+            return None
+        s, uso = entrada
+        return {
+            "subred": s, "total": uso.total, "usadas": uso.usadas, "reservadas": uso.reservadas,
+            "libres": uso.libres, "tramos": uso.tramos, "fragmentacion": uso.fragmentacion,
+            "reservas": obtener_reservas(subred_id),
+            "tramos_libres": uso.tramos_libres(_asignador),
+        }
+
+
+def contar_ips_usadas(cidr=None):
+    if not cidr:
+        return asignador_ips().total_usadas()
+    ini, fin = rango_red(cidr)
+    return asignador_ips().usadas_en(ini, fin)
 
 
 def obtener_ips_disponibles(base_prefix, inicio=1, fin=254, max_resultados=500):
     """
-    Genera IPs base_prefix.inicio .. base_prefix.fin y filtra las ya usadas.
+    IPs libres base_prefix.inicio .. base_prefix.fin.
     - base_prefix: p.ej. "192.168.1" (puede venir con o sin punto final)
-    - inicio, fin: enteros
+    - inicio, fin: enteros (último octeto)
     - max_resultados: limita la cantidad devuelta (por UI)
     Retorna lista ordenada de IPs disponibles.
     """
@@ -464,19 +1522,12 @@ def obtener_ips_disponibles(base_prefix, inicio=1, fin=254, max_resultados=500):
 
     if inicio < 0:
         inicio = 1
+    fin = min(fin, 255)
     if fin < inicio:
         fin = inicio
-    if fin - inicio > 2000:
-        fin = inicio + 2000
-
-    usados = obtener_ips_usadas()
-    disponibles = []
-    for i in range(inicio, fin + 1):
-        ip = f"{bp}.{i}"
-        if ip not in usados:
-            disponibles.append(ip)
-            if len(disponibles) >= max_resultados:
-                break
-
-    return disponibles
 
+    ini_i = ip_a_int(f"{bp}.{inicio}")
+    fin_i = ip_a_int(f"{bp}.{fin}")
+    if ini_i is None or fin_i is None:
+        return []
+    return asignador_ips().primeras_libres(ini_i, fin_i, max_resultados)
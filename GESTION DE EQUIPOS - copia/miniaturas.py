@@ -0,0 +1,140 @@
+# miniaturas.py — vistas previas reducidas de imágenes y PDFs subidos, en cache de disco
+
+import hashlib
+import os
+import threading
+
+from PIL import Image, ImageOps
+from werkzeug.security import safe_join
+
+try:
+    import fitz     # PyMuPDF, opcional: sin él los PDF no tienen vista previa
+except ImportError:
+    fitz = None
+
+import almacen
+
+CARPETA = os.path.join("static", "miniaturas")
+MAX_BYTES_CACHE = 64 * 1024 * 1024
+TAMANOS = {"mini": 160, "vista": 640}
+CALIDAD_JPEG = 80
+
+EXT_IMAGEN = {".png", ".jpg", ".jpeg", ".gif", ".bmp", ".webp", ".tif", ".tiff"}
+
+_lock = threading.Lock()
+_uso = None     # bytes ocupados por la cache (se calcula la primera vez)
+
+
+def soporta(valor):
+    """True si el archivo (valor de la columna archivo) puede tener miniatura."""
+    ext = os.path.splitext(str(valor or ""))[1].lower()
+    return ext in EXT_IMAGEN or (ext == ".pdf" and fitz is not None)
+
+
+def _origen(valor):
+    """Ruta del archivo dentro de UPLOAD_FOLDER; None si el valor apunta fuera (../)."""
+    rel = almacen.ruta_relativa(valor)
+    return safe_join(almacen.UPLOAD_FOLDER, rel) if rel else None
+
+
+def clave(valor, tamano):
+    """
+    Nombre del archivo en cache. Los del almacén se identifican por su hash;
+    los viejos por ruta + fecha de modificación + tamaño.
+    """
+    meta = almacen.obtener(valor)
+    if meta:
+        base = meta["hash"]
+    else:
+        ruta = _origen(valor)
+        st = os.stat(ruta)
+        base = hashlib.sha1(f"{ruta}|{st.st_mtime_ns}|{st.st_size}".encode()).hexdigest()
+    return f"{base}_{TAMANOS[tamano]}.jpg"
+
+
+def _abrir(ruta, ancho):
+    if ruta.lower().endswith(".pdf"):
+        with fitz.open(ruta) as doc:
+            pagina = doc[0]
+            zoom = ancho / pagina.rect.width
+            pix = pagina.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+    with Image.open(ruta) as img:
+        img.draft("RGB", (ancho, ancho * 4))     # JPEG: decodifica ya reducido
+        img.thumbnail((ancho, ancho * 4), Image.LANCZOS)
+        return ImageOps.exif_transpose(img)
+
+
+def _generar(origen, destino, ancho):
+    img = _abrir(origen, ancho)
+    img.thumbnail((ancho, ancho * 4), Image.LANCZOS)
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        fondo = Image.new("RGB", img.size, (255, 255, 255))
+        fondo.paste(img, mask=img.getchannel("A"))
+        img = fondo
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+    tmp = f"{destino}.{threading.get_ident()}.tmp"
+    img.save(tmp, "JPEG", quality=CALIDAD_JPEG, optimize=True)
+    os.replace(tmp, destino)
+    return os.path.getsize(destino)
+
+
+def _calcular_uso():
+    global _uso
+    if _uso is None:
+        os.makedirs(CARPETA, exist_ok=True)
+        _uso = sum(e.stat().st_size for e in os.scandir(CARPETA) if e.is_file())
+    return _uso
+
+
+def _desalojar():
+    """Borra las miniaturas usadas hace más tiempo hasta quedar bajo MAX_BYTES_CACHE."""
+    global _uso
+    if _uso <= MAX_BYTES_CACHE:
+        return
+    entradas = sorted((e.stat().st_mtime, e.stat().st_size, e.path)
+                      for e in os.scandir(CARPETA) if e.is_file() and e.name.endswith(".jpg"))
+    for _, tamano, ruta in entradas:
+        if _uso <= MAX_BYTES_CACHE * 0.9:
+            break
+        try:
+            os.remove(ruta)
+            _uso -= tamano
+        except OSError:
+            pass
+
+
+def obtener(valor, tamano="mini"):
+    """
+    Ruta de la miniatura del archivo, generándola la primera vez. Cada uso
+    actualiza la fecha de modificación (orden LRU para el desalojo).
+    None si el archivo no existe o no se puede previsualizar.
+    """
+    global _uso
+    if tamano not in TAMANOS or not soporta(valor):
+        return None
+    origen = _origen(valor)
+    if not origen or not os.path.isfile(origen):
+        return None
+    destino = os.path.join(CARPETA, clave(valor, tamano))
+    with _lock:
+        _calcular_uso()
+        if os.path.exists(destino):
+            os.utime(destino)
+            return destino
+    try:
+        tamano_bytes = _generar(origen, destino, TAMANOS[tamano])
+    except Exception as e:
+        print(f"[MINIATURA] no se pudo generar {origen}: {e}")
+        return None
+    with _lock:
+        _uso += tamano_bytes
+        _desalojar()
+    return destino if os.path.exists(destino) else None
+
+
+def generar_todas(valor):
+    """Para el trabajo en segundo plano después de una subida."""
+    return [obtener(valor, t) for t in TAMANOS]
@@ -1,18 +1,35 @@
 # pdfs.py — generación de reportes PDF/CSV
 
 import os
+import io
 import csv
+import time
+from functools import lru_cache
 from typing import List, Sequence
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase.pdfmetrics import stringWidth
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 
-from mi_modelo import obtener_todos
+from mi_modelo import obtener_todos, iterar_tabla, componentes_con_equipo
+from registros import EquipoReporte, ImpresoraReporte, CamaraReporte, OtroReporte
 
 RUTA_REPORTES = "static"
 os.makedirs(RUTA_REPORTES, exist_ok=True)
 
+# Cómo arma _crear_tabla_pdf la tabla:
+#   "rapido"    texto plano en las celdas, partido en líneas aquí mismo cuando no
+#               entra, y una Table por página
+#   "parrafos"  un Paragraph por celda y una sola Table para todo el reporte
+# python -m benchmark pdf (reporte de equipos, mismas páginas en los dos modos):
+#   filas     parrafos            rapido
+#    1 000      3.7 s    52 MB     0.6 s    29 MB
+#   10 000     42.1 s   316 MB     7.6 s    83 MB
+#   50 000    420.4 s  1485 MB    30.8 s   322 MB
+MODO_PDF = "rapido"
+
 # ---------- util PDF ----------
 
 _STYLES = getSampleStyleSheet()
@@ -55,30 +72,69 @@ def _p(text) -> Paragraph:
 
 
 def _col_widths(titulos: Sequence[str], page_width: float) -> List[float]:
-    weights = [_WEIGHT_HINTS.get(t, 1.0) for t in titulos]
-    total = sum(weights) if sum(weights) > 0 else len(titulos)
-    return [page_width * (w / total) for w in weights]
-
-
-def _crear_tabla_pdf(nombre: str, titulos: Sequence[str], filas: Sequence[Sequence]) -> SimpleDocTemplate:
-    pdf_path = os.path.join(RUTA_REPORTES, f"reporte_{nombre}.pdf")
-    doc = SimpleDocTemplate(
-        pdf_path,
-        pagesize=letter,
-        leftMargin=18,
-        rightMargin=18,
-        topMargin=24,
-        bottomMargin=24,
-    )
+    return list(_anchos(tuple(titulos), page_width))
 
-    elementos = [Paragraph(f"Reporte de {nombre.capitalize()}", _TITLE), Spacer(1, 8)]
-    data = [list(titulos)] + [[_p(c) for c in fila] for fila in filas]
 
-    page_w, _ = letter
-    content_w = page_w - (doc.leftMargin + doc.rightMargin)
-    col_widths = _col_widths(titulos, content_w)
-
-    tabla = Table(data, colWidths=col_widths, repeatRows=1)
+@lru_cache(maxsize=64)
+def _anchos(titulos, page_width):
+    weights = [_WEIGHT_HINTS.get(t, 1.0) for t in titulos]
+    total = sum(weights) if sum(weights) > 0 else len(titulos)
+    return tuple(page_width * (w / total) for w in weights)
+
+
+# Medidas de Table con el estilo de abajo: 6 pt de padding a los lados y 3 pt
+# arriba/abajo (los valores por defecto), encabezado de una línea con leading 12.
+_PAD_H = 6
+_PAD_V = 3
+_ALTO_ENCABEZADO = 12 + 2 * _PAD_V
+# Ningún carácter de Helvetica mide más de 1.015 em ("@"): un texto de n
+# caracteres entra seguro en n * _CAR_MAX puntos sin medirlo.
+_CAR_MAX = 1.015 * _BODY.fontSize
+
+
+@lru_cache(maxsize=64)
+def _utiles(titulos, page_width):
+    """Ancho para texto de cada columna (sin el padding)."""
+    return tuple(a - 2 * _PAD_H for a in _anchos(titulos, page_width))
+
+
+@lru_cache(maxsize=512)
+def _ancho_car(ch):
+    return stringWidth(ch, _BODY.fontName, _BODY.fontSize)
+
+
+def _cortar(palabra, util):
+    """Corta por caracteres una palabra más ancha que la columna, como Paragraph."""
+    partes, actual, ancho = [], "", 0.0
+    for ch in palabra:
+        w = _ancho_car(ch)
+        if actual and ancho + w > util:
+            partes.append(actual)
+            actual, ancho = "", 0.0
+        actual += ch
+        ancho += w
+    partes.append(actual)
+    return partes
+
+
+def _celda(texto, util):
+    """
+    (texto, líneas): el texto de la celda partido en líneas que entran en la
+    columna. Table dibuja cada línea con drawString; no hace falta Paragraph.
+    """
+    s = "" if texto is None else str(texto)
+    if "\n" not in s and len(s) * _CAR_MAX <= util:
+        return s, 1
+    lineas = []
+    for l in simpleSplit(s, _BODY.fontName, _BODY.fontSize, util):
+        if stringWidth(l, _BODY.fontName, _BODY.fontSize) > util:
+            lineas += _cortar(l, util)
+        else:
+            lineas.append(l)
+    return "\n".join(lineas), len(lineas)
+
+
+def _estilo_tabla(titulos, rapido):
     style_cmds = [
         ("BACKGROUND", (0, 0), (-1, 0), colors.darkblue),
         ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
@@ -89,13 +145,75 @@ def _crear_tabla_pdf(nombre: str, titulos: Sequence[str], filas: Sequence[Sequen
         ("ALIGN", (0, 0), (-1, -1), "CENTER"),
         ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
     ]
+    if rapido:
+        # las celdas de texto plano con la misma letra que _BODY
+        style_cmds += [
+            ("FONTNAME", (0, 1), (-1, -1), _BODY.fontName),
+            ("FONTSIZE", (0, 1), (-1, -1), _BODY.fontSize),
+            ("LEADING", (0, 1), (-1, -1), _BODY.leading),
+        ]
     left_titles = {"Nombre", "Usuario", "Descripción", "Equipo", "Modelo"}
     for idx, t in enumerate(titulos):
         if t in left_titles:
             style_cmds.append(("ALIGN", (idx, 1), (idx, -1), "LEFT"))
+    return TableStyle(style_cmds)
+
+
+def _tablas_por_pagina(titulos, filas, anchos, utiles, alto_primera, alto_pagina):
+    """
+    Una Table por página: se suman los altos de fila (líneas * leading +
+    padding, lo mismo que calcula Table) y se corta antes de pasarse. Así
+    platypus no tiene que partir una tabla con todo el reporte en cada página.
+    """
+    estilo = _estilo_tabla(titulos, rapido=True)
+    encabezado = list(titulos)
+    tablas = []
+    trozo, alto, limite = [encabezado], _ALTO_ENCABEZADO, alto_primera
+    for fila in filas:
+        celdas, lineas = [], 1
+        for texto, util in zip(fila, utiles):
+            celda, n = _celda(texto, util)
+            celdas.append(celda)
+            if n > lineas:
+                lineas = n
+        h = lineas * _BODY.leading + 2 * _PAD_V
+        if alto + h > limite and len(trozo) > 1:
+            tablas.append(Table(trozo, colWidths=anchos, repeatRows=1, style=estilo))
+            trozo, alto, limite = [encabezado], _ALTO_ENCABEZADO, alto_pagina
+        trozo.append(celdas)
+        alto += h
+    tablas.append(Table(trozo, colWidths=anchos, repeatRows=1, style=estilo))
+    return tablas
+
+
+def _crear_tabla_pdf(nombre: str, titulos: Sequence[str], filas: Sequence[Sequence], modo: str = None) -> SimpleDocTemplate:
+    pdf_path = os.path.join(RUTA_REPORTES, f"reporte_{nombre}.pdf")
+    doc = SimpleDocTemplate(
+        pdf_path,
+        pagesize=letter,
+        leftMargin=18,
+        rightMargin=18,
+        topMargin=24,
+        bottomMargin=24,
+    )
+
+    titulo = Paragraph(f"Reporte de {nombre.capitalize()}", _TITLE)
+    elementos = [titulo, Spacer(1, 8)]
+
+    page_w, _ = letter
+    content_w = page_w - (doc.leftMargin + doc.rightMargin)
 
-    tabla.setStyle(TableStyle(style_cmds))
-    elementos.append(tabla)
+    if (modo or MODO_PDF) == "rapido":
+        titulos = tuple(titulos)
+        alto_pagina = doc.height - 12          # el Frame deja 6 pt arriba y abajo
+        alto_titulo = titulo.wrap(content_w, alto_pagina)[1] + titulo.getSpaceBefore() + titulo.getSpaceAfter() + 8
+        elementos += _tablas_por_pagina(titulos, filas, _anchos(titulos, content_w), _utiles(titulos, content_w),
+                                        alto_pagina - alto_titulo, alto_pagina)
+    else:
+        data = [list(titulos)] + [[_p(c) for c in fila] for fila in filas]
+        tabla = Table(data, colWidths=_col_widths(titulos, content_w), repeatRows=1)
+        tabla.setStyle(_estilo_tabla(titulos, rapido=False))
+        elementos.append(tabla)
     doc.build(elementos)
     return doc
 
@@ -111,69 +229,164 @@ def _crear_csv(nombre: str, titulos: Sequence[str], filas: Sequence[Sequence]) -
             w.writerow(["" if c is None else c for c in fila])
 
 
+def csv_streaming(nombre: str, lote: int = 500):
+    """
+    CSV del reporte `nombre` (ver REPORTES) generado por trozos, para enviarlo
+    directo en la respuesta HTTP sin archivo intermedio. Empieza con el BOM
+    de utf-8-sig para que Excel reconozca los acentos.
+    """
+    titulos, fila_fn, tipo = REPORTES[nombre]
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    buf.write("\ufeff")
+    w.writerow(titulos)
+    for filas in iterar_tabla(nombre, lote, tipo):
+        for fila in filas:
+            w.writerow(["" if c is None else c for c in fila_fn(fila)])
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate(0)
+    if buf.tell():
+        yield buf.getvalue()
+
+
+# ===== definición de reportes: títulos + fila por registro =====
+
+_TITULOS_EQUIPOS = ["Empresa","Nombre","Marca","Modelo","Usuario","Dominio","Symantec","BitLocker","Internet","Fecha registro"]
+_TITULOS_IMPRESORAS = ["Marca","Modelo","MAC","IP","Serie","Área"]
+_TITULOS_CAMARAS = ["Marca","Modelo","MAC","IP","Serie","Ubicación","Estado"]
+_TITULOS_OTROS = ["Nombre","Área","IP","Marca","Modelo","Serie","Descripción"]
+
+
+def _fila_equipo(e: EquipoReporte):
+    return [e.empresa or "N/A", e.nombre or "", e.marca or "", e.modelo or "", e.usuario_asignado or "",
+            e.en_dominio or "No", e.tiene_symantec or "No", e.bitlocker or "No", e.conectada_internet or "No",
+            (e.fecha_registro or "")[:10]]
+
+
+def _fila_impresora(d: ImpresoraReporte):
+    return ["" if c is None else c for c in d]
+
+
+def _fila_camara(d: CamaraReporte):
+    return ["" if c is None else c for c in d]
+
+
+def _fila_otro(d: OtroReporte):
+    return [d.nombre or (d.marca or ""), d.area or "", d.ip or "", d.marca or "", d.modelo or "",
+            d.serie or "", d.descripcion or ""]
+
+
+_TITULOS_COMPONENTES = ["Empresa","Equipo","Software","Versión","Llave","Proveedor","Compra","Vence"]
+
+
+def _fila_componente(d):
+    """d: registros.ComponenteReporte"""
+    return [d.empresa or "N/A", d.equipo or "", d.software or "", d.version or "", d.llave or "",
+            d.proveedor or "", d.fecha_compra or "", d.fecha_vencimiento or ""]
+
+
+# El CSV lleva además el id del equipo, para poder volver a cargarlo con
+# importar.importar_csv("componentes", ...); el nombre puede repetirse.
+_TITULOS_CSV_COMPONENTES = ["Equipo ID"] + _TITULOS_COMPONENTES
+
+
+def _fila_csv_componente(d):
+    return [d.equipo_id] + _fila_componente(d)
+
+
+# nombre -> (títulos, fila por registro, columnas que se leen de la tabla)
+REPORTES = {
+    "equipos": (_TITULOS_EQUIPOS, _fila_equipo, EquipoReporte),
+    "impresoras": (_TITULOS_IMPRESORAS, _fila_impresora, ImpresoraReporte),
+    "camaras": (_TITULOS_CAMARAS, _fila_camara, CamaraReporte),
+    "otros": (_TITULOS_OTROS, _fila_otro, OtroReporte),
+}
+
+
 # ===== EQUIPOS =====
 def generar_reporte_pdf_equipos():
-    equipos = obtener_todos("equipos")
-    titulos = ["Empresa","Nombre","Marca","Modelo","Usuario","Dominio","Symantec","BitLocker","Internet","Fecha registro"]
-    filas = [
-        [e[17] or "N/A", e[1] or "", e[5] or "", e[6] or "", e[9] or "",
-         e[11] or "No", e[12] or "No", e[13] or "No", e[14] or "No", (e[16] or "")[:10]]
-        for e in equipos
-    ]
-    _crear_tabla_pdf("equipos", titulos, filas)
+    equipos = obtener_todos("equipos", EquipoReporte)
+    filas = [_fila_equipo(e) for e in equipos]
+    _crear_tabla_pdf("equipos", _TITULOS_EQUIPOS, filas)
 
 
 def generar_reporte_csv_equipos():
-    equipos = obtener_todos("equipos")
-    titulos = ["Empresa","Nombre","Marca","Modelo","Usuario","Dominio","Symantec","BitLocker","Internet","Fecha registro"]
-    filas = [
-        [e[17] or "N/A", e[1] or "", e[5] or "", e[6] or "", e[9] or "",
-         e[11] or "No", e[12] or "No", e[13] or "No", e[14] or "No", (e[16] or "")[:10]]
-        for e in equipos
-    ]
-    _crear_csv("equipos", titulos, filas)
+    equipos = obtener_todos("equipos", EquipoReporte)
+    filas = [_fila_equipo(e) for e in equipos]
+    _crear_csv("equipos", _TITULOS_EQUIPOS, filas)
 
 
 # ===== IMPRESORAS =====
 def generar_reporte_pdf_impresoras():
-    datos = obtener_todos("impresoras")
-    titulos = ["Marca","Modelo","MAC","IP","Serie","Área"]
-    filas = [[d[1] or "", d[2] or "", d[3] or "", d[4] or "", d[5] or "", d[6] or ""] for d in datos]
-    _crear_tabla_pdf("impresoras", titulos, filas)
+    datos = obtener_todos("impresoras", ImpresoraReporte)
+    filas = [_fila_impresora(d) for d in datos]
+    _crear_tabla_pdf("impresoras", _TITULOS_IMPRESORAS, filas)
 
 
 def generar_reporte_csv_impresoras():
-    datos = obtener_todos("impresoras")
-    titulos = ["Marca","Modelo","MAC","IP","Serie","Área"]
-    filas = [[d[1] or "", d[2] or "", d[3] or "", d[4] or "", d[5] or "", d[6] or ""] for d in datos]
-    _crear_csv("impresoras", titulos, filas)
+    datos = obtener_todos("impresoras", ImpresoraReporte)
+    filas = [_fila_impresora(d) for d in datos]
+    _crear_csv("impresoras", _TITULOS_IMPRESORAS, filas)
 
 
 # ===== CÁMARAS =====
 def generar_reporte_pdf_camaras():
-    datos = obtener_todos("camaras")
-    titulos = ["Marca","Modelo","MAC","IP","Serie","Ubicación","Estado"]
-    filas = [[d[1] or "", d[2] or "", d[3] or "", d[4] or "", d[5] or "", d[6] or "", d[7] or ""] for d in datos]
-    _crear_tabla_pdf("camaras", titulos, filas)
+    datos = obtener_todos("camaras", CamaraReporte)
+    filas = [_fila_camara(d) for d in datos]
+    _crear_tabla_pdf("camaras", _TITULOS_CAMARAS, filas)
 
 
 def generar_reporte_csv_camaras():
-    datos = obtener_todos("camaras")
-    titulos = ["Marca","Modelo","MAC","IP","Serie","Ubicación","Estado"]
-    filas = [[d[1] or "", d[2] or "", d[3] or "", d[4] or "", d[5] or "", d[6] or "", d[7] or ""] for d in datos]
-    _crear_csv("camaras", titulos, filas)
+    datos = obtener_todos("camaras", CamaraReporte)
+    filas = [_fila_camara(d) for d in datos]
+    _crear_csv("camaras", _TITULOS_CAMARAS, filas)
 
 
 # ===== OTROS =====
 def generar_reporte_pdf_otros():
-    datos = obtener_todos("otros")
-    titulos = ["Nombre","Área","IP","Marca","Modelo","Serie","Descripción"]
-    filas = [[d[7] or (d[2] or ""), d[6] or "", d[4] or "", d[1] or "", d[2] or "", d[5] or "", d[8] or ""] for d in datos]
-    _crear_tabla_pdf("otros", titulos, filas)
+    datos = obtener_todos("otros", OtroReporte)
+    filas = [_fila_otro(d) for d in datos]
+    _crear_tabla_pdf("otros", _TITULOS_OTROS, filas)
 
 
 def generar_reporte_csv_otros():
-    datos = obtener_todos("otros")
-    titulos = ["Nombre","Área","IP","Marca","Modelo","Serie","Descripción"]
-    filas = [[d[7] or (d[2] or ""), d[6] or "", d[4] or "", d[1] or "", d[2] or "", d[5] or "", d[8] or ""] for d in datos]
-    _crear_csv("otros", titulos, filas)
+    datos = obtener_todos("otros", OtroReporte)
+    filas = [_fila_otro(d) for d in datos]
+    _crear_csv("otros", _TITULOS_OTROS, filas)
+
+
+# ===== COMPONENTES POR EQUIPO =====
+def _nombre_componentes(equipo_id):
+    return f"componentes_equipo_{equipo_id}"
+
+
+def generar_reporte_pdf_componentes(equipo_id):
+    filas = [_fila_componente(d) for d in componentes_con_equipo([equipo_id])]
+    _crear_tabla_pdf(_nombre_componentes(equipo_id), _TITULOS_COMPONENTES, filas)
+
+
+def generar_reporte_csv_componentes(equipo_id):
+    filas = [_fila_csv_componente(d) for d in componentes_con_equipo([equipo_id])]
+    _crear_csv(_nombre_componentes(equipo_id), _TITULOS_CSV_COMPONENTES, filas)
+
+
+def pdf_componentes_desde_filas(equipo_id, datos):
+    """
+    Genera el PDF de componentes de un equipo a partir de filas ya leídas
+    (sin tocar la BD), para usarse desde un ProcessPoolExecutor.
+    Devuelve (equipo_id, ruta, segundos, pid).
+    """
+    inicio = time.perf_counter()
+    filas = [_fila_componente(d) for d in datos]
+    _crear_tabla_pdf(_nombre_componentes(equipo_id), _TITULOS_COMPONENTES, filas)
+    ruta = os.path.join(RUTA_REPORTES, f"reporte_{_nombre_componentes(equipo_id)}.pdf")
+    return equipo_id, ruta, time.perf_counter() - inicio, os.getpid()
+
+
+GENERADORES_PDF = {
+    "equipos": generar_reporte_pdf_equipos,
+    "impresoras": generar_reporte_pdf_impresoras,
+    "camaras": generar_reporte_pdf_camaras,
+    "otros": generar_reporte_pdf_otros,
+}
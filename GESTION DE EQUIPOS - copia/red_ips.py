@@ -0,0 +1,258 @@
+# red_ips.py — índice en memoria de IPs usadas (bitmap por bloque /24)
+
+import heapq
+import ipaddress
+import re
+import threading
+from bisect import bisect_right
+
+_HEX = re.compile(r"^[0-9A-Fa-f]+$")
+
+
+def ip_a_int(ip):
+    """'192.168.3.10' -> 3232236298. Devuelve None si no es una IPv4 válida."""
+    if ip is None:
+        return None
+    partes = str(ip).strip().split(".")
+    if len(partes) != 4:
+        return None
+    n = 0
+    for p in partes:
+        if not p.isdigit() or len(p) > 3 or int(p) > 255:
+            return None
+        n = (n << 8) | int(p)
+    return n
+
+
+def int_a_ip(n):
+    return f"{(n >> 24) & 255}.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+
+
+def normalizar_mac(mac):
+    """
+    '00-1a-2b-3c-4d-5e', '001a.2b3c.4d5e', '0:1a:2b:3c:4d:5e' o '001A2B3C4D5E'
+    -> '00:1A:2B:3C:4D:5E'. Devuelve None si no es una MAC.
+    """
+    if mac is None:
+        return None
+    s = str(mac).strip()
+    partes = re.split(r"[:\-]", s)
+    if len(partes) == 6:
+        if not all(1 <= len(p) <= 2 and _HEX.match(p) for p in partes):
+            return None
+        s = "".join(p.zfill(2) for p in partes)
+    else:
+        s = s.replace(".", "")
+        if len(s) != 12 or not _HEX.match(s):
+            return None
+    s = s.upper()
+    return ":".join(s[i:i + 2] for i in range(0, 12, 2))
+
+
+def rango_red(cidr):
+    """
+    Primera y última IP asignable de un CIDR, como enteros.
+    Excluye la dirección de red y la de broadcast (salvo en /31 y /32).
+    Lanza ValueError si el CIDR no es válido.
+    """
+    red = ipaddress.IPv4Network(str(cidr).strip(), strict=False)
+    ini = int(red.network_address)
+    fin = int(red.broadcast_address)
+    if red.prefixlen <= 30:
+        ini += 1
+        fin -= 1
+    return ini, fin
+
+
+def _popcount(x):
+    return bin(x).count("1")
+
+
+class AsignadorIPs:
+    """
+    Guarda las IPs en uso como enteros: un bitmap de 256 bits por bloque /24
+    (clave = ip >> 8) más un contador de referencias por IP, para que una IP
+    repetida en dos registros siga ocupada si se borra uno de ellos.
+    Los bloques sin ninguna IP usada no se guardan (todo libre).
+    """
+
+    def __init__(self):
+        self._bloques = {}
+        self._refs = {}
+        self._lock = threading.Lock()
+
+    def ocupar(self, ip):
+        """True si la IP estaba libre (primer registro que la usa)."""
+        n = ip_a_int(ip)
+        if n is None:
+            return False
+        with self._lock:
+            refs = self._refs.get(n, 0) + 1
+            self._refs[n] = refs
+            if refs == 1:
+                b = n >> 8
+                self._bloques[b] = self._bloques.get(b, 0) | (1 << (n & 0xFF))
+            return refs == 1
+
+    def liberar(self, ip):
+        """True si la IP quedó libre (no la usa ningún otro registro)."""
+        n = ip_a_int(ip)
+        if n is None:
+            return False
+        with self._lock:
+            refs = self._refs.get(n, 0)
+            if refs > 1:
+                self._refs[n] = refs - 1
+                return False
+            if not refs:
+                return False
+            self._refs.pop(n, None)
+            b = n >> 8
+            bits = self._bloques.get(b, 0) & ~(1 << (n & 0xFF))
+            if bits:
+                self._bloques[b] = bits
+            else:
+                self._bloques.pop(b, None)
+            return True
+
+    def esta_libre(self, ip):
+        n = ip_a_int(ip)
+        if n is None:
+            return False
+        return not self.ocupada(n)
+
+    def ocupada(self, n):
+        """Como esta_libre, pero con la IP ya como entero."""
+        return bool((self._bloques.get(n >> 8, 0) >> (n & 0xFF)) & 1)
+
+    def total_usadas(self):
+        return len(self._refs)
+
+    @staticmethod
+    def _mascara(b, ini, fin):
+        """Bits del bloque b que caen dentro de [ini, fin]."""
+        base = b << 8
+        lo = max(ini, base) - base
+        hi = min(fin, base + 255) - base
+        return ((1 << (hi - lo + 1)) - 1) << lo
+
+    def _libres_bloque(self, b, ini, fin):
+        return ~self._bloques.get(b, 0) & self._mascara(b, ini, fin)
+
+    def _bloques_usados(self, ini, fin):
+        """Bloques con alguna IP usada dentro de [ini, fin], ordenados."""
+        lo, hi = ini >> 8, fin >> 8
+        if hi - lo < len(self._bloques):
+            return [b for b in range(lo, hi + 1) if b in self._bloques]
+        return sorted(b for b in list(self._bloques) if lo <= b <= hi)
+
+    def primeras_libres(self, ini, fin, n=1):
+        """Las primeras n IPs libres entre ini y fin (enteros, inclusive)."""
+        res = []
+        if n <= 0 or fin < ini:
+            return res
+        for b in range(ini >> 8, (fin >> 8) + 1):
+            libres = self._libres_bloque(b, ini, fin)
+            while libres:
+                bajo = libres & -libres
+                res.append(int_a_ip((b << 8) + bajo.bit_length() - 1))
+                if len(res) >= n:
+                    return res
+                libres ^= bajo
+        return res
+
+    def usadas_en(self, ini, fin):
+        return sum(_popcount(self._bloques.get(b, 0) & self._mascara(b, ini, fin))
+                   for b in self._bloques_usados(ini, fin))
+
+    def usadas_ordenadas(self, ini, fin):
+        """IPs usadas entre ini y fin, como enteros ordenados."""
+        res = []
+        for b in self._bloques_usados(ini, fin):
+            bits = self._bloques.get(b, 0) & self._mascara(b, ini, fin)
+            while bits:
+                bajo = bits & -bits
+                res.append((b << 8) + bajo.bit_length() - 1)
+                bits ^= bajo
+        return res
+
+    def rangos_libres(self, ini, fin):
+        """Tramos continuos de IPs libres: lista de (ip_inicio, ip_fin, cantidad)."""
+        tramos = []
+        actual = ini
+        for n in self.usadas_ordenadas(ini, fin) + [fin + 1]:
+            if n > actual:
+                tramos.append((int_a_ip(actual), int_a_ip(n - 1), n - actual))
+            actual = n + 1
+        return tramos
+
+
+def unir_rangos(rangos):
+    """[(desde, hasta)] enteros -> ordenados y sin solapamientos."""
+    res = []
+    for a, b in sorted(rangos):
+        if res and a <= res[-1][1] + 1:
+            res[-1] = (res[-1][0], max(res[-1][1], b))
+        else:
+            res.append((a, b))
+    return res
+
+
+class UsoSubred:
+    """
+    Uso de una subred (IPs usadas, reservadas, libres y tramos libres) que se
+    actualiza con cada IP que se ocupa o libera, sin recorrer la subred.
+    Una IP con registro cuenta como usada aunque esté dentro de una reserva;
+    "reservadas" son las reservadas que nadie usa.
+    """
+
+    def __init__(self, ini, fin, reservas, asignador):
+        self.ini, self.fin = ini, fin
+        self.reservas = unir_rangos((max(a, ini), min(b, fin)) for a, b in reservas if a <= fin and b >= ini)
+        self._inicios = [a for a, _ in self.reservas]
+        self.total = fin - ini + 1
+        self.usadas = asignador.usadas_en(ini, fin)
+        self.reservadas = sum(b - a + 1 - asignador.usadas_en(a, b) for a, b in self.reservas)
+        self.tramos = len(self.tramos_libres(asignador))
+
+    @property
+    def libres(self):
+        return self.total - self.usadas - self.reservadas
+
+    @property
+    def fragmentacion(self):
+        """0 si todo lo libre es un solo tramo, 1 si cada IP libre está aislada."""
+        if self.libres <= 1:
+            return 0.0
+        return (self.tramos - 1) / (self.libres - 1)
+
+    def reservada(self, n):
+        i = bisect_right(self._inicios, n) - 1
+        return i >= 0 and n <= self.reservas[i][1]
+
+    def _libre(self, n, asignador):
+        return self.ini <= n <= self.fin and not asignador.ocupada(n) and not self.reservada(n)
+
+    def cambio(self, n, ocupada, asignador):
+        """n pasó a estar usada (ocupada=True) o libre; el asignador ya tiene el cambio."""
+        if not self.ini <= n <= self.fin:
+            return
+        signo = 1 if ocupada else -1
+        self.usadas += signo
+        if self.reservada(n):
+            self.reservadas -= signo
+            return
+        # ocupar n parte su tramo en dos (2 vecinos libres), lo acorta (1) o lo
+        # hace desaparecer (0); liberar es lo contrario
+        vecinos = self._libre(n - 1, asignador) + self._libre(n + 1, asignador)
+        self.tramos += signo * (vecinos - 1)
+
+    def tramos_libres(self, asignador):
+        """Tramos continuos libres y no reservados: [(ip_inicio, ip_fin, cantidad)]."""
+        usadas = ((n, n) for n in asignador.usadas_ordenadas(self.ini, self.fin))
+        tramos, actual = [], self.ini
+        for a, b in heapq.merge(usadas, self.reservas, [(self.fin + 1, self.fin + 1)]):
+            if a > actual:
+                tramos.append((int_a_ip(actual), int_a_ip(a - 1), a - actual))
+            actual = max(actual, b + 1)
+        return tramos
@@ -0,0 +1,235 @@
+# registros.py — tipos de fila por tabla (NamedTuple: tupla compacta sin __dict__, con nombres)
+#
+# Las consultas piden sólo las columnas del tipo (ver columnas()) y cada fila se
+# convierte con filas(); como siguen siendo tuplas, el código viejo que desempaca
+# o escribe CSV con ellas sigue funcionando.
+
+from collections import namedtuple
+from functools import lru_cache, partial
+from typing import NamedTuple, Optional
+
+
+# ---------- filas completas (SELECT de todas las columnas, en el orden de la tabla) ----------
+
+class Equipo(NamedTuple):
+    id: int
+    nombre: Optional[str]
+    num_factura: Optional[str]
+    mac: Optional[str]
+    ip: Optional[str]
+    marca: Optional[str]
+    modelo: Optional[str]
+    serie: Optional[str]
+    fecha_compra: Optional[str]
+    usuario_asignado: Optional[str]
+    usuario_dominio: Optional[str]
+    en_dominio: Optional[str]
+    tiene_symantec: Optional[str]
+    bitlocker: Optional[str]
+    conectada_internet: Optional[str]
+    archivo: Optional[str]
+    fecha_registro: Optional[str]
+    empresa: Optional[str]
+    activo: int
+
+
+class Componente(NamedTuple):
+    id: int
+    equipo_id: int
+    software: Optional[str]
+    version: Optional[str]
+    serie_software: Optional[str]
+    id_producto: Optional[str]
+    llave: Optional[str]
+    proveedor: Optional[str]
+    aplica_proveedor: Optional[str]
+    fecha_compra: Optional[str]
+    fecha_vencimiento: Optional[str]
+    archivo: Optional[str]
+    activo: int
+    vence: Optional[str]
+
+
+class Impresora(NamedTuple):
+    id: int
+    marca: Optional[str]
+    modelo: Optional[str]
+    mac: Optional[str]
+    ip: Optional[str]
+    serie: Optional[str]
+    area: Optional[str]
+    archivo: Optional[str]
+
+
+class Camara(NamedTuple):
+    id: int
+    marca: Optional[str]
+    modelo: Optional[str]
+    mac: Optional[str]
+    ip: Optional[str]
+    serie: Optional[str]
+    area: Optional[str]
+    estado: Optional[str]
+    archivo: Optional[str]
+
+
+class Otro(NamedTuple):
+    id: int
+    nombre: Optional[str]
+    marca: Optional[str]
+    modelo: Optional[str]
+    mac: Optional[str]
+    ip: Optional[str]
+    serie: Optional[str]
+    area: Optional[str]
+    descripcion: Optional[str]
+    archivo: Optional[str]
+
+
+# ---------- proyecciones: sólo lo que muestra cada listado / reporte ----------
+
+class EquipoListado(NamedTuple):
+    id: int
+    nombre: Optional[str]
+    ip: Optional[str]
+    usuario_asignado: Optional[str]
+    marca: Optional[str]
+    modelo: Optional[str]
+    empresa: Optional[str]
+    activo: int
+
+
+class OtroListado(NamedTuple):
+    id: int
+    nombre: Optional[str]
+    marca: Optional[str]
+    ip: Optional[str]
+    area: Optional[str]
+    descripcion: Optional[str]
+    archivo: Optional[str]
+
+
+class EquipoReporte(NamedTuple):
+    empresa: Optional[str]
+    nombre: Optional[str]
+    marca: Optional[str]
+    modelo: Optional[str]
+    usuario_asignado: Optional[str]
+    en_dominio: Optional[str]
+    tiene_symantec: Optional[str]
+    bitlocker: Optional[str]
+    conectada_internet: Optional[str]
+    fecha_registro: Optional[str]
+
+
+class ImpresoraReporte(NamedTuple):
+    marca: Optional[str]
+    modelo: Optional[str]
+    mac: Optional[str]
+    ip: Optional[str]
+    serie: Optional[str]
+    area: Optional[str]
+
+
+class CamaraReporte(NamedTuple):
+    marca: Optional[str]
+    modelo: Optional[str]
+    mac: Optional[str]
+    ip: Optional[str]
+    serie: Optional[str]
+    area: Optional[str]
+    estado: Optional[str]
+
+
+class OtroReporte(NamedTuple):
+    nombre: Optional[str]
+    area: Optional[str]
+    ip: Optional[str]
+    marca: Optional[str]
+    modelo: Optional[str]
+    serie: Optional[str]
+    descripcion: Optional[str]
+
+
+class ComponenteReporte(NamedTuple):
+    """Componente con los datos de su equipo (mi_modelo.componentes_con_equipo)."""
+    equipo_id: int
+    empresa: Optional[str]
+    equipo: Optional[str]
+    software: Optional[str]
+    version: Optional[str]
+    llave: Optional[str]
+    proveedor: Optional[str]
+    fecha_compra: Optional[str]
+    fecha_vencimiento: Optional[str]
+
+
+class CoincidenciaIP(NamedTuple):
+    """Resultado de mi_modelo.buscar_por_ip; dato1/dato2 dependen de la tabla."""
+    id: int
+    dato1: Optional[str]
+    dato2: Optional[str]
+    ip: Optional[str]
+
+
+class ConflictoDireccion(NamedTuple):
+    """Registro que usa una IP o MAC repetida (campo "ip" o "mac"; valor tal como se escribió)."""
+    campo: str
+    valor: Optional[str]
+    tabla: str
+    id: int
+    nombre: Optional[str]
+
+
+class Subred(NamedTuple):
+    id: int
+    cidr: str
+    nombre: Optional[str]
+
+
+class Reserva(NamedTuple):
+    """Rango reservado de una subred; desde/hasta son IPs como enteros."""
+    id: int
+    subred_id: int
+    desde: int
+    hasta: int
+    motivo: Optional[str]
+
+
+POR_TABLA = {
+    "equipos": Equipo,
+    "componentes": Componente,
+    "impresoras": Impresora,
+    "camaras": Camara,
+    "otros": Otro,
+}
+
+
+@lru_cache(maxsize=256)
+def proyeccion(tabla, campos):
+    """
+    Registro con id + `campos` (tupla de columnas de `tabla`), para pedir sólo
+    algunas columnas (?fields= de la API). ValueError si alguna no existe.
+    """
+    base = POR_TABLA[tabla]
+    desconocidos = [c for c in campos if c not in base._fields]
+    if desconocidos:
+        raise ValueError(f"{tabla} no tiene {', '.join(desconocidos)}")
+    nombres = ("id",) + tuple(c for c in dict.fromkeys(campos) if c != "id")
+    return namedtuple(f"{base.__name__}Parcial", nombres)
+
+
+def columnas(tipo, alias=None):
+    """Lista de columnas para el SELECT de `tipo` (opcionalmente con prefijo de tabla)."""
+    if alias:
+        return ", ".join(f"{alias}.{c}" for c in tipo._fields)
+    return ", ".join(tipo._fields)
+
+
+def filas(tipo, datos):
+    """Convierte tuplas de sqlite en `tipo` (tuple.__new__ directo: sin pasar por Python por fila)."""
+    return list(map(partial(tuple.__new__, tipo), datos))
+
+
+def fila(tipo, dato):
+    return None if dato is None else tuple.__new__(tipo, dato)
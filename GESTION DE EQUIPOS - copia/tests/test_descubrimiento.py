@@ -0,0 +1,80 @@
+# tests/test_descubrimiento.py — barrer() y conciliar() sobre RespondedorFalso (sin red)
+#
+# python -m unittest discover -s tests     (desde la carpeta del proyecto)
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mi_modelo
+from descubrimiento import CONCURRENCIA, PUERTOS, RespondedorFalso, barrer, conciliar
+
+RED = "10.0.0.0/28"
+HOSTS = {
+    "10.0.0.5": {"puertos": {80}, "mac": "00:11:22:33:44:55"},
+    "10.0.0.6": {"puertos": {22}, "mac": "00:11:22:33:44:66"},    # registrado con otra MAC
+    "10.0.0.7": {"puertos": {22}, "mac": "02:00:00:00:00:07"},    # no registrado
+    "10.0.0.8": {"puertos": set()},                                # sólo rechaza
+    "10.0.0.10": {"puertos": {554}, "mac": "00:11:22:33:44:10"},  # registrado como 10.0.0.010
+}
+
+
+class TestBarridoFalso(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.mkdtemp(prefix="test_descubrimiento_")
+        cls.db_anterior = mi_modelo.DB_PATH
+        mi_modelo.DB_PATH = os.path.join(cls.directorio, "datos.db")
+        mi_modelo.init_db()
+        mi_modelo.insertar_lote("equipos", ["nombre", "ip", "mac"], [
+            ("PC-05", "10.0.0.5", "00-11-22-33-44-55"),
+            ("PC-06", "10.0.0.6", "00:11:22:33:44:aa"),
+            ("PC-08", "10.0.0.8", ""),
+        ])
+        mi_modelo.insertar_lote("impresoras", ["marca", "ip", "mac"], [("HP", "10.0.0.9", "")])
+        mi_modelo.insertar_lote("camaras", ["marca", "modelo", "ip", "mac"],
+                                [("Dahua", "IPC", " 10.0.0.010", "00:11:22:33:44:01")])
+        cls.falso = RespondedorFalso(HOSTS)
+        cls.resumen = barrer(RED, conectar=cls.falso.conectar, arp=cls.falso.arp, timeout=0.05)
+        cls.reporte = conciliar(RED)
+
+    @classmethod
+    def tearDownClass(cls):
+        mi_modelo.cerrar_conexion()
+        mi_modelo.DB_PATH = cls.db_anterior
+        shutil.rmtree(cls.directorio, ignore_errors=True)
+
+    def test_resumen(self):
+        self.assertEqual(self.resumen["sondeadas"], 14)     # sin red ni broadcast
+        self.assertEqual(self.resumen["vivos"], 5)
+
+    def test_puerto_aceptado_gana_a_los_rechazos(self):
+        with mi_modelo.consulta() as c:
+            c.execute("SELECT ip, mac, puerto FROM hosts_vistos WHERE barrido_id = ?", (self.resumen["barrido"],))
+            vistos = {ip: (mac, puerto) for ip, mac, puerto in c.fetchall()}
+        self.assertEqual(vistos["10.0.0.5"], ("00:11:22:33:44:55", 80))
+        self.assertEqual(vistos["10.0.0.6"][1], 22)
+        self.assertEqual(vistos["10.0.0.7"][1], 22)
+        self.assertIsNone(vistos["10.0.0.8"][1])
+
+    def test_conciliar(self):
+        r = self.reporte
+        self.assertEqual(r["barrido"]["id"], self.resumen["barrido"])
+        self.assertEqual(r["sin_registrar"], [("10.0.0.7", "02:00:00:00:00:07", 22)])
+        self.assertEqual([(t, ip, visto) for t, _, _, ip, visto in r["sin_respuesta"]],
+                         [("impresoras", "10.0.0.9", None)])
+        self.assertEqual([(nombre, ip, mac, vista) for _, _, nombre, ip, mac, vista in r["mac_distinta"]],
+                         [("PC-06", "10.0.0.6", "00:11:22:33:44:AA", "00:11:22:33:44:66"),
+                          ("Dahua IPC", "10.0.0.10", "00:11:22:33:44:01", "00:11:22:33:44:10")])
+
+    def test_concurrencia_limitada(self):
+        self.assertLessEqual(self.falso.max_simultaneas, CONCURRENCIA // len(PUERTOS) * len(PUERTOS))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# tests/test_importar.py — el CSV que exporta pdfs.py se puede volver a cargar con importar_csv()
+#
+# python -m unittest discover -s tests     (desde la carpeta del proyecto)
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mi_modelo
+from importar import abrir_texto, importar_csv
+
+CAMPOS = ("software", "version", "llave", "proveedor", "fecha_compra", "fecha_vencimiento")
+COMPONENTES = [
+    ("Office", "2021", "AAAA-BBBB", "Microsoft", "2024-01-10", "2027-01-10"),
+    ("Antivirus", "14.3", "", "Symantec", "2025-03-01", ""),
+]
+
+
+class TestComponentesIdaYVuelta(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directorio = tempfile.mkdtemp(prefix="test_importar_")
+        cls.cwd_anterior = os.getcwd()
+        os.chdir(cls.directorio)                 # pdfs escribe en ./static
+        cls.db_anterior = mi_modelo.DB_PATH
+        mi_modelo.DB_PATH = os.path.join(cls.directorio, "datos.db")
+        mi_modelo.init_db()
+        # Dos equipos con el mismo nombre: sólo el id dice a cuál va cada fila.
+        mi_modelo.insertar_lote("equipos", ["nombre", "empresa"], [("PC-01", "Silicatos"), ("PC-01", "Silicatos")])
+        cls.origen, cls.destino = sorted(mi_modelo.ids_equipos())
+        mi_modelo.insertar_lote("componentes", ["equipo_id"] + list(CAMPOS),
+                                [(cls.origen,) + c for c in COMPONENTES])
+
+    @classmethod
+    def tearDownClass(cls):
+        mi_modelo.cerrar_conexion()
+        mi_modelo.DB_PATH = cls.db_anterior
+        os.chdir(cls.cwd_anterior)
+        shutil.rmtree(cls.directorio, ignore_errors=True)
+
+    def _componentes(self, equipo_id):
+        return sorted(tuple(getattr(c, k) for k in CAMPOS)
+                      for c in mi_modelo.obtener_componentes_por_equipo(equipo_id))
+
+    def test_exportar_e_importar(self):
+        from pdfs import RUTA_REPORTES, _nombre_componentes, generar_reporte_csv_componentes
+        generar_reporte_csv_componentes(self.origen)
+        ruta = os.path.join(RUTA_REPORTES, f"reporte_{_nombre_componentes(self.origen)}.csv")
+
+        with open(ruta, "rb") as f:
+            resumen = importar_csv("componentes", abrir_texto(f))
+
+        self.assertEqual(resumen["errores"], [])
+        self.assertEqual(resumen["insertados"], len(COMPONENTES))
+        self.assertEqual(self._componentes(self.destino), [])
+        self.assertEqual(self._componentes(self.origen), sorted(COMPONENTES * 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+# trabajos.py — cola de trabajos en segundo plano (generación de reportes)
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from mi_modelo import cerrar_conexion
+
+MAX_HILOS = 2
+RETENCION_SEG = 60 * 60   # los trabajos terminados se olvidan después de 1 h
+
+_pool = ThreadPoolExecutor(max_workers=MAX_HILOS, thread_name_prefix="trabajo")
+_lock = threading.Lock()
+_trabajos = {}      # id -> dict con el estado del trabajo
+_en_curso = {}      # clave -> id (para no repetir trabajos idénticos)
+
+
+def _copia(t):
+    return dict(t)
+
+
+def _limpiar():
+    limite = time.time() - RETENCION_SEG
+    for tid in [tid for tid, t in _trabajos.items() if t["terminado"] and t["terminado"] < limite]:
+        del _trabajos[tid]
+
+
+def enviar(clave, funcion, *args, con_progreso=False):
+    """
+    Encola funcion(*args) y devuelve el estado del trabajo. Si ya hay uno
+    pendiente o en proceso con la misma clave, devuelve ese en vez de crear otro.
+    Con con_progreso=True la función recibe progreso=callback(hechos, total).
+    """
+    with _lock:
+        _limpiar()
+        tid = _en_curso.get(clave)
+        if tid is not None:
+            return _copia(_trabajos[tid])
+        tid = uuid.uuid4().hex
+        _trabajos[tid] = {
+            "id": tid, "clave": clave, "estado": "pendiente",
+            "resultado": None, "error": None, "progreso": None,
+            "creado": time.time(), "terminado": None,
+        }
+        _en_curso[clave] = tid
+    kwargs = {"progreso": lambda hechos, total: _progreso(tid, hechos, total)} if con_progreso else {}
+    _pool.submit(_ejecutar, tid, funcion, args, kwargs)
+    return obtener(tid)
+
+
+def _progreso(tid, hechos, total):
+    with _lock:
+        _trabajos[tid]["progreso"] = {"hechos": hechos, "total": total}
+
+
+def _ejecutar(tid, funcion, args, kwargs):
+    with _lock:
+        _trabajos[tid]["estado"] = "en_proceso"
+    try:
+        resultado = funcion(*args, **kwargs)
+        cambios = {"estado": "listo", "resultado": resultado}
+    except Exception as e:
+        print(f"[TRABAJO] {tid} falló: {e}")
+        cambios = {"estado": "error", "error": str(e)}
+    finally:
+        cerrar_conexion()
+    with _lock:
+        t = _trabajos[tid]
+        t.update(cambios, terminado=time.time())
+        _en_curso.pop(t["clave"], None)
+
+
+def obtener(tid):
+    """Estado del trabajo o None si no existe (o ya se descartó)."""
+    with _lock:
+        t = _trabajos.get(tid)
+        return _copia(t) if t else None
+
+
+def enviar_reporte_pdf(nombre):
+    from cache_reportes import reporte_pdf
+    return enviar(("pdf", nombre), reporte_pdf, nombre)
+
+
+def enviar_barrido(red):
+    from descubrimiento import barrer
+    return enviar(("barrido", red), barrer, red, con_progreso=True)
+
+
+def enviar_lote_componentes():
+    from lote_reportes import ZIP_COMPONENTES, generar_reportes_componentes
+    return enviar(("lote", "componentes"), generar_reportes_componentes,
+                  None, None, ZIP_COMPONENTES, con_progreso=True)
@@ -0,0 +1,106 @@
+# vencimientos.py — licencias de componentes por fecha de vencimiento (columna vence)
+
+import threading
+import time
+from datetime import date, timedelta
+
+from mi_modelo import consulta, generacion_escrituras
+
+DIAS_AVISO = 30
+SEMANAS_CALENDARIO = 5
+# Como en estadisticas.py: red de seguridad para escrituras de otro proceso.
+TTL_SEG = 60
+
+_COLUMNAS = """
+    SELECT c.id, c.equipo_id, e.nombre, e.empresa, c.software, c.proveedor, c.vence
+    FROM componentes c JOIN equipos e ON e.id = c.equipo_id
+"""
+
+_lock = threading.Lock()
+_cache = {"clave": None, "hora": 0, "datos": None}
+
+
+def _hoy(hoy):
+    return hoy or date.today()
+
+
+def proximos(dias=DIAS_AVISO, hoy=None, limite=200):
+    """Licencias activas que vencen entre hoy y hoy + dias, las más cercanas primero."""
+    hoy = _hoy(hoy)
+    with consulta() as c:
+        c.execute(_COLUMNAS + """
+            WHERE c.vence BETWEEN ? AND ? AND c.activo = 1
+            ORDER BY c.vence, c.id LIMIT ?
+        """, (hoy.isoformat(), (hoy + timedelta(days=dias)).isoformat(), limite))
+        return c.fetchall()
+
+
+def vencidos(hoy=None, limite=200):
+    """Licencias activas ya vencidas, las más recientes primero."""
+    with consulta() as c:
+        c.execute(_COLUMNAS + """
+            WHERE c.vence < ? AND c.activo = 1
+            ORDER BY c.vence DESC, c.id LIMIT ?
+        """, (_hoy(hoy).isoformat(), limite))
+        return c.fetchall()
+
+
+def por_proveedor(desde, hasta):
+    """[(proveedor, cantidad, primer vencimiento)] de las licencias que vencen en [desde, hasta]."""
+    with consulta() as c:
+        c.execute("""
+            SELECT COALESCE(NULLIF(TRIM(proveedor), ''), 'Sin proveedor') AS prov, COUNT(*), MIN(vence)
+            FROM componentes
+            WHERE vence BETWEEN ? AND ? AND activo = 1
+            GROUP BY prov ORDER BY COUNT(*) DESC, prov
+        """, (desde.isoformat(), hasta.isoformat()))
+        return c.fetchall()
+
+
+def _calcular(hoy):
+    # El calendario arranca el lunes de esta semana.
+    inicio = hoy - timedelta(days=hoy.weekday())
+    fin = inicio + timedelta(days=7 * SEMANAS_CALENDARIO - 1)
+    with consulta() as c:
+        c.execute("""
+            SELECT vence, COUNT(*) FROM componentes
+            WHERE vence BETWEEN ? AND ? AND activo = 1
+            GROUP BY vence
+        """, (inicio.isoformat(), fin.isoformat()))
+        por_dia = dict(c.fetchall())
+        c.execute("""
+            SELECT SUM(vence < :hoy), SUM(vence BETWEEN :hoy AND :aviso) FROM componentes
+            WHERE vence <= :aviso AND activo = 1
+        """, {"hoy": hoy.isoformat(), "aviso": (hoy + timedelta(days=DIAS_AVISO)).isoformat()})
+        total_vencidos, total_proximos = c.fetchone()
+
+    semanas = []
+    for s in range(SEMANAS_CALENDARIO):
+        dias = [inicio + timedelta(days=7 * s + d) for d in range(7)]
+        semanas.append([(d, por_dia.get(d.isoformat(), 0), d < hoy) for d in dias])
+    return {
+        "hoy": hoy,
+        "vencidos": total_vencidos or 0,
+        "proximos": total_proximos or 0,
+        "semanas": semanas,
+        "lista": proximos(DIAS_AVISO, hoy, limite=8),
+    }
+
+
+def calendario(hoy=None):
+    """
+    Resumen para el panel: vencidos, próximos DIAS_AVISO días, las primeras
+    licencias por vencer y un calendario de SEMANAS_CALENDARIO semanas con la
+    cantidad por día. Se recalcula cuando cambia el día, si hubo escrituras
+    (mi_modelo.generacion_escrituras) o si pasó TTL_SEG; si no, no hace SQL.
+    """
+    hoy = _hoy(hoy)
+    clave = (hoy, generacion_escrituras())
+    ahora = time.monotonic()
+    with _lock:
+        if _cache["clave"] == clave and ahora - _cache["hora"] < TTL_SEG:
+            return _cache["datos"]
+    datos = _calcular(hoy)
+    with _lock:
+        _cache.update(clave=clave, hora=ahora, datos=datos)
+    return datos